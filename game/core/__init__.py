@@ -0,0 +1,8 @@
+# game/core/__init__.py
+from .simulation import Simulation, InputState, NO_INPUT, SimSnapshot
+from .replay import Replay, ReplayRecorder, ReplayPlayer
+from .rewind import RewindBuffer
+from .reachability import ReachabilityGraph, load_reachability
+
+__all__ = ['Simulation', 'InputState', 'NO_INPUT', 'SimSnapshot', 'Replay', 'ReplayRecorder', 'ReplayPlayer', 'RewindBuffer',
+           'ReachabilityGraph', 'load_reachability']
\ No newline at end of file
@@ -0,0 +1,389 @@
+# game/core/reachability.py
+"""
+タイムラインの拍 (Digit が切り替わる時刻) ごとの、ジャンプで届く足場のグラフ。
+足場は Digit.get_platform_rects (B+C / E+F は 1 つにまとめたもの) の 1 要素で、
+Player の speed / jump_power / gravity / coyote_time からジャンプ・落下の軌道を 1 ステップずつ求め、
+ある足場から別の足場に着地できるか (何ステップかかるか) を辺にする。
+鍵は出現した拍のグラフで、寿命のうちに触れられる足場と最短ステップ数を持つ。
+
+シミュレーションを回さずに引けるよう、コンパイル済みステージの隣にキャッシュする
+(stage/compiled/stage1-1.1078x768.reach.bin)。JSON か Player の定数が変われば作り直す。
+
+近似:
+- 軌道の途中にある足場 (頭をぶつける・横から当たる) は見ない
+- 足場の上を歩く時間は数えない (ステップ数は下限)
+- 拍の途中で Digit が切り替わる影響と、切り替え中 (点滅中) の足場は見ない
+- 最終ステージはグループ A / B の切り替えを見ず、すべての Digit を足場とする
+"""
+import os
+import heapq
+import marshal
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from game.game_utils import FIXED_DT, SCREEN_WIDTH, SCREEN_HEIGHT, KEY_SIZE
+from game.objects.digit import Digit, DigitBank
+from game.objects.player import Player
+from game.managers.stage_cache import STAGE_CACHE, load_chunk_digits
+from game.managers.stage_compiler import compiled_path, resolve_stage_path
+from game.managers.stage_timeline import sequence_step
+
+# キャッシュファイルの識別子と形式のバージョン (形式を変えたら上げる)
+REACH_MAGIC = b"DGRG"
+REACH_FORMAT_VERSION = 1
+
+# 足場 1 つ。digit: Digit の番号 (常に読み込む Digit, チャンクの Digit の順), segment: "A", "B+C" など
+Platform = namedtuple("Platform", "digit segment x y width height one_way")
+# 1 ループ内の鍵の出現 1 回分 (時刻はループ先頭からの秒)
+# beat: 出現した拍, platforms: 寿命のうちに鍵に触れられる足場の ((番号, 最短ステップ数), ...)
+KeyReach = namedtuple("KeyReach", "key_index spawn_time expire_time beat x y platforms")
+# 軌道の計算に使うプレイヤーの定数
+PlayerPhysics = namedtuple("PlayerPhysics", "speed jump_power gravity max_fall_speed coyote_time width height")
+
+
+def player_physics():
+    """今の解像度の Player の定数"""
+    player = Player(0, 0, sound_manager=None)
+    return PlayerPhysics(player.speed, player.jump_power, player.gravity, player.max_fall_speed,
+                         player.coyote_time, player.width, player.height)
+
+
+def jump_arcs(physics, max_drop, dt=FIXED_DT):
+    """
+    足場を離れてからの足元の高さの変化 (下が正) をステップごとに並べた軌道のリスト
+    - その場でジャンプ
+    - 足場の端から落ち、コヨーテタイムのうちにジャンプ (落ちてからのステップ数ごと)
+    - ジャンプせずに落ちる (一方通行の足場を下ですり抜ける場合も同じ)
+    どれも max_drop より下まで落ちたところで打ち切る
+    Player.update と同じ順 (コヨーテタイムの判定 -> ジャンプ -> 重力 -> 移動) で進める
+    """
+    # 何ステップ落ちてからでもジャンプできるか
+    jump_delays = [0]
+    coyote_timer = physics.coyote_time
+    while True:
+        coyote_timer -= dt
+        if coyote_timer <= 0:
+            break
+        jump_delays.append(len(jump_delays))
+
+    arcs = []
+    for delay in jump_delays + [None]:
+        dy = 0.0
+        vy = 0.0
+        arc = []
+        while dy <= max_drop:
+            if len(arc) == delay:
+                vy = physics.jump_power
+            vy = min(vy + physics.gravity, physics.max_fall_speed)
+            dy += vy
+            arc.append(dy)
+        arcs.append(arc)
+    return arcs
+
+
+def _landing_tables(arcs):
+    """軌道ごとの (下りに入るステップ, 下りの部分の足元の高さ)。着地のステップを二分探索で引く"""
+    tables = []
+    for arc in arcs:
+        start = 0
+        previous = 0.0
+        for start, dy in enumerate(arc):
+            if dy > previous:
+                break
+            previous = dy
+        tables.append((start, arc[start:]))
+    return tables
+
+
+def _landing_steps(tables, arcs, height):
+    """
+    足元から height (下が正) の高さの足場に上から着地するまでのステップ数の候補
+    軌道ごとに 1 つ (届かない軌道は含めない)
+    """
+    steps = []
+    for (start, falling), arc in zip(tables, arcs):
+        i = bisect_left(falling, height)
+        if i == len(falling):
+            continue
+        n = start + i
+        previous = arc[n - 1] if n > 0 else 0.0
+        if previous <= height:
+            steps.append(n + 1)
+    return steps
+
+
+def _build_edges(platforms, physics, arcs, tables, max_steps):
+    """platforms の各足場から着地できる足場の ((番号, 最短ステップ数), ...)"""
+    speed = physics.speed
+    width = physics.width
+    edges = []
+    for i, source in enumerate(platforms):
+        left = source.x - width
+        right = source.x + source.width
+        targets = []
+        for j, target in enumerate(platforms):
+            if i == j:
+                continue
+            best = None
+            for n in _landing_steps(tables, arcs, target.y - source.y):
+                if n > max_steps or (best is not None and n >= best):
+                    continue
+                reach = n * speed
+                # n ステップで横に動ける範囲と、着地できる範囲 (足場と重なる x) が重なるか
+                if left - reach < target.x + target.width and right + reach > target.x - width:
+                    best = n
+            if best is not None:
+                targets.append((j, best))
+        edges.append(tuple(targets))
+    return tuple(edges)
+
+
+def _touch_steps(source, key_x, key_y, physics, arcs, max_steps):
+    """足場 source から鍵に触れるまでの最短ステップ数 (触れられなければ None)"""
+    speed = physics.speed
+    width = physics.width
+    height = physics.height
+    left = source.x - width
+    right = source.x + source.width
+    # 足場の上に立ったまま触れられる
+    feet = source.y
+    if feet - height < key_y + KEY_SIZE and feet > key_y and left < key_x + KEY_SIZE and right > key_x - width:
+        return 0
+    best = None
+    for arc in arcs:
+        for n, dy in enumerate(arc[:max_steps], 1):
+            if best is not None and n >= best:
+                break
+            feet = source.y + dy
+            reach = n * speed
+            if (feet - height < key_y + KEY_SIZE and feet > key_y
+                    and left - reach < key_x + KEY_SIZE and right + reach > key_x - width):
+                best = n
+                break
+    return best
+
+
+def _key_platforms(platforms, edges, key_x, key_y, physics, arcs, max_steps):
+    """
+    鍵に max_steps ステップ以内に触れられる足場の ((番号, 最短ステップ数), ...)
+    直接触れられる足場から、辺を逆にたどって最短ステップ数を広げる (ダイクストラ法)
+    """
+    reverse = [[] for _ in platforms]
+    for i, targets in enumerate(edges):
+        for j, steps in targets:
+            reverse[j].append((i, steps))
+    best = {}
+    queue = []
+    for i, source in enumerate(platforms):
+        steps = _touch_steps(source, key_x, key_y, physics, arcs, max_steps)
+        if steps is not None:
+            best[i] = steps
+            queue.append((steps, i))
+    heapq.heapify(queue)
+    while queue:
+        steps, j = heapq.heappop(queue)
+        if steps > best.get(j, steps):
+            continue
+        for i, edge_steps in reverse[j]:
+            total = steps + edge_steps
+            if total <= max_steps and total < best.get(i, max_steps + 1):
+                best[i] = total
+                heapq.heappush(queue, (total, i))
+    return tuple(sorted(best.items()))
+
+
+class ReachabilityGraph:
+    """
+    ステージ 1 つ分のグラフ。拍の番号は beats の添字、足場の番号は platforms[拍] の添字
+    時刻はステージ開始 (リスタート) からの秒で受け取り、ループの中の時刻にして引く
+    """
+    def __init__(self, stage_path, loop_period, beats, platforms, edges, keys):
+        self.stage_path = stage_path
+        self.loop_period = loop_period
+        # 1 ループ内の拍の時刻 (昇順)
+        self.beats = beats
+        # 拍ごとの Platform の tuple
+        self.platforms = platforms
+        # 拍ごとの、足場ごとの着地できる足場の ((番号, 最短ステップ数), ...)
+        self.edges = edges
+        # KeyReach の tuple (出現時刻順)
+        self.keys = keys
+
+    def loop_time(self, stage_time):
+        if self.loop_period == float("inf"):
+            return stage_time
+        return stage_time % self.loop_period
+
+    def beat_at(self, stage_time):
+        """stage_time の時点の拍の番号"""
+        return max(0, bisect_right(self.beats, self.loop_time(stage_time)) - 1)
+
+    def platform_under(self, beat, x, y, width, height, tolerance=1.0):
+        """(x, y, width, height) の矩形が立っている足場の番号 (無ければ None)"""
+        feet = y + height
+        for i, platform in enumerate(self.platforms[beat]):
+            if (abs(feet - platform.y) <= tolerance
+                    and x < platform.x + platform.width and x + width > platform.x):
+                return i
+        return None
+
+    def reachable(self, beat, platform):
+        """拍 beat のうちに、足場 platform から何回かのジャンプで行ける足場の番号の集合"""
+        edges = self.edges[beat]
+        seen = {platform}
+        stack = [platform]
+        while stack:
+            for target, _ in edges[stack.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        seen.discard(platform)
+        return seen
+
+    def key_hints(self, stage_time, platform, dt=FIXED_DT):
+        """
+        stage_time に足場 platform (その時点の拍の番号) にいるとき、
+        残りの寿命のうちに取りに行ける出ている鍵の [(KeyReach, 最短ステップ数)]
+        """
+        local = self.loop_time(stage_time)
+        hints = []
+        for key in self.keys:
+            if not key.spawn_time <= local < key.expire_time:
+                continue
+            steps = dict(key.platforms).get(platform)
+            if steps is not None and steps * dt <= key.expire_time - local:
+                hints.append((key, steps))
+        return hints
+
+    def to_payload(self):
+        """marshal に書ける形にする"""
+        return (
+            self.stage_path, self.loop_period, self.beats,
+            tuple(tuple(tuple(p) for p in platforms) for platforms in self.platforms),
+            self.edges,
+            tuple(tuple(key) for key in self.keys),
+        )
+
+    @classmethod
+    def from_payload(cls, payload):
+        stage_path, loop_period, beats, platforms, edges, keys = payload
+        return cls(
+            stage_path, loop_period, beats,
+            tuple(tuple(Platform(*p) for p in beat_platforms) for beat_platforms in platforms),
+            edges,
+            tuple(KeyReach(*key) for key in keys),
+        )
+
+
+def _stage_digits(definition):
+    """常に読み込む Digit とチャンクの Digit の DigitDefinition"""
+    digits = list(definition.digits)
+    if definition.chunks is not None:
+        for key in definition.chunks.keys():
+            digits.extend(load_chunk_digits(definition, key))
+    return digits
+
+
+def build_reachability(stage_path, screen_width=SCREEN_WIDTH, screen_height=SCREEN_HEIGHT,
+                       stage_cache=None, physics=None, dt=FIXED_DT):
+    """ステージのグラフを作る (キャッシュは使わない)"""
+    stage_cache = stage_cache if stage_cache is not None else STAGE_CACHE
+    definition = stage_cache.get(stage_path, screen_width, screen_height)
+    physics = physics if physics is not None else player_physics()
+    timeline = definition.timeline
+    data = definition.data
+
+    # 1 ループ内の拍: いずれかの Digit が切り替わる時刻
+    loop_period = timeline.loop_period
+    beats = {0.0}
+    if loop_period != float("inf"):
+        for beat_times in timeline.digit_beats:
+            beats.update(t for t in beat_times if t < loop_period)
+    beats = tuple(sorted(beats))
+
+    bank = DigitBank()
+    digit_definitions = _stage_digits(definition)
+    digits = [
+        Digit(d_info.x, d_info.y, d_info.width, d_info.height, number=None,
+              properties_override=data.get("segment_properties_override"), bank=bank)
+        for d_info in digit_definitions
+    ]
+    beat_platforms = []
+    for t in beats:
+        platforms = []
+        for index, (d_info, digit) in enumerate(zip(digit_definitions, digits)):
+            if not d_info.sequence:
+                continue
+            step = sequence_step(len(d_info.sequence), d_info.initial_time, t)
+            digit.set_number(d_info.sequence[step.sequence_index])
+            for segment, rect, one_way in digit.get_platform_rects():
+                platforms.append(Platform(index, segment, rect.x, rect.y, rect.width, rect.height, one_way))
+        beat_platforms.append(tuple(platforms))
+
+    # ステージの一番上の足場から world_bottom まで落ちる分だけ軌道を求める
+    tops = [platform.y for platforms in beat_platforms for platform in platforms]
+    max_drop = data.get("world_bottom", screen_height) - min(tops, default=0)
+    arcs = jump_arcs(physics, max_drop, dt)
+    tables = _landing_tables(arcs)
+    max_steps = max(len(arc) for arc in arcs)
+    beat_edges = tuple(_build_edges(platforms, physics, arcs, tables, max_steps) for platforms in beat_platforms)
+
+    keys = []
+    for window in timeline.key_windows:
+        spawn = definition.key_spawns[window.key_index]
+        beat = max(0, bisect_right(beats, window.spawn_time) - 1)
+        lifespan_steps = int((window.expire_time - window.spawn_time) / dt)
+        platforms = _key_platforms(beat_platforms[beat], beat_edges[beat], spawn["x"], spawn["y"],
+                                   physics, arcs, min(lifespan_steps, max_steps * len(beat_platforms[beat])))
+        keys.append(KeyReach(window.key_index, window.spawn_time, window.expire_time, beat,
+                             spawn["x"], spawn["y"], platforms))
+
+    return ReachabilityGraph(resolve_stage_path(stage_path), loop_period, beats,
+                             tuple(beat_platforms), beat_edges, tuple(keys))
+
+
+def reachability_path(stage_path, screen_width=SCREEN_WIDTH, screen_height=SCREEN_HEIGHT):
+    """stage/stage1-1.json -> stage/compiled/stage1-1.1078x768.reach.bin"""
+    path = compiled_path(resolve_stage_path(stage_path), screen_width, screen_height)
+    return os.path.splitext(path)[0] + ".reach.bin"
+
+
+def _cache_stamp(stage_path, physics, dt):
+    """キャッシュが使えるかの判定に使う値 (JSON の CRC, Player の定数, dt)"""
+    try:
+        with open(resolve_stage_path(stage_path), "rb") as f:
+            crc = zlib.crc32(f.read())
+    except OSError:
+        crc = None
+    return crc, tuple(physics), dt
+
+
+def load_reachability(stage_path, screen_width=SCREEN_WIDTH, screen_height=SCREEN_HEIGHT,
+                      stage_cache=None, dt=FIXED_DT):
+    """
+    ステージのグラフを返す。キャッシュが無い・古い場合は作って書き出す
+    (書けない環境では書かずにそのまま返す)
+    """
+    physics = player_physics()
+    stamp = _cache_stamp(stage_path, physics, dt)
+    path = reachability_path(stage_path, screen_width, screen_height)
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(REACH_MAGIC)) == REACH_MAGIC:
+                version, cached_stamp, payload = marshal.loads(f.read())
+                if version == REACH_FORMAT_VERSION and cached_stamp == stamp and stamp[0] is not None:
+                    return ReachabilityGraph.from_payload(payload)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    graph = build_reachability(stage_path, screen_width, screen_height, stage_cache, physics, dt)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(REACH_MAGIC)
+            f.write(marshal.dumps((REACH_FORMAT_VERSION, stamp, graph.to_payload())))
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return graph
@@ -0,0 +1,233 @@
+# game/core/replay.py
+"""
+プレイの記録と再生。
+ステップごとの入力 (左/右/下/ジャンプの 4 ビット) と乱数のシードだけで同じ展開を再現できる。
+一定間隔で SimSnapshot をキーフレームとして埋め込み、途中へのシーク・早送りは
+直前のキーフレームから進める。ステップごとの状態ハッシュも残し、再生時に食い違いを検出する。
+
+ファイルは JSON:
+  inputs: 入力が変わったステップだけの [前の変化からのステップ数, ビット] (差分符号化)
+  restarts: R キー・練習モードの切り替えでリスタートした [ステップ, 練習モードの位置]
+  rewinds: 巻き戻した [ステップ, 戻した先の SimSnapshot]
+  keyframes: [ステップ, SimSnapshot]
+  hashes: ステップごとの状態ハッシュ (uint32 リトルエンディアン) の base64
+"""
+import sys
+import json
+import base64
+from array import array
+from bisect import bisect_right
+from game.game_utils import FIXED_DT
+from game.core.simulation import Simulation, SimSnapshot, InputState
+
+REPLAY_VERSION = 1
+# キーフレームを入れる間隔 (ステップ、10 秒分)
+KEYFRAME_INTERVAL = 600
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_DOWN = 4
+INPUT_JUMP = 8
+
+# ビット -> InputState
+_INPUT_STATES = tuple(
+    InputState(bool(bits & INPUT_LEFT), bool(bits & INPUT_RIGHT), bool(bits & INPUT_DOWN), bool(bits & INPUT_JUMP))
+    for bits in range(16)
+)
+
+
+def pack_input(inputs):
+    """InputState を 4 ビットにする"""
+    return ((INPUT_LEFT if inputs.left else 0) | (INPUT_RIGHT if inputs.right else 0)
+            | (INPUT_DOWN if inputs.down else 0) | (INPUT_JUMP if inputs.jump else 0))
+
+
+def unpack_input(bits):
+    return _INPUT_STATES[bits]
+
+
+def _snapshot_from_json(values):
+    snapshot = SimSnapshot(*values)
+    return snapshot._replace(
+        player=tuple(snapshot.player),
+        keys=tuple(tuple(key) for key in snapshot.keys),
+    )
+
+
+class Replay:
+    """1 回のプレイの記録。inputs はステップごとの入力ビット"""
+    def __init__(self, stage_path, seed, practice_index=None, dt=FIXED_DT):
+        self.stage_path = stage_path
+        self.seed = seed
+        # 開始時の練習モードの位置
+        self.practice_index = practice_index
+        self.dt = dt
+        self.inputs = array("B")
+        # (ステップ, 練習モードの位置): そのステップの入力の前にリスタートする
+        self.restarts = []
+        # (ステップ, SimSnapshot): そのステップの入力の前に巻き戻す
+        self.rewinds = []
+        # (ステップ, SimSnapshot): そのステップの入力の前の状態 (ステップ順)
+        self.keyframes = []
+        # ステップごとの、入力を処理した後の状態ハッシュ
+        self.hashes = array("I")
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def save(self, path):
+        changes = []
+        previous_step = 0
+        previous_bits = 0
+        for step, bits in enumerate(self.inputs):
+            if bits != previous_bits:
+                changes.append([step - previous_step, bits])
+                previous_step = step
+                previous_bits = bits
+        hashes = array("I", self.hashes)
+        if sys.byteorder != "little":
+            hashes.byteswap()
+        data = {
+            "version": REPLAY_VERSION,
+            "stage": self.stage_path,
+            "seed": self.seed,
+            "practice_index": self.practice_index,
+            "dt": self.dt,
+            "length": len(self.inputs),
+            "inputs": changes,
+            "restarts": self.restarts,
+            "rewinds": [[step, snapshot] for step, snapshot in self.rewinds],
+            "keyframes": [[step, snapshot] for step, snapshot in self.keyframes],
+            "hashes": base64.b64encode(hashes.tobytes()).decode("ascii"),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != REPLAY_VERSION:
+            raise ValueError(f"unsupported replay version: {data.get('version')}")
+        replay = cls(data["stage"], data["seed"], data["practice_index"], data["dt"])
+        # 差分から 1 ステップ 1 バイトに戻す
+        inputs = replay.inputs
+        bits = 0
+        for delta, next_bits in data["inputs"]:
+            inputs.extend([bits] * delta)
+            bits = next_bits
+        inputs.extend([bits] * (data["length"] - len(inputs)))
+        replay.restarts = [(step, index) for step, index in data["restarts"]]
+        replay.rewinds = [(step, _snapshot_from_json(values)) for step, values in data.get("rewinds", ())]
+        replay.keyframes = [(step, _snapshot_from_json(values)) for step, values in data["keyframes"]]
+        replay.hashes.frombytes(base64.b64decode(data["hashes"]))
+        if sys.byteorder != "little":
+            replay.hashes.byteswap()
+        return replay
+
+
+class ReplayRecorder:
+    """Simulation を進めながら Replay に記録する"""
+    def __init__(self, sim, keyframe_interval=KEYFRAME_INTERVAL):
+        self.sim = sim
+        self.keyframe_interval = keyframe_interval
+        self.replay = Replay(sim.stage_path, sim.stage_manager.seed, sim.practice_index)
+
+    def step(self, inputs, dt=FIXED_DT):
+        """Simulation.step と同じ。入力と状態ハッシュを記録する"""
+        replay = self.replay
+        step = len(replay.inputs)
+        if step % self.keyframe_interval == 0:
+            replay.keyframes.append((step, self.sim.snapshot()))
+        replay.inputs.append(pack_input(inputs))
+        restarted = self.sim.step(inputs, dt)
+        replay.hashes.append(self.sim.state_hash())
+        return restarted
+
+    def restart(self):
+        """リスタートして記録する (練習モードの位置は先に Simulation に設定しておく)"""
+        self.replay.restarts.append((len(self.replay.inputs), self.sim.practice_index))
+        self.sim.restart()
+
+    def rewind(self, snapshot):
+        """snapshot (RewindBuffer から取り出したもの) に巻き戻して記録する"""
+        self.replay.rewinds.append((len(self.replay.inputs), snapshot))
+        self.sim.restore(snapshot)
+
+
+class ReplayPlayer:
+    """
+    Replay を Simulation で再生する。
+    記録した状態ハッシュと比べ、最初に食い違ったステップを mismatch_step に残す
+    """
+    def __init__(self, replay, sound_manager=None, stage_cache=None, on_restart=None, on_rewind=None):
+        """
+        on_restart: 記録したリスタート (R キー・練習モード) を再生したときに呼ぶ関数
+        on_rewind: 記録した巻き戻しを再生したときに呼ぶ関数
+        """
+        self.replay = replay
+        self.on_restart = on_restart
+        self.on_rewind = on_rewind
+        self.sim = Simulation(replay.stage_path, sound_manager, stage_cache,
+                              practice_index=replay.practice_index, seed=replay.seed)
+        self.step_index = 0
+        self.mismatch_step = None
+        self._restarts = dict(replay.restarts)
+        self._rewinds = dict(replay.rewinds)
+        self._keyframe_steps = [step for step, _ in replay.keyframes]
+
+    @property
+    def done(self):
+        return self.step_index >= len(self.replay)
+
+    def step(self):
+        """
+        記録の 1 ステップを再生する。戻り値は Simulation.step と同じ
+        (ゲームオーバーでリスタートしたら True)
+        """
+        if self.done:
+            return False
+        step = self.step_index
+        if step in self._restarts:
+            self.sim.set_practice_index(self._restarts[step])
+            self.sim.restart()
+            if self.on_restart is not None:
+                self.on_restart()
+        if step in self._rewinds:
+            self.sim.restore(self._rewinds[step])
+            if self.on_rewind is not None:
+                self.on_rewind()
+        restarted = self.sim.step(unpack_input(self.replay.inputs[step]), self.replay.dt)
+        if (self.mismatch_step is None and step < len(self.replay.hashes)
+                and self.sim.state_hash() != self.replay.hashes[step]):
+            self.mismatch_step = step
+        self.step_index = step + 1
+        return restarted
+
+    def seek(self, step):
+        """
+        step ステップ目の入力の前の状態にする (効果音は鳴らさない)
+        直前のキーフレームから進めるので、最初から再生し直さない
+        """
+        step = max(0, min(step, len(self.replay)))
+        position = bisect_right(self._keyframe_steps, step) - 1
+        if position >= 0:
+            keyframe_step, snapshot = self.replay.keyframes[position]
+            # 今の位置の方が近ければそこから進める
+            if not keyframe_step <= self.step_index <= step:
+                self.sim.restore(snapshot)
+                self.step_index = keyframe_step
+        sound_manager = self.sim.stage_manager.sound_manager
+        callbacks = self.on_restart, self.on_rewind
+        self.sim.set_sound_manager(None)
+        self.on_restart = self.on_rewind = None
+        while self.step_index < step:
+            self.step()
+        self.sim.set_sound_manager(sound_manager)
+        self.on_restart, self.on_rewind = callbacks
+
+    def verify(self):
+        """最後まで再生し、食い違ったステップ (無ければ None) を返す"""
+        while not self.done:
+            self.step()
+        return self.mismatch_step
@@ -0,0 +1,148 @@
+# game/core/rewind.py
+"""
+巻き戻し用のリングバッファ。
+数ステップごとに SimSnapshot と同じ内容を、あらかじめ確保した array('d') の 1 行に書き込む。
+記録のたびに tuple や dict を作らないので、毎ステップ呼んでも時間はほとんどかからない。
+巻き戻すときだけ SimSnapshot に戻して Simulation.restore に渡す
+(restore は経過時間によらずタイムラインから直接求めるので、どこまで戻しても同じ手間)。
+"""
+from array import array
+from game.game_utils import FIXED_DT
+from game.core.simulation import SimSnapshot, PLAYER_FIELDS
+
+# 何ステップごとに記録するか
+REWIND_INTERVAL = 4
+# 記録しておく数 (REWIND_INTERVAL ステップごとに 5 秒分)
+REWIND_CAPACITY = 75
+# 1 回の巻き戻しで戻る秒数
+REWIND_SECONDS = 2.0
+# 1 レコードに入れる出ている鍵の数 (超えた分は記録しない)
+MAX_REWIND_KEYS = 8
+
+# 1 レコードの並び: スカラー値, プレイヤー (PLAYER_FIELDS の順), 鍵の数, 鍵 (x, y, 出現時刻, 取ったか) × MAX_REWIND_KEYS
+(_CURRENT_TIME, _STAGE_TIME, _PRACTICE_INDEX, _PREV_JUMP, _STEPS, _DEATHS, _CONSECUTIVE_KEYS,
+ _CLEAR_TIMER_START, _IS_STAGE_CLEAR, _GROUP_B_ACTIVATED, _GROUP_A_REMOVED, _PLAYER) = range(12)
+_KEY_COUNT = _PLAYER + len(PLAYER_FIELDS)
+_KEYS = _KEY_COUNT + 1
+RECORD_SIZE = _KEYS + MAX_REWIND_KEYS * 4
+
+# 整数・真偽値に戻すプレイヤーの属性
+_PLAYER_TYPES = tuple(
+    bool if name in ("on_ground", "is_game_over", "facing_left") else int if name == "key_count" else float
+    for name in PLAYER_FIELDS
+)
+# practice_index / clear_timer_start が None のときの値
+_NONE = -1.0
+
+
+class RewindBuffer:
+    def __init__(self, capacity=REWIND_CAPACITY, interval=REWIND_INTERVAL):
+        self.capacity = capacity
+        self.interval = interval
+        self.data = array("d", bytes(8 * RECORD_SIZE * capacity))
+        # 次に書き込むレコードの位置と、有効なレコードの数
+        self.head = 0
+        self.count = 0
+        self._steps_until_record = 0
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self._steps_until_record = 0
+
+    def __len__(self):
+        return self.count
+
+    def record(self, sim):
+        """毎ステップ呼ぶ。interval ステップごとに sim の状態を書き込む"""
+        if self._steps_until_record > 0:
+            self._steps_until_record -= 1
+            return
+        self._steps_until_record = self.interval - 1
+
+        data = self.data
+        base = self.head * RECORD_SIZE
+        stage_manager = sim.stage_manager
+        current_time = stage_manager.current_time
+        data[base + _CURRENT_TIME] = current_time
+        data[base + _STAGE_TIME] = current_time - stage_manager.stage_start_time
+        practice_index = sim.practice_index
+        data[base + _PRACTICE_INDEX] = _NONE if practice_index is None else practice_index
+        data[base + _PREV_JUMP] = sim.prev_jump
+        data[base + _STEPS] = sim.steps
+        data[base + _DEATHS] = sim.deaths
+        data[base + _CONSECUTIVE_KEYS] = stage_manager.consecutive_keys
+        clear_timer_start = stage_manager.clear_timer_start
+        data[base + _CLEAR_TIMER_START] = _NONE if clear_timer_start is None else clear_timer_start
+        data[base + _IS_STAGE_CLEAR] = stage_manager.is_stage_clear
+        data[base + _GROUP_B_ACTIVATED] = stage_manager.groupB_activated
+        data[base + _GROUP_A_REMOVED] = stage_manager.groupA_removed
+
+        player = sim.player
+        offset = base + _PLAYER
+        for name in PLAYER_FIELDS:
+            data[offset] = getattr(player, name)
+            offset += 1
+
+        keys = stage_manager.active_keys
+        key_count = min(len(keys), MAX_REWIND_KEYS)
+        data[base + _KEY_COUNT] = key_count
+        offset = base + _KEYS
+        for i in range(key_count):
+            key = keys[i]
+            data[offset] = key.x
+            data[offset + 1] = key.y
+            data[offset + 2] = key.spawn_time
+            data[offset + 3] = key.collected
+            offset += 4
+
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def snapshot(self, back=0):
+        """最新から back 個前のレコードを SimSnapshot にする (無ければ None)"""
+        if back >= self.count:
+            return None
+        data = self.data
+        base = ((self.head - 1 - back) % self.capacity) * RECORD_SIZE
+        practice_index = data[base + _PRACTICE_INDEX]
+        clear_timer_start = data[base + _CLEAR_TIMER_START]
+        offset = base + _KEYS
+        keys = []
+        for _ in range(int(data[base + _KEY_COUNT])):
+            x, y, spawn_time, collected = data[offset:offset + 4]
+            keys.append((x, y, spawn_time, bool(collected)))
+            offset += 4
+        return SimSnapshot(
+            current_time=data[base + _CURRENT_TIME],
+            stage_time=data[base + _STAGE_TIME],
+            practice_index=None if practice_index == _NONE else int(practice_index),
+            prev_jump=bool(data[base + _PREV_JUMP]),
+            steps=int(data[base + _STEPS]),
+            deaths=int(data[base + _DEATHS]),
+            consecutive_keys=int(data[base + _CONSECUTIVE_KEYS]),
+            clear_timer_start=None if clear_timer_start == _NONE else clear_timer_start,
+            is_stage_clear=bool(data[base + _IS_STAGE_CLEAR]),
+            groupB_activated=bool(data[base + _GROUP_B_ACTIVATED]),
+            groupA_removed=bool(data[base + _GROUP_A_REMOVED]),
+            player=tuple(
+                kind(data[base + _PLAYER + i]) for i, kind in enumerate(_PLAYER_TYPES)
+            ),
+            keys=tuple(keys),
+        )
+
+    def rewind(self, seconds=REWIND_SECONDS, dt=FIXED_DT):
+        """
+        seconds 秒ほど前のレコードを SimSnapshot で返し、それより新しいレコードは捨てる
+        (続けて巻き戻すとさらに前に戻る)。記録が足りなければ一番古いもの、無ければ None
+        """
+        if self.count == 0:
+            return None
+        back = min(max(0, round(seconds / (dt * self.interval)) - 1), self.count - 1)
+        snapshot = self.snapshot(back)
+        # 戻したレコードを最新として残す
+        self.head = (self.head - back) % self.capacity
+        self.count -= back
+        self._steps_until_record = self.interval - 1
+        return snapshot
@@ -0,0 +1,220 @@
+# game/core/simulation.py
+"""
+画面・入力デバイスに依存しないゲームの中身 (ステージのタイムライン・Digit・プレイヤー・鍵)。
+時刻は step に渡す dt だけで進み、入力は InputState で受け取るので、
+画面なしで実時間より速く回せる (テスト・ボット・ベンチマーク用)。
+GameScene はこの上に描画・音楽・カメラ・シーン遷移を載せる。
+"""
+import zlib
+from collections import namedtuple
+from game.game_utils import FIXED_DT
+from game.objects.player import Player
+from game.managers.stagemanager import StageManager, TIME_EPSILON
+
+# 1 ステップ分の入力 (押しているかどうか)
+# jump は押しっぱなしの状態。押した瞬間は Simulation が前のステップと比べて求める
+InputState = namedtuple("InputState", "left right down jump")
+NO_INPUT = InputState(False, False, False, False)
+
+# スナップショットに残すプレイヤーの属性
+PLAYER_FIELDS = (
+    "x", "y", "prev_x", "prev_y", "velocity_x", "velocity_y",
+    "on_ground", "is_game_over", "coyote_timer", "facing_left", "key_count",
+)
+
+# ある時点のシミュレーションの状態 (リプレイのキーフレーム・巻き戻し用)
+# Digit の数字や出ている鍵はタイムラインから StageManager.seek で作り直せるので持たず、
+# プレイヤーとタイムラインから求められない分 (取った鍵・連続取得数・最終ステージの切り替え) だけを持つ
+# player: PLAYER_FIELDS の順の値, keys: 出ている鍵の (x, y, 出現時刻, 取ったか)
+# 値は数値・真偽値・None と tuple だけなので、そのまま JSON にできる
+SimSnapshot = namedtuple(
+    "SimSnapshot",
+    "current_time stage_time practice_index prev_jump steps deaths consecutive_keys "
+    "clear_timer_start is_stage_clear groupB_activated groupA_removed player keys"
+)
+
+
+class Simulation:
+    def __init__(self, stage_path, sound_manager=None, stage_cache=None, practice_index=None, seed=None):
+        """
+        sound_manager: 効果音を鳴らす SoundManager (None なら鳴らさない)
+        practice_index: 練習モードで開始する sequence の位置 (None なら通常プレイ)
+        seed: ステージの乱数のシード (None なら毎回変わる。StageManager.seed で読める)
+        """
+        self.stage_path = stage_path
+        self.stage_manager = StageManager(sound_manager, stage_cache, seed)
+        self.stage_manager.load_stage(stage_path)
+
+        self.practice_index = None
+        self.set_practice_index(practice_index)
+
+        player_start = self.player_start
+        self.player = Player(x=player_start["x"], y=player_start["y"], sound_manager=sound_manager)
+        self.items = []
+        self.prev_jump = False
+
+        # 進めたステップ数・ゲームオーバーの回数
+        self.steps = 0
+        self.deaths = 0
+
+        self.restart()
+
+    @property
+    def player_start(self):
+        return self.stage_manager.stage_data.get("player_start", {"x": 400, "y": 50})
+
+    @property
+    def time(self):
+        """シミュレーション時刻 (秒)"""
+        return self.stage_manager.current_time
+
+    @property
+    def is_stage_clear(self):
+        return self.stage_manager.is_stage_clear
+
+    def set_sound_manager(self, sound_manager):
+        """効果音の出し先を差し替える (None で無音)"""
+        self.stage_manager.sound_manager = sound_manager
+        self.player.sound_manager = sound_manager
+
+    def set_practice_index(self, index):
+        """練習モードの開始位置を設定する (範囲外や最終ステージでは通常プレイ)"""
+        stage_manager = self.stage_manager
+        if index is None or stage_manager.final_stage or stage_manager.timeline is None:
+            self.practice_index = None
+        elif 0 <= index < stage_manager.total_sequences:
+            self.practice_index = index
+
+    def restart(self):
+        """プレイヤーを開始位置に戻し、ステージを最初から (練習モードなら指定の sequence 位置から) 始める"""
+        player_start = self.player_start
+        player = self.player
+        player.x = player_start["x"]
+        player.y = player_start["y"]
+        player.velocity_y = 0
+        player.on_ground = False
+        player.is_game_over = False
+        player.coyote_timer = 0.0
+        player.snap_interpolation()
+
+        self.items.clear()
+        if self.practice_index is None:
+            self.stage_manager.new_game_reset()
+        else:
+            stage_time = self.stage_manager.timeline.time_of_sequence_index(self.practice_index)
+            self.stage_manager.seek(stage_time, self.items)
+        self.stage_manager.update(0, self.items, self.player)
+
+    def step(self, inputs, dt=FIXED_DT):
+        """
+        inputs (InputState) で dt 秒進める。
+        ステージクリア後は何もしない。前のステップでゲームオーバーになっていたら
+        このステップはリスタートだけ行い True を返す
+        """
+        if self.stage_manager.is_stage_clear:
+            return False
+        if self.player.is_game_over:
+            self.deaths += 1
+            self.restart()
+            return True
+
+        jump_pressed = inputs.jump and not self.prev_jump
+        self.prev_jump = inputs.jump
+
+        # ステージ、Digit, プレイヤーの更新
+        self.stage_manager.update(dt, self.items, self.player)
+        self.stage_manager.digit_bank.update(dt)
+        self.player.update(
+            dt,
+            inputs,
+            self.stage_manager.collision_world,
+            jump_pressed,
+            items=self.items,
+            stage_manager=self.stage_manager
+        )
+        self.items = [item for item in self.items if not item.collected]
+        self.steps += 1
+        return False
+
+    def state_hash(self):
+        """
+        今の状態のハッシュ (リプレイで同じ展開になっているかの確認用)
+        時刻の丸め誤差で変わる予定時刻などは含めず、プレイヤーの状態と進行だけから求める
+        """
+        stage_manager = self.stage_manager
+        player = self.player
+        state = (
+            player.x, player.y, player.velocity_x, player.velocity_y, player.coyote_timer,
+            player.on_ground, player.is_game_over, player.key_count,
+            stage_manager.consecutive_keys, stage_manager.current_loop, stage_manager.is_stage_clear,
+            stage_manager.groupB_activated, stage_manager.groupA_removed,
+            tuple(controller.sequence_index for controller in stage_manager.digit_controllers),
+            sorted((item.x, item.y) for item in self.items),
+        )
+        return zlib.crc32(repr(state).encode())
+
+    def snapshot(self):
+        """今の状態を SimSnapshot にする"""
+        stage_manager = self.stage_manager
+        return SimSnapshot(
+            current_time=stage_manager.current_time,
+            stage_time=stage_manager.current_time - stage_manager.stage_start_time,
+            practice_index=self.practice_index,
+            prev_jump=self.prev_jump,
+            steps=self.steps,
+            deaths=self.deaths,
+            consecutive_keys=stage_manager.consecutive_keys,
+            clear_timer_start=stage_manager.clear_timer_start,
+            is_stage_clear=stage_manager.is_stage_clear,
+            groupB_activated=stage_manager.groupB_activated,
+            groupA_removed=stage_manager.groupA_removed,
+            player=tuple(getattr(self.player, name) for name in PLAYER_FIELDS),
+            keys=tuple((key.x, key.y, key.spawn_time, key.collected) for key in stage_manager.active_keys),
+        )
+
+    def restore(self, snapshot):
+        """
+        snapshot の状態に戻す。途中の切り替えは再生せず、タイムラインから直接求める
+        (効果音も鳴らさない)
+        """
+        stage_manager = self.stage_manager
+        player = self.player
+        for name, value in zip(PLAYER_FIELDS, snapshot.player):
+            setattr(player, name, value)
+        self.practice_index = snapshot.practice_index
+        self.prev_jump = snapshot.prev_jump
+        self.steps = snapshot.steps
+        self.deaths = snapshot.deaths
+
+        sound_manager = stage_manager.sound_manager
+        self.set_sound_manager(None)
+        items = []
+        stage_manager.current_time = snapshot.current_time
+        stage_manager.seek(snapshot.stage_time, items)
+        # 最終ステージの切り替えは、途中から読み込むチャンクの Digit にも効くよう update より先に戻す
+        stage_manager.groupB_activated = snapshot.groupB_activated
+        stage_manager.groupA_removed = snapshot.groupA_removed
+        if snapshot.groupB_activated:
+            for digit in stage_manager.digit_index.group("A"):
+                digit.active = True
+        if snapshot.groupA_removed:
+            for digit in stage_manager.digit_index.group_below("B", stage_manager.digit_removal_threshold):
+                digit.active = False
+        # 今の時刻ちょうどの予定 (切り替え・鍵の出現) を済ませる
+        stage_manager.update(0, items, player)
+
+        # 取った鍵は、タイムラインから作り直した鍵のうち位置と出現時刻が同じものに反映する
+        for x, y, spawn_time, collected in snapshot.keys:
+            if not collected:
+                continue
+            for key in stage_manager.active_keys:
+                if key.x == x and key.y == y and abs(key.spawn_time - spawn_time) < TIME_EPSILON:
+                    key.collected = True
+                    if key in items:
+                        items.remove(key)
+                    break
+        stage_manager.consecutive_keys = snapshot.consecutive_keys
+        stage_manager.clear_timer_start = snapshot.clear_timer_start
+        stage_manager.is_stage_clear = snapshot.is_stage_clear
+        self.items = items
+        self.set_sound_manager(sound_manager)
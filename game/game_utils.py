@@ -24,6 +24,12 @@ SCREEN_WIDTH, SCREEN_HEIGHT = get_optimal_screen_size()
 # フレームレート設定
 FPS = 60
 
+# シミュレーションの固定時間ステップ（秒）
+FIXED_DT = 1.0 / FPS
+# 1 描画フレームで進めるシミュレーションの最大ステップ数
+# これを超えた遅れは切り捨てる（処理落ちで追いつけなくなるのを防ぐ）
+MAX_SIM_STEPS = 5
+
 # アイテムサイズ計算
 KEY_SIZE = int(SCREEN_WIDTH * 0.043)
 
@@ -16,13 +16,18 @@ except Exception as e:
     import traceback
     traceback.print_exc()
 
-from game.game_utils import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, resource_path
+from game.game_utils import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, FIXED_DT, MAX_SIM_STEPS, resource_path
 from game.managers.soundmanager import SoundManager
 from game.scenes.title_scene import TitleScene
 
+# ミキサー設定 (バッファ分が再生の遅れになる)
+AUDIO_FREQUENCY = 44100
+AUDIO_BUFFER = 256
+
 # 非同期版のメイン関数
-async def async_main():
-    pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=256)
+async def async_main(replay_path=None):
+    """replay_path: 指定するとタイトルの代わりにそのリプレイを再生する"""
+    pygame.mixer.pre_init(frequency=AUDIO_FREQUENCY, size=-16, channels=2, buffer=AUDIO_BUFFER)
     pygame.init()
     pygame.mixer.init()
     pygame.font.init()
@@ -31,7 +36,7 @@ async def async_main():
     pygame.display.set_caption("dIGIT WorLd")
     # サウンド読み込み
     sound_dir = resource_path("assets/sound")
-    sound_manager = SoundManager(sound_dir)
+    sound_manager = SoundManager(sound_dir, output_latency=AUDIO_BUFFER / AUDIO_FREQUENCY)
 
     sound_settings = {
         "jump":         ("jump.ogg", 0.05),
@@ -61,11 +66,21 @@ async def async_main():
     
     clock = pygame.time.Clock()
 
-    current_scene = TitleScene(game_screen, sound_manager)
+    if replay_path:
+        from game.core.replay import Replay
+        from game.scenes.game_scene import GameScene
+        replay = Replay.load(replay_path)
+        current_scene = GameScene(game_screen, sound_manager, replay.stage_path, replay=replay)
+    else:
+        current_scene = TitleScene(game_screen, sound_manager)
+    # 描画に使われずに残っているシミュレーション時間
+    accumulator = 0.0
 
     # メインゲームループ
+    # シミュレーションは FIXED_DT 刻みで進め、描画はその間を補間する
     while current_scene.is_running:
-        dt = clock.tick(FPS) / 1000.0
+        frame_time = clock.tick(FPS) / 1000.0
+        accumulator += min(frame_time, FIXED_DT * MAX_SIM_STEPS)
 
         events = pygame.event.get()
         for event in events:
@@ -74,13 +89,21 @@ async def async_main():
                 return  # 非同期関数では sys.exit() を使わない
                 
         current_scene.handle_events(events)
-        current_scene.update(dt)
+
+        # 遅れている分だけ固定ステップを複数回回す
+        while accumulator >= FIXED_DT and not current_scene.next_scene:
+            current_scene.update(FIXED_DT)
+            accumulator -= FIXED_DT
+
+        # 次のステップまでの割合で描画位置を補間する
+        current_scene.render_alpha = min(accumulator / FIXED_DT, 1.0)
         current_scene.draw()
         pygame.display.flip()
 
         if current_scene.next_scene:
             current_scene.cleanup()
             current_scene = current_scene.next_scene
+            accumulator = 0.0
         
         # ブラウザ環境のためのフレーム待機
         await asyncio.sleep(0)
@@ -89,7 +112,11 @@ async def async_main():
 
 # 元のmain関数も互換性のために残しておく
 def main():
-    asyncio.run(async_main())
+    # python -m game.main --replay replays/xxx.json でリプレイを再生する
+    replay_path = None
+    if "--replay" in sys.argv[1:-1]:
+        replay_path = sys.argv[sys.argv.index("--replay") + 1]
+    asyncio.run(async_main(replay_path))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,5 +1,10 @@
 # game/managers/__init__.py
 from .stagemanager import StageManager
 from .soundmanager import SoundManager
+from .collision_world import CollisionWorld
+from .event_scheduler import EventScheduler
+from .stage_timeline import StageTimeline
+from .stage_cache import StageCache
+from .digit_index import DigitIndex
 
-__all__ = ['StageManager', 'SoundManager']
\ No newline at end of file
+__all__ = ['StageManager', 'SoundManager', 'CollisionWorld', 'EventScheduler', 'StageTimeline', 'StageCache', 'DigitIndex']
\ No newline at end of file
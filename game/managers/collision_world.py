@@ -0,0 +1,209 @@
+# game/managers/collision_world.py
+import numpy as np
+
+# 1 つの Digit が持ちうる足場の枠
+# get_platform_rects() の並び順 (B/C → E/F → A → D → G) と同じ順番にする
+PLATFORM_SLOTS = {
+    "B+C": 0, "B": 0, "C": 1,
+    "E+F": 2, "E": 2, "F": 3,
+    "A": 4, "D": 5, "G": 6,
+}
+SLOTS_PER_DIGIT = 7
+
+# 空間ハッシュのセルの大きさ (px)
+GRID_CELL_SIZE = 128
+
+
+class UniformGrid:
+    """
+    足場の枠番号を登録する一様グリッド (空間ハッシュ)。
+    矩形が掛かるセルすべてに番号を登録し、近くのセルだけを問い合わせる。
+    """
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        # 枠番号 -> 登録したセル範囲 (削除用)
+        self._slot_ranges = {}
+
+    def _cell_range(self, left, top, right, bottom):
+        size = self.cell_size
+        # right/bottom は矩形に含まれないので 1 引いてからセルを求める
+        return left // size, top // size, (right - 1) // size, (bottom - 1) // size
+
+    def insert(self, slot, rect):
+        cell_range = self._cell_range(rect.left, rect.top, rect.right, rect.bottom)
+        cx0, cy0, cx1, cy1 = cell_range
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells.setdefault((cx, cy), set()).add(slot)
+        self._slot_ranges[slot] = cell_range
+
+    def remove(self, slot):
+        cell_range = self._slot_ranges.pop(slot, None)
+        if cell_range is None:
+            return
+        cx0, cy0, cx1, cy1 = cell_range
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    cell.discard(slot)
+                    if not cell:
+                        del self.cells[(cx, cy)]
+
+    def query(self, rect):
+        """rect が掛かるセルに登録された枠番号を昇順で返す"""
+        cx0, cy0, cx1, cy1 = self._cell_range(rect.left, rect.top, rect.right, rect.bottom)
+        found = set()
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        return sorted(found)
+
+    def clear(self):
+        self.cells.clear()
+        self._slot_ranges.clear()
+
+
+class CollisionWorld:
+    """
+    フレームごとの足場スナップショット。
+    全 Digit の足場を left/top/right/bottom/one_way の平坦な配列に並べ、
+    グリッドで絞り込んだ近くの足場だけを配列演算でまとめて判定する。
+    有効な足場の枠はグリッドに登録されているものだけ (配列の値は登録中の枠でのみ意味を持つ)。
+    Digit の platform_version が変わったときだけ、その Digit の枠とグリッドを書き直す。
+    """
+    def __init__(self, digits=(), cell_size=GRID_CELL_SIZE):
+        self.grid = UniformGrid(cell_size)
+        self.set_digits(digits)
+
+    def set_digits(self, digits):
+        """対象の Digit 一覧を差し替える (配列は作り直し)"""
+        self.digits = digits
+        size = len(digits) * SLOTS_PER_DIGIT
+        self.left = np.zeros(size, dtype=np.int64)
+        self.top = np.zeros(size, dtype=np.int64)
+        self.right = np.zeros(size, dtype=np.int64)
+        self.bottom = np.zeros(size, dtype=np.int64)
+        self.one_way = np.zeros(size, dtype=bool)
+        # 押し戻し計算用に元の Rect も保持する
+        self.rects = [None] * size
+        self._versions = [None] * len(digits)
+        self.grid.clear()
+        # 全 Digit が同じ DigitBank を使う (ステージ) なら、バージョンを配列でまとめて比べる
+        banks = {id(digit.bank) for digit in digits}
+        if len(banks) == 1:
+            self._bank = digits[0].bank
+            self._slots = np.array([digit.slot for digit in digits], dtype=np.intp)
+            self._version_array = np.full(len(digits), -1, dtype=np.int64)
+        else:
+            self._bank = None
+
+    def refresh(self):
+        """変化した Digit の足場だけ配列に反映する"""
+        if len(self._versions) != len(self.digits):
+            self.set_digits(self.digits)
+        if self._bank is not None:
+            versions = self._bank.platform_version[self._slots]
+            changed = np.flatnonzero(versions != self._version_array)
+            for i in changed.tolist():
+                self._write_digit(i, self.digits[i])
+            self._version_array[changed] = versions[changed]
+            return
+        for i, digit in enumerate(self.digits):
+            if digit.platform_version != self._versions[i]:
+                self._write_digit(i, digit)
+                self._versions[i] = digit.platform_version
+
+    def _write_digit(self, index, digit):
+        base = index * SLOTS_PER_DIGIT
+        # 空いた枠の left/top/right/bottom は古い値のまま残るが、
+        # 判定はグリッドに登録された枠だけを見るので参照されない
+        for slot in range(base, base + SLOTS_PER_DIGIT):
+            self.rects[slot] = None
+            self.grid.remove(slot)
+
+        for group_name, rect, one_way in digit.get_platform_rects():
+            slot = base + PLATFORM_SLOTS[group_name]
+            self.left[slot] = rect.left
+            self.top[slot] = rect.top
+            self.right[slot] = rect.right
+            self.bottom[slot] = rect.bottom
+            self.one_way[slot] = one_way
+            self.rects[slot] = rect
+            # 幅・高さ 0 の矩形は colliderect と同様に衝突しない
+            if rect.width > 0 and rect.height > 0:
+                self.grid.insert(slot, rect)
+
+    def next_overlap(self, rect, start=0, skip_one_way=False):
+        """
+        start 以降で rect と重なる最初の足場の番号を返す (なければ -1)
+        判定は pygame.Rect.colliderect と同じ (辺が接するだけなら重ならない)
+        """
+        candidates = [slot for slot in self.grid.query(rect) if slot >= start]
+        if not candidates:
+            return -1
+        slots = np.array(candidates, dtype=np.intp)
+        hits = self.left[slots] < rect.right
+        hits &= self.right[slots] > rect.left
+        hits &= self.top[slots] < rect.bottom
+        hits &= self.bottom[slots] > rect.top
+        if skip_one_way:
+            hits &= ~self.one_way[slots]
+        index = int(hits.argmax())
+        if not hits[index]:
+            return -1
+        return candidates[index]
+
+    def sweep(self, rect, dx=0, dy=0, skip_one_way=False):
+        """
+        rect を (dx, dy) だけ動かしたとき最初に接触する足場を求める (swept AABB)
+        戻り値は (足場の番号, 接触時刻 0.0〜1.0)。接触しなければ (-1, 1.0)
+        - 動き出す前から重なっている足場は対象外 (next_overlap 側で解決する)
+        - 一方通行の足場は、下向きに移動して上面に当たるときだけ接触とみなす
+        - 同時刻に当たる足場が複数あれば番号の小さい方を返す
+        """
+        if dx == 0 and dy == 0:
+            return -1, 1.0
+        swept = rect.union(rect.move(dx, dy))
+        candidates = self.grid.query(swept)
+        if not candidates:
+            return -1, 1.0
+        slots = np.array(candidates, dtype=np.intp)
+        left = self.left[slots]
+        top = self.top[slots]
+        right = self.right[slots]
+        bottom = self.bottom[slots]
+
+        entry_x, exit_x = self._axis_times(left, right, rect.left, rect.right, dx)
+        entry_y, exit_y = self._axis_times(top, bottom, rect.top, rect.bottom, dy)
+        entry = np.maximum(entry_x, entry_y)
+        exit_ = np.minimum(exit_x, exit_y)
+
+        hits = (entry >= 0.0) & (entry < 1.0) & (entry < exit_)
+        one_way = self.one_way[slots]
+        if skip_one_way or dy <= 0:
+            hits &= ~one_way
+        else:
+            # 一方通行は上面への着地 (y 方向で接触が決まる場合) のみ
+            hits &= ~one_way | (entry_y >= entry_x)
+        if not hits.any():
+            return -1, 1.0
+
+        entry = np.where(hits, entry, np.inf)
+        index = int(entry.argmin())
+        return candidates[index], float(entry[index])
+
+    @staticmethod
+    def _axis_times(lo, hi, rect_lo, rect_hi, delta):
+        """1 軸分の進入時刻と離脱時刻 (動かない軸は重なっていれば常に接触中)"""
+        if delta > 0:
+            return (lo - rect_hi) / delta, (hi - rect_lo) / delta
+        if delta < 0:
+            return (hi - rect_lo) / delta, (lo - rect_hi) / delta
+        overlapping = (lo < rect_hi) & (hi > rect_lo)
+        entry = np.where(overlapping, -np.inf, np.inf)
+        exit_ = np.where(overlapping, np.inf, -np.inf)
+        return entry, exit_
@@ -0,0 +1,55 @@
+# game/managers/digit_index.py
+from bisect import bisect_left, bisect_right
+
+
+class DigitIndex:
+    """
+    Digit を上端 (y) の昇順に並べた索引。グループ (A/B) ごとにも並べておく。
+    縦に長いステージ (4-3) で、画面内やしきい値より下の Digit だけを
+    bisect で切り出すのに使う。Digit の位置はステージ中に変わらない前提。
+    """
+    def __init__(self, digits=()):
+        self.rebuild(digits)
+
+    def rebuild(self, digits):
+        """digits の位置・グループから索引を作り直す"""
+        order = sorted(range(len(digits)), key=lambda i: (digits[i].y, i))
+        self.order = order
+        self.tops = [digits[i].y for i in order]
+        self.digits = [digits[i] for i in order]
+        # 上端がこれより上の Digit は、範囲の上端まで届かない
+        self.max_height = max((digit.height for digit in digits), default=0)
+
+        self.groups = {}
+        for digit in self.digits:
+            self.groups.setdefault(digit.group, []).append(digit)
+        self.group_tops = {
+            group: [digit.y for digit in members]
+            for group, members in self.groups.items()
+        }
+
+    def in_range(self, top, bottom):
+        """
+        縦方向に [top, bottom) と重なる Digit を、元の並び順 (描画順) で返す
+        """
+        start = bisect_right(self.tops, top - self.max_height)
+        end = bisect_left(self.tops, bottom)
+        order = self.order
+        digits = self.digits
+        found = [k for k in range(start, end) if digits[k].y + digits[k].height > top]
+        found.sort(key=order.__getitem__)
+        return [digits[k] for k in found]
+
+    def group(self, group):
+        """グループの Digit (上から順)"""
+        return self.groups.get(group, [])
+
+    def group_below(self, group, y):
+        """グループのうち、上端が y より下 (digit.y > y) の Digit"""
+        members = self.groups.get(group)
+        if not members:
+            return []
+        return members[bisect_right(self.group_tops[group], y):]
+
+    def __len__(self):
+        return len(self.digits)
@@ -0,0 +1,39 @@
+# game/managers/event_scheduler.py
+import heapq
+from itertools import count
+
+
+class EventScheduler:
+    """
+    予定時刻つきイベントの優先度付きキュー (heapq)。
+    毎フレーム全件を調べる代わりに、期限が来たイベントだけを取り出す。
+    同じ時刻のイベントは登録した順に取り出す。
+    """
+    def __init__(self):
+        self._heap = []
+        # 同時刻のイベントの順番を登録順にするための通し番号
+        self._order = count()
+
+    def schedule(self, due_time, kind, payload=None):
+        """due_time (秒) に kind イベントを登録する"""
+        heapq.heappush(self._heap, (due_time, next(self._order), kind, payload))
+
+    def pop_due(self, current_time):
+        """
+        current_time までに期限が来たイベントを (予定時刻, 種類, 内容) で順に返す
+        処理中に登録された期限切れのイベントも同じ呼び出しの中で返す
+        """
+        heap = self._heap
+        while heap and heap[0][0] <= current_time:
+            due_time, _, kind, payload = heapq.heappop(heap)
+            yield due_time, kind, payload
+
+    def next_time(self):
+        """次のイベントの予定時刻 (なければ None)"""
+        return self._heap[0][0] if self._heap else None
+
+    def clear(self):
+        self._heap.clear()
+
+    def __len__(self):
+        return len(self._heap)
@@ -1,12 +1,24 @@
 import pygame
 import os
+from collections import namedtuple
+
+# 実際にどう鳴らしたか (padded: 無音を足したか、delay_ms: 足した無音のミリ秒、channel: チャンネルが取れたか)
+PlayResult = namedtuple("PlayResult", "padded delay_ms channel")
 
 class SoundManager:
-    def __init__(self, sound_dir):
+    def __init__(self, sound_dir, output_latency=0.0):
+        """
+        output_latency: play() してから音が聞こえるまでの遅れ (秒)。ミキサーのバッファ分
+        """
         self.sound_dir = sound_dir
         self.sounds = {}
         self.channels = {}
         self.sound_on = True
+        self.output_latency = output_latency
+        # 先頭に無音を足した遅延再生用の Sound ((名前, ミリ秒) -> Sound)
+        self._delayed_sounds = {}
+        # まだ無音部分を再生中の遅延再生 [(Channel, Sound, 鳴り始める時刻 ms)]
+        self._pending_delayed = []
         # ブラウザ環境チェック
         try:
             import sys
@@ -30,8 +42,9 @@ class SoundManager:
             # エラーハンドリング - ブラウザでは一部のファイル操作でエラーが出るため静かに失敗
 
     def play(self, name):
+        """すぐに鳴らして PlayResult を返す (鳴らさなかったときは None)"""
         if not self.sound_on:
-            return  # サウンドがオフの場合は再生しない
+            return None  # サウンドがオフの場合は再生しない
         sound = self.sounds.get(name)
         if sound:
             try:
@@ -39,14 +52,74 @@ class SoundManager:
                 if channel:
                     channel.play(sound)
                 else:
-                    sound.play()
+                    channel = sound.play()
+                return PlayResult(False, 0, channel is not None)
             except Exception as e:
                 print(f"Unexpected error in SoundManager: {e}")
-                pass
-        else:
-            pass
+        return None
+
+    def play_delayed(self, name, delay):
+        """
+        delay 秒後に鳴るように再生する
+        pygame のミキサーには時刻指定の再生がないため、先頭に無音を足した Sound を
+        ミリ秒単位で作って使い回す。作れない環境ではすぐに鳴らす
+        戻り値は play() と同じ PlayResult (すぐに鳴らしたときは padded が False)
+        """
+        delay_ms = int(round(delay * 1000))
+        if delay_ms <= 0 or not self.sound_on:
+            return self.play(name)
+        key = (name, delay_ms)
+        sound = self._delayed_sounds.get(key)
+        if sound is None:
+            sound = self._make_delayed_sound(name, delay_ms)
+            if sound is None:
+                return self.play(name)
+            self._delayed_sounds[key] = sound
+        try:
+            channel = pygame.mixer.find_channel()
+            if channel:
+                channel.play(sound)
+            else:
+                channel = sound.play()
+            now = pygame.time.get_ticks()
+            self._pending_delayed = [p for p in self._pending_delayed if p[2] > now]
+            if channel:
+                self._pending_delayed.append((channel, sound, now + delay_ms))
+            return PlayResult(True, delay_ms, channel is not None)
+        except Exception as e:
+            print(f"Unexpected error in SoundManager: {e}")
+            return None
+
+    def cancel_delayed(self):
+        """まだ鳴り始めていない遅延再生を止める (リスタートで予定が取り消されたとき用)"""
+        now = pygame.time.get_ticks()
+        for channel, sound, start_ms in self._pending_delayed:
+            if start_ms > now and channel.get_sound() is sound:
+                channel.stop()
+        self._pending_delayed.clear()
+
+    def _make_delayed_sound(self, name, delay_ms):
+        sound = self.sounds.get(name)
+        if sound is None:
+            return None
+        try:
+            frequency, size, channels = pygame.mixer.get_init()
+            # 符号なしフォーマットは無音が 0 ではないので対応しない
+            if size > 0:
+                return None
+            frame_bytes = (abs(size) // 8) * channels
+            silence = bytes(frame_bytes * (frequency * delay_ms // 1000))
+            delayed = pygame.mixer.Sound(buffer=silence + sound.get_raw())
+            delayed.set_volume(sound.get_volume())
+            return delayed
+        except Exception:
+            # ブラウザ等で raw バッファが扱えない場合
+            return None
 
     def set_volume(self, name, volume):
+        # 遅延再生用の Sound は音量が変わるので作り直す
+        for key in [k for k in self._delayed_sounds if k[0] == name]:
+            del self._delayed_sounds[key]
         sound = self.sounds.get(name)
         if sound:
             try:
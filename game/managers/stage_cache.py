@@ -0,0 +1,140 @@
+# game/managers/stage_cache.py
+"""
+読み込み・スケール済みのステージ定義をプロセス全体で共有するキャッシュ。
+ステージ選択とゲーム画面を行き来するたびにファイルを読み直さず、
+GameScene (StageManager) は定義から変化する状態だけを作る。
+"""
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+from game.managers.stage_compiler import load_compiled_stage, resolve_stage_path
+from game.managers.stage_timeline import StageTimeline
+
+# キャッシュしておくステージ数の上限 (同梱ステージは 13)
+DEFAULT_MAX_STAGES = 16
+
+# Digit 1 つ分の定義 (sequence は tuple)
+DigitDefinition = namedtuple("DigitDefinition", "x y width height sequence initial_time group")
+
+# 同じ sequence・切り替え間隔の Digit が共有する数字の進み方
+SequenceDefinition = namedtuple("SequenceDefinition", "sequence initial_time")
+
+# ステージ 1 つ分の変更しない定義
+# data: ステージデータ全体 (読み取り専用), digits: 常に読み込む DigitDefinition の tuple
+# key_spawns: index 順に並べた鍵の出現定義, timeline: StageTimeline
+# chunks: チャンクに分けたステージの ChunkStore (分けていなければ None)
+# sequences: 重複を除いた SequenceDefinition の tuple (0 番は Digit 0 のもの)
+# digit_sequence_ids: Digit ごとの sequences の番号
+StageDefinition = namedtuple(
+    "StageDefinition", "path data digits key_spawns timeline chunks sequences digit_sequence_ids"
+)
+
+
+def _freeze(value):
+    """dict / list を読み取り専用の MappingProxyType / tuple に変換する"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def digit_definition(d_info):
+    """正規化済みの Digit の dict から DigitDefinition を作る"""
+    return DigitDefinition(
+        x=d_info["x"],
+        y=d_info["y"],
+        width=d_info["width"],
+        height=d_info["height"],
+        sequence=tuple(d_info.get("sequence", ())),
+        initial_time=d_info.get("initial_time", 2.0),
+        group=d_info.get("group", "B"),
+    )
+
+
+def load_chunk_digits(definition, key):
+    """チャンクに分けたステージの、チャンク 1 つ分の DigitDefinition を読む"""
+    return tuple(digit_definition(d_info) for d_info in definition.chunks.load(key))
+
+
+def build_definition(stage_path, stage_data):
+    """正規化済みのステージデータから StageDefinition を作る"""
+    chunks = stage_data.pop("chunks", None)
+    data = _freeze(stage_data)
+    digits = tuple(digit_definition(d_info) for d_info in data.get("digits", ()))
+    key_spawns = tuple(
+        MappingProxyType({
+            "x": spawn["x"],
+            "y": spawn["y"],
+            "index": spawn["index"],
+            "number": spawn.get("number", 1),
+            "delay": spawn.get("delay", 0.0),
+            "lifespan": spawn.get("lifespan", None),
+        })
+        for spawn in sorted(data.get("item_spawns", ()), key=lambda x: x["index"])
+    )
+    sequences = []
+    sequence_ids = {}
+    digit_sequence_ids = []
+    for d_info in digits:
+        shared = SequenceDefinition(d_info.sequence, d_info.initial_time)
+        if shared not in sequence_ids:
+            sequence_ids[shared] = len(sequences)
+            sequences.append(shared)
+        digit_sequence_ids.append(sequence_ids[shared])
+    # タイムラインも共有の sequence ごとに持つ (番号は sequences と同じ)
+    timeline = StageTimeline(sequences, key_spawns, data.get("final_stage", False))
+    return StageDefinition(stage_path, data, digits, key_spawns, timeline, chunks,
+                           tuple(sequences), tuple(digit_sequence_ids))
+
+
+def _close_definition(definition):
+    """捨てるステージ定義の、ChunkStore が開いているコンパイル済みファイルを閉じる"""
+    if definition.chunks is not None:
+        definition.chunks.close()
+
+
+class StageCache:
+    """
+    ステージのパス・解像度ごとに StageDefinition を保持する (最近使ったものを残す LRU)
+    JSON を書き換えた場合は invalidate() で捨てる
+    """
+    def __init__(self, max_stages=DEFAULT_MAX_STAGES):
+        self.max_stages = max_stages
+        self._definitions = OrderedDict()
+
+    def get(self, stage_path, screen_width, screen_height):
+        """ステージ定義を返す。無ければ読み込んで登録する (読み込みの例外はそのまま投げる)"""
+        key = (resolve_stage_path(stage_path), screen_width, screen_height)
+        definition = self._definitions.get(key)
+        if definition is not None:
+            self._definitions.move_to_end(key)
+            return definition
+        stage_data = load_compiled_stage(stage_path, screen_width, screen_height)
+        definition = build_definition(key[0], stage_data)
+        self._definitions[key] = definition
+        while len(self._definitions) > self.max_stages:
+            _, evicted = self._definitions.popitem(last=False)
+            _close_definition(evicted)
+        return definition
+
+    def invalidate(self, stage_path=None):
+        """stage_path のステージ定義を捨てる (None なら全て)"""
+        if stage_path is None:
+            for definition in self._definitions.values():
+                _close_definition(definition)
+            self._definitions.clear()
+            return
+        path = resolve_stage_path(stage_path)
+        for key in [k for k in self._definitions if k[0] == path]:
+            _close_definition(self._definitions.pop(key))
+
+    def __contains__(self, stage_path):
+        path = resolve_stage_path(stage_path)
+        return any(key[0] == path for key in self._definitions)
+
+    def __len__(self):
+        return len(self._definitions)
+
+
+# StageManager が既定で使う共有キャッシュ
+STAGE_CACHE = StageCache()
@@ -0,0 +1,392 @@
+# game/managers/stage_compiler.py
+"""
+ステージ JSON を、解像度ごとにスケール済みのコンパクトなバイナリ (marshal) に変換する。
+StageManager はコンパイル済みファイルがあればそれを 1 回読むだけで済み、
+JSON の読み込み・座標のスケール変換を毎回行わずに済む。
+
+stage/stage1-1.json -> stage/compiled/stage1-1.1078x768.bin
+
+コンパイル済みファイルには元 JSON のサイズ・更新時刻・CRC を記録しておき、
+JSON が変わっていれば読み込み時にコンパイルし直す。
+
+JSON に chunk_size があるステージは、Digit 0 以外を格子状のチャンクに分けて
+ヘッダの後ろにチャンクごとのデータとして並べ、必要になったチャンクだけを読む (ChunkStore)。
+
+ファイルの構成: MAGIC, ヘッダ長 (uint32), ヘッダ (marshal), チャンクデータ
+"""
+import json
+import marshal
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_left
+
+# ファイル先頭の識別子と形式のバージョン (形式を変えたら上げる)
+MAGIC = b"DGST"
+FORMAT_VERSION = 2
+_HEADER_LENGTH = struct.Struct("<I")
+
+COMPILED_DIR = "compiled"
+
+# コンパイル対象の解像度 (game_utils.get_optimal_screen_size: ブラウザ / デスクトップ)
+TARGET_RESOLUTIONS = ((1024, 768), (1078, 768))
+
+
+def resolve_stage_path(stage_path):
+    """ステージ JSON のパス。見つからなければ stage/ 直下を探す (ブラウザ環境の相対パス対応)"""
+    if os.path.exists(stage_path):
+        return stage_path
+    return os.path.join("stage", os.path.basename(stage_path))
+
+
+def compiled_path(stage_path, screen_width, screen_height):
+    directory, base_name = os.path.split(stage_path)
+    name = os.path.splitext(base_name)[0]
+    return os.path.join(directory, COMPILED_DIR, f"{name}.{screen_width}x{screen_height}.bin")
+
+
+def compile_stage(stage_data, screen_width, screen_height):
+    """
+    JSON から読んだステージデータを画面解像度にスケールし、正規化した dict を返す
+    (stage_data はそのまま書き換える)
+    - 座標は screen_reference 基準から画面サイズへ変換済み
+    - 旧形式のトップレベル sequence は各 digit に展開済み
+    - world_bottom/left/right と最終ステージの閾値もスケール済み
+    """
+    reference = stage_data.get("screen_reference", {"width": 800, "height": 600})
+    scale_x = screen_width / reference["width"]
+    scale_y = screen_height / reference["height"]
+
+    if "player_start" in stage_data:
+        ps = stage_data["player_start"]
+        ps["x"] = int(ps["x"] * scale_x)
+        ps["y"] = int(ps["y"] * scale_y)
+
+    if "digits" in stage_data:
+        for d_info in stage_data["digits"]:
+            d_info["x"] = int(d_info["x"] * scale_x)
+            d_info["y"] = int(d_info["y"] * scale_y)
+            d_info["width"] = int(d_info["width"] * scale_x)
+            d_info["height"] = int(d_info["height"] * scale_y)
+            # グループ指定がなければ、ここで自動判定する
+            if "group" not in d_info:
+                if d_info["y"] < -800:
+                    d_info["group"] = "A"
+                else:
+                    d_info["group"] = "B"
+
+    if "item_spawns" in stage_data:
+        for spawn in stage_data["item_spawns"]:
+            spawn["x"] = int(spawn["x"] * scale_x)
+            spawn["y"] = int(spawn["y"] * scale_y)
+    if "enemy_spawns" in stage_data:
+        for spawn in stage_data["enemy_spawns"]:
+            if "x" in spawn:
+                spawn["x"] = int(spawn["x"] * scale_x)
+            if "y" in spawn:
+                spawn["y"] = int(spawn["y"] * scale_y)
+            if "patrol_range" in spawn:
+                spawn["patrol_range"] = int(spawn["patrol_range"] * scale_x)
+            if "amplitude" in spawn:
+                spawn["amplitude"] = int(spawn["amplitude"] * scale_y)
+
+    # 旧sequence対応
+    if "sequence" in stage_data:
+        global_sequence = stage_data.pop("sequence")
+        global_initial_time = stage_data.get("initial_time_per_number", 2.0)
+        stage_data["digits"] = [{
+            "x": di.get("x", 300),
+            "y": di.get("y", 100),
+            "width": di.get("width", 200),
+            "height": di.get("height", 400),
+            "sequence": di.get("sequence", global_sequence),
+            "initial_time": di.get("initial_time", global_initial_time),
+            "group": di.get("group", "B")
+        } for di in stage_data.get("digits", [])]
+
+    if "chunk_size" in stage_data:
+        chunk_size = stage_data["chunk_size"]
+        stage_data["chunk_size"] = (max(1, int(chunk_size["width"] * scale_x)),
+                                    max(1, int(chunk_size["height"] * scale_y)))
+
+    stage_data["scale_x"] = scale_x
+    stage_data["scale_y"] = scale_y
+    stage_data["world_bottom"] = int(stage_data.get("world_bottom", screen_height) * scale_y)
+    stage_data["world_left"] = int(stage_data.get("world_left", 0) * scale_x)
+    stage_data["world_right"] = int(stage_data.get("world_right", screen_width) * scale_x)
+    if stage_data.get("final_stage", False):
+        stage_data["digit_activation_threshold"] = float(stage_data.get("digit_activation_threshold")) * scale_y
+        stage_data["digit_removal_threshold"] = float(stage_data.get("digit_removal_threshold")) * scale_y
+    return stage_data
+
+
+def _encode_sequence(sequence, symbols, symbol_ids):
+    """sequence を記号番号の bytes にする (記号表に無い値は追加する)"""
+    codes = []
+    for value in sequence:
+        # 1 と "1" を区別するため型も含めて記号にする
+        key = (type(value).__name__, value)
+        if key not in symbol_ids:
+            symbol_ids[key] = len(symbols)
+            symbols.append(value)
+        codes.append(symbol_ids[key])
+    return bytes(codes)
+
+
+def chunk_key(x, y, chunk_size):
+    """Digit の左上の座標が入るチャンクの番号 (列, 行)"""
+    return x // chunk_size[0], y // chunk_size[1]
+
+
+def _pack_chunk_key(key):
+    """チャンク番号 (列, 行) を、並べると行・列の順になる 64bit の整数にする"""
+    return ((key[0] + (1 << 31)) << 32) | (key[1] + (1 << 31))
+
+
+def encode_stage(stage_data):
+    """
+    正規化済みステージを marshal できる形に詰め、(ヘッダ, チャンクデータ) を返す
+    sequence は記号表 + 記号番号の bytes にし、同じ sequence は 1 つにまとめる
+    chunk_size があれば Digit 0 以外をチャンクに分け、チャンクごとに単独で読める形にする
+    """
+    symbols = []
+    symbol_ids = {}
+    sequences = []
+    sequence_ids = {}
+    digits = []
+    all_digits = stage_data.get("digits", [])
+    chunk_size = stage_data.get("chunk_size")
+    # チャンクに分けるステージでも Digit 0 (ループの基準) は常に読み込んでおく
+    resident = all_digits if chunk_size is None else all_digits[:1]
+    for d_info in resident:
+        fields = dict(d_info)
+        sequence = fields.pop("sequence", None)
+        sequence_id = -1
+        if sequence is not None:
+            encoded = _encode_sequence(sequence, symbols, symbol_ids)
+            if encoded not in sequence_ids:
+                sequence_ids[encoded] = len(sequences)
+                sequences.append(encoded)
+            sequence_id = sequence_ids[encoded]
+        digits.append((fields, sequence_id))
+
+    payload = {key: value for key, value in stage_data.items() if key != "digits"}
+    chunk_data = b""
+    if chunk_size is not None:
+        chunks = {}
+        for d_info in all_digits[1:]:
+            chunks.setdefault(chunk_key(d_info["x"], d_info["y"], chunk_size), []).append(d_info)
+        blobs = []
+        # チャンク表: (チャンク番号, 位置, 長さ) をチャンク番号順に並べた 64bit 整数の列
+        chunk_table = array("Q")
+        offset = 0
+        for key in sorted(chunks, key=_pack_chunk_key):
+            entries = []
+            for d_info in chunks[key]:
+                fields = dict(d_info)
+                encoded = _encode_sequence(fields.pop("sequence", ()), symbols, symbol_ids)
+                entries.append((fields, encoded))
+            blob = marshal.dumps(tuple(entries))
+            chunk_table.extend((_pack_chunk_key(key), offset, len(blob)))
+            offset += len(blob)
+            blobs.append(blob)
+        chunk_data = b"".join(blobs)
+        payload["chunk_table"] = chunk_table.tobytes()
+        # チャンクをまたぐ Digit を拾うための余白
+        payload["max_digit_size"] = (
+            max((d["width"] for d in all_digits[1:]), default=0),
+            max((d["height"] for d in all_digits[1:]), default=0),
+        )
+
+    payload["digits"] = tuple(digits)
+    payload["symbols"] = tuple(symbols)
+    payload["sequences"] = tuple(sequences)
+    return payload, chunk_data
+
+
+class ChunkStore:
+    """
+    チャンクに分けたステージの Digit 定義を、必要になったチャンクだけ読み出す
+    チャンク表は配列のまま持ち、二分探索で引く (チャンク 1 つあたり 24 バイト)
+    コンパイル済みファイルから読む場合はファイルを開いたままにしておく
+    (読み込み中にファイルが作り直されても、開いている方を読み続ける)
+    """
+    def __init__(self, chunk_table, symbols, chunk_size, max_digit_size,
+                 data=None, path=None, base_offset=0):
+        table = array("Q")
+        table.frombytes(chunk_table)
+        self._keys = table[0::3]
+        self._offsets = table[1::3]
+        self._lengths = table[2::3]
+        self.symbols = symbols
+        self.chunk_size = tuple(chunk_size)
+        self.max_digit_size = tuple(max_digit_size)
+        self._data = data
+        self._path = path
+        self._base_offset = base_offset
+        self._file = None
+
+    def _find(self, key):
+        """チャンク表の行番号 (無ければ -1)"""
+        packed = _pack_chunk_key(key)
+        i = bisect_left(self._keys, packed)
+        if i < len(self._keys) and self._keys[i] == packed:
+            return i
+        return -1
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def keys(self):
+        """全チャンクの番号 (列, 行) を行・列の順に返す"""
+        return [((packed >> 32) - (1 << 31), (packed & 0xFFFFFFFF) - (1 << 31)) for packed in self._keys]
+
+    def load(self, key):
+        """チャンクの Digit 定義 (正規化済みの dict) を返す"""
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        offset, length = self._offsets[i], self._lengths[i]
+        if self._data is not None:
+            blob = self._data[offset:offset + length]
+        else:
+            if self._file is None:
+                self._file = open(self._path, "rb")
+            self._file.seek(self._base_offset + offset)
+            blob = self._file.read(length)
+        symbols = self.symbols
+        digits = []
+        for fields, encoded in marshal.loads(blob):
+            d_info = dict(fields)
+            d_info["sequence"] = [symbols[code] for code in encoded]
+            digits.append(d_info)
+        return digits
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def decode_stage(payload, chunk_data=None, path=None, base_offset=0):
+    """
+    encode_stage の逆。StageManager が使う正規化済みの dict に戻す
+    チャンクに分けたステージは "chunks" に ChunkStore を入れる
+    (chunk_data があればメモリから、なければ path のファイルから読む)
+    """
+    symbols = payload.pop("symbols")
+    sequences = [[symbols[code] for code in encoded] for encoded in payload.pop("sequences")]
+    digits = []
+    for fields, sequence_id in payload.pop("digits"):
+        d_info = dict(fields)
+        if sequence_id >= 0:
+            d_info["sequence"] = list(sequences[sequence_id])
+        digits.append(d_info)
+    payload["digits"] = digits
+    if "chunk_table" in payload:
+        payload["chunks"] = ChunkStore(
+            payload.pop("chunk_table"), symbols, payload["chunk_size"], payload.pop("max_digit_size"),
+            data=chunk_data, path=path, base_offset=base_offset,
+        )
+    return payload
+
+
+def _source_stamp(stage_path):
+    """JSON のサイズと更新時刻 (読まずに変更を検出する)"""
+    try:
+        stat = os.stat(stage_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_compiled(path, payload, screen_width, screen_height, stamp, crc, chunk_data=b""):
+    header = marshal.dumps((FORMAT_VERSION, screen_width, screen_height, stamp, crc, payload))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 書きかけのファイルを読まないよう一時ファイルから置き換える
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(chunk_data)
+    os.replace(tmp_path, path)
+
+
+def read_compiled(path, screen_width, screen_height):
+    """
+    ヘッダだけを読み、(stamp, crc, payload, チャンクデータの開始位置) を返す
+    無い・壊れている・形式や解像度が違う場合は None
+    """
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(len(MAGIC) + _HEADER_LENGTH.size)
+            if len(prefix) < len(MAGIC) + _HEADER_LENGTH.size or not prefix.startswith(MAGIC):
+                return None
+            (header_length,) = _HEADER_LENGTH.unpack_from(prefix, len(MAGIC))
+            header = f.read(header_length)
+    except OSError:
+        return None
+    if len(header) != header_length:
+        return None
+    try:
+        version, width, height, stamp, crc, payload = marshal.loads(header)
+    except (EOFError, ValueError, TypeError):
+        return None
+    if version != FORMAT_VERSION or (width, height) != (screen_width, screen_height):
+        return None
+    return stamp, crc, payload, len(prefix) + header_length
+
+
+def build_compiled(stage_path, screen_width, screen_height):
+    """JSON からコンパイルして書き出し、正規化済みの dict を返す (書けない環境では書かない)"""
+    with open(stage_path, "rb") as f:
+        source = f.read()
+    stamp = _source_stamp(stage_path)
+    crc = zlib.crc32(source)
+    stage_data = compile_stage(json.loads(source), screen_width, screen_height)
+    payload, chunk_data = encode_stage(stage_data)
+    try:
+        write_compiled(compiled_path(stage_path, screen_width, screen_height),
+                       payload, screen_width, screen_height, stamp, crc, chunk_data)
+    except OSError:
+        # ブラウザ環境などで書き込めなくても、コンパイル結果はそのまま使う
+        pass
+    # 作ったばかりのチャンクデータは手元にあるのでメモリから読む
+    return decode_stage(payload, chunk_data=chunk_data)
+
+
+def load_compiled_stage(stage_path, screen_width, screen_height):
+    """
+    正規化済みのステージデータを返す
+    1. コンパイル済みファイルがあり JSON のサイズ・更新時刻が一致すればそれを使う
+    2. 一致しなければ JSON の CRC を比べ、中身が同じならそのまま使う
+    3. それ以外 (無い・古い) は JSON からコンパイルし直す
+    JSON が無くコンパイル済みファイルだけある場合はそれを使う
+    """
+    stage_path = resolve_stage_path(stage_path)
+    path = compiled_path(stage_path, screen_width, screen_height)
+    compiled = read_compiled(path, screen_width, screen_height)
+    stamp = _source_stamp(stage_path)
+    if compiled is not None:
+        compiled_stamp, compiled_crc, payload, data_offset = compiled
+        if stamp is None or tuple(compiled_stamp) == stamp:
+            return decode_stage(payload, path=path, base_offset=data_offset)
+        # 更新時刻だけ変わった (チェックアウトやパッケージ化) 場合は中身で判定する
+        with open(stage_path, "rb") as f:
+            if zlib.crc32(f.read()) == compiled_crc:
+                with open(path, "rb") as compiled_file:
+                    compiled_file.seek(data_offset)
+                    chunk_data = compiled_file.read()
+                try:
+                    # 次回は読み込み 1 回で済むよう記録を更新しておく
+                    write_compiled(path, payload, screen_width, screen_height,
+                                   stamp, compiled_crc, chunk_data)
+                except OSError:
+                    pass
+                return decode_stage(payload, chunk_data=chunk_data)
+    return build_compiled(stage_path, screen_width, screen_height)
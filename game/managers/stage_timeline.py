@@ -0,0 +1,135 @@
+# game/managers/stage_timeline.py
+from bisect import bisect_right
+from collections import namedtuple
+
+# Key のデフォルト寿命 (BaseItem と同じ)
+DEFAULT_KEY_LIFESPAN = 2.0
+
+# ある時刻の Digit の状態
+# sequence_index: sequence 内の位置, last_change_time: その数字になった時刻 (ステージ開始からの秒)
+DigitStep = namedtuple("DigitStep", "sequence_index last_change_time")
+
+# 1 ループ内で鍵が出ている区間 (ループ先頭からの秒)。出現しない鍵は含まない
+# key_index: keys_to_spawn 内の位置 (タイムラインは共有するので key_info は持たない)
+KeyWindow = namedtuple("KeyWindow", "spawn_time expire_time key_index")
+
+
+def sequence_step(sequence_length, initial_time, t):
+    """
+    ステージ開始から t 秒後の、sequence_length 個の数字を initial_time 秒ずつ切り替える Digit の状態
+    (途中から読み込んだ Digit の数字を、読み込み済みの Digit とそろえるのに使う)
+    """
+    if sequence_length == 0:
+        return DigitStep(0, 0.0)
+    beats = [k * initial_time for k in range(sequence_length)]
+    period = initial_time * sequence_length
+    loop_start = (t // period) * period
+    k = bisect_right(beats, t - loop_start) - 1
+    return DigitStep(k, loop_start + beats[k])
+
+
+class StageTimeline:
+    """
+    ステージの進行を事前に計算した、シーク可能なタイムライン。
+    任意の時刻の Digit の数字・出ている鍵・ループ回数を、途中を再生せずに求める。
+    時刻はすべてステージ開始 (リスタート) からの秒。
+
+    ループは Digit 0 の sequence が一周する周期とする
+    (同梱ステージは全 Digit が同じ周期で、鍵も Digit 0 の切り替えで出る)。
+    """
+    def __init__(self, controllers, keys_to_spawn, final_stage=False):
+        """
+        controllers: sequence と initial_time を持つもの (DigitController / DigitDefinition)
+        keys_to_spawn: index 順に並べた鍵の出現定義
+        """
+        # Digit ごとの 1 周分の切り替え時刻 (昇順)
+        self.digit_beats = []
+        self.digit_periods = []
+        for controller in controllers:
+            if controller.sequence:
+                step = controller.initial_time
+                self.digit_beats.append([k * step for k in range(len(controller.sequence))])
+                self.digit_periods.append(step * len(controller.sequence))
+            else:
+                self.digit_beats.append([0.0])
+                self.digit_periods.append(float("inf"))
+
+        self.loop_period = self.digit_periods[0] if self.digit_periods else float("inf")
+        self.key_windows = self._build_key_windows(keys_to_spawn, final_stage)
+        self._spawn_times = [w.spawn_time for w in self.key_windows]
+
+    def _build_key_windows(self, keys_to_spawn, final_stage):
+        beats = self.digit_beats[0] if self.digit_beats else [0.0]
+        windows = []
+        for key_index, key_info in enumerate(keys_to_spawn):
+            index = key_info["index"]
+            if index == 0:
+                spawn_time = key_info["delay"]
+            elif final_stage:
+                spawn_time = 0.0
+            elif 0 < index < len(beats):
+                spawn_time = beats[index] + key_info["delay"]
+            else:
+                # sequence に無い index は出現しない
+                continue
+            # ループの切り替わりまでに出現しなければ取り消される
+            if spawn_time >= self.loop_period:
+                continue
+            lifespan = key_info["lifespan"]
+            if lifespan is None:
+                lifespan = DEFAULT_KEY_LIFESPAN
+            windows.append(KeyWindow(spawn_time, spawn_time + lifespan, key_index))
+        windows.sort(key=lambda w: w.spawn_time)
+        return windows
+
+    def loop_at(self, t):
+        """t の時点のループ回数 (1 から数える)"""
+        if self.loop_period == float("inf"):
+            return 1
+        return int(t // self.loop_period) + 1
+
+    def loop_start_time(self, t):
+        """t を含むループの開始時刻"""
+        if self.loop_period == float("inf"):
+            return 0.0
+        return (self.loop_at(t) - 1) * self.loop_period
+
+    def digit_step(self, digit_index, t):
+        """t の時点の Digit の sequence 位置と、その数字になった時刻"""
+        period = self.digit_periods[digit_index]
+        beats = self.digit_beats[digit_index]
+        if period == float("inf"):
+            return DigitStep(0, 0.0)
+        loop_start = (t // period) * period
+        k = bisect_right(beats, t - loop_start) - 1
+        return DigitStep(k, loop_start + beats[k])
+
+    def keys_at(self, t):
+        """
+        t の時点で出ている鍵と、このループでこれから出る鍵を返す
+        戻り値: (出ている鍵の [(出現時刻, 消滅時刻, key_index)], これから出る鍵の [(出現時刻, key_index)])
+        前のループに出て寿命が残っている鍵も「出ている鍵」に含める
+        """
+        loop_start = self.loop_start_time(t)
+        local = t - loop_start
+        # 出現時刻で並んでいるので、出現済みの範囲は二分探索で切り出せる
+        spawned = bisect_right(self._spawn_times, local)
+
+        alive = []
+        if loop_start > 0:
+            previous = loop_start - self.loop_period
+            for w in self.key_windows:
+                if previous + w.expire_time > t:
+                    alive.append((previous + w.spawn_time, previous + w.expire_time, w.key_index))
+        for w in self.key_windows[:spawned]:
+            if w.expire_time > local:
+                alive.append((loop_start + w.spawn_time, loop_start + w.expire_time, w.key_index))
+        pending = [(loop_start + w.spawn_time, w.key_index) for w in self.key_windows[spawned:]]
+        return alive, pending
+
+    def time_of_sequence_index(self, index):
+        """最初のループで Digit 0 が sequence の index 番目になる時刻"""
+        beats = self.digit_beats[0] if self.digit_beats else [0.0]
+        if not 0 <= index < len(beats):
+            raise IndexError(f"sequence index {index} is out of range")
+        return beats[index]
@@ -1,32 +1,101 @@
-import json, random, copy, pygame
-from game.game_utils import SCREEN_WIDTH, SCREEN_HEIGHT
-from game.objects.digit import Digit
+import random
+from collections import namedtuple
+from game.game_utils import SCREEN_WIDTH, SCREEN_HEIGHT, FIXED_DT
+from game.objects.digit import Digit, DigitBank
 from game.objects.item import Key, FinalKey
+from game.managers.collision_world import CollisionWorld
+from game.managers.digit_index import DigitIndex
+from game.managers.event_scheduler import EventScheduler
+from game.managers.stage_cache import STAGE_CACHE, load_chunk_digits
+from game.managers.stage_compiler import chunk_key
+from game.managers.stage_timeline import sequence_step
+
+# リスタート時に Digit へ書き戻す初期状態 (変更しない)
+DigitInitialState = namedtuple("DigitInitialState", "x y width height group number active")
+
+# EventScheduler に登録するイベントの種類
+EVENT_BEAT = "beat"            # 共有の DigitController の切り替え (payload: digit_controllers の番号)
+EVENT_SOUND = "sound"          # 効果音の先行発行 (payload: (名前, 鳴らす時刻, 世代 or None))
+EVENT_TEMPO = "tempo"          # カウント音の周期の区切り (payload: None)
+EVENT_KEY_SPAWN = "key_spawn"  # 鍵の出現 (payload: (key_info, 世代))
+EVENT_KEY_EXPIRE = "key_expire"  # 鍵の消滅 (payload: Key)
+EVENT_CHUNK_BEAT = "chunk_beat"  # チャンクの Digit だけが使う DigitController の切り替え (payload: DigitController)
+
+# 予定時刻の比較で許容する誤差 (秒)。dt の積算の丸めで 1 ステップ遅れないようにする
+TIME_EPSILON = 1e-6
+
+# カウント音を鳴らす時刻 (周期に対する割合、残り 55% / 30% / 5%)
+COUNTDOWN_RATIOS = (0.55, 0.30, 0.05)
+
+# チャンクに分けたステージで、プレイヤーの周りに読み込んでおく範囲
+# (画面の半分 + 画面サイズ × STREAM_MARGIN。カメラの遅れを見込んで広めにとる)
+STREAM_MARGIN = 0.5
+
+# 計測モードで記録する効果音のタイミング (時刻はシミュレーション時刻、秒)
+# delay: 足すよう頼んだ無音、padded / padding: 実際に無音を足したかとその長さ
+# channel: チャンネルが取れて鳴ったか、buffer_latency: ミキサーのバッファ分の遅れ
+# offset = 鳴らした時刻 + padding + buffer_latency - 鳴らす予定の時刻 (鳴らなかったときは None)
+SoundTiming = namedtuple(
+    "SoundTiming", "name due_time issued_time delay padded padding channel buffer_latency offset"
+)
+
+class ResidentChunk:
+    """読み込み中のチャンク 1 つ分の Digit と、それぞれが購読している DigitController"""
+    __slots__ = ("key", "digits", "controllers")
+
+    def __init__(self, key):
+        self.key = key
+        self.digits = []
+        self.controllers = []
+
 
 class StageManager:
-    def __init__(self, sound_manager=None):
+    def __init__(self, sound_manager=None, stage_cache=None, seed=None):
+        """
+        seed: ステージで使う乱数 (敵の出現間隔) のシード。None なら毎回変わる
+        リプレイで同じ展開を再現するときは記録したシードを渡す
+        """
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+
+        # シミュレーション時刻 (update の dt の積算、秒)
+        # 描画フレームの遅れに左右されないよう壁時計は使わない
+        self.current_time = 0.0
+
         self.digits = []
-        self.original_digits = []
+        # 全 Digit のセグメント状態をまとめて持つ
+        self.digit_bank = DigitBank()
+        # リスタート用の Digit 初期状態
+        self.initial_digit_states = ()
         self.current_sequence = []
         self.sequence_index = 0
         self.initial_time_per_number = 2.0
         self.time_per_number = self.initial_time_per_number
-        self.last_change_time = pygame.time.get_ticks() / 1000.0
+        self.last_change_time = self.current_time
 
         self.item_spawns = []
         self.sound_manager = sound_manager
 
         self.global_change_time = 2.0
-        self.global_last_change_time = pygame.time.get_ticks() / 1000.0
-        self.pi_sound_flags = {"1.1": False, "0.6": False, "0.1": False}
+        self.global_last_change_time = self.current_time
 
         self.target_keys = 0
         self.is_stage_clear = False
 
         self.keys_to_spawn = []
+        # (digit_index, sequence index) -> その切り替えで出現させる鍵
+        self.spawns_by_step = {}
         self.active_keys = []
         self.consecutive_keys = 0
 
+        # 切り替え・鍵の出現/消滅・カウント音を予定時刻順に処理する
+        self.scheduler = EventScheduler()
+        # ループが一周するたびに進める世代。古い世代の出現予定は捨てる
+        self.spawn_generation = 0
+        self.last_loop_time = None
+        # 効果音のタイミング計測 (list にすると SoundTiming を記録する)
+        self.sound_timing_log = None
+
         self.game_clear_delay = 0.3
         self.clear_timer_start = None
 
@@ -35,6 +104,13 @@ class StageManager:
         self.current_loop = 1
 
         self.digit_controllers = []
+        # 任意の時刻の状態を求めるためのタイムライン (load_stage で作る)
+        self.timeline = None
+
+        # プレイヤー衝突判定用の足場スナップショット
+        self.collision_world = CollisionWorld(self.digits)
+        # y 座標順・グループ別の Digit 索引 (描画の間引きと最終ステージの切り替え用)
+        self.digit_index = DigitIndex()
 
         # 最終ステージ用パラメータ
         self.final_stage = False
@@ -45,151 +121,127 @@ class StageManager:
         self.groupB_activated = False
         self.groupA_removed = False
         
-        # ステージデータ
+        # ステージデータ (読み取り専用。StageCache で他のシーンと共有する)
+        self.stage_cache = stage_cache if stage_cache is not None else STAGE_CACHE
+        self.stage_definition = None
         self.stage_data = {}
 
+        # 現在のステージが始まった (リスタートした) 時刻
+        self.stage_start_time = self.current_time
+        # チャンクに分けたステージ: 読み込み中のチャンク (番号 -> ResidentChunk)
+        # self.digits の先頭 pinned_digit_count 個は常に読み込む Digit
+        self.chunks = None
+        self.resident_chunks = {}
+        self.pinned_digit_count = 0
+        # チャンクの Digit だけが使う共有の DigitController ((sequence, initial_time) -> DigitController)
+        self.chunk_controllers = {}
+
     def add_digit(self, digit):
         self.digits.append(digit)
 
     def load_stage(self, stage_path):
         try:
-            # ブラウザ環境対応: fetch APIを使ってJSONを読み込む
+            # 読み込み・スケール済みの定義を共有キャッシュから取り、ここでは変化する状態だけを作る
             try:
-                # デスクトップ環境
-                with open(stage_path, 'r') as f:
-                    self.stage_data = json.load(f)
-            except Exception:
-                # ブラウザ環境の場合は相対パスに調整
-                import os
-                base_name = os.path.basename(stage_path)
-                try:
-                    with open(f"stage/{base_name}", 'r') as f:
-                        self.stage_data = json.load(f)
-                except Exception as e:
-                    print(f"Failed to load stage: {e}")
-                    self.stage_data = {}
-                    return
-
-            reference = self.stage_data.get("screen_reference", {"width": 800, "height": 600})
-            self.scale_x = SCREEN_WIDTH / reference["width"]
-            self.scale_y = SCREEN_HEIGHT / reference["height"]
-
-            if "player_start" in self.stage_data:
-                ps = self.stage_data["player_start"]
-                ps["x"] = int(ps["x"] * self.scale_x)
-                ps["y"] = int(ps["y"] * self.scale_y)
-
-            if "digits" in self.stage_data:
-                for d_info in self.stage_data["digits"]:
-                    d_info["x"] = int(d_info["x"] * self.scale_x)
-                    d_info["y"] = int(d_info["y"] * self.scale_y)
-                    d_info["width"] = int(d_info["width"] * self.scale_x)
-                    d_info["height"] = int(d_info["height"] * self.scale_y)
-                    # グループ指定がなければ、ここで自動判定する
-                    if "group" not in d_info:
-                        if d_info["y"] < -800:
-                            d_info["group"] = "A"
-                        else:
-                            d_info["group"] = "B"
-
-            if "item_spawns" in self.stage_data:
-                for spawn in self.stage_data["item_spawns"]:
-                    spawn["x"] = int(spawn["x"] * self.scale_x)
-                    spawn["y"] = int(spawn["y"] * self.scale_y)
-            if "enemy_spawns" in self.stage_data:
-                for spawn in self.stage_data["enemy_spawns"]:
-                    if "x" in spawn:
-                        spawn["x"] = int(spawn["x"] * self.scale_x)
-                    if "y" in spawn:
-                        spawn["y"] = int(spawn["y"] * self.scale_y)
-                    if "patrol_range" in spawn:
-                        spawn["patrol_range"] = int(spawn["patrol_range"] * self.scale_x)
-                    if "amplitude" in spawn:
-                        spawn["amplitude"] = int(spawn["amplitude"] * self.scale_y)
-
-            # 旧sequence対応
-            if "sequence" in self.stage_data:
-                global_sequence = self.stage_data.get("sequence", [])
-                global_initial_time = self.stage_data.get("initial_time_per_number", 2.0)
-                self.stage_data["digits"] = [{
-                    "x": di.get("x", 300),
-                    "y": di.get("y", 100),
-                    "width": di.get("width", 200),
-                    "height": di.get("height", 400),
-                    "sequence": di.get("sequence", global_sequence),
-                    "initial_time": di.get("initial_time", global_initial_time),
-                    "group": di.get("group", "B")
-                } for di in self.stage_data.get("digits", [])]
-
+                definition = self.stage_cache.get(stage_path, SCREEN_WIDTH, SCREEN_HEIGHT)
+            except Exception as e:
+                print(f"Failed to load stage: {e}")
+                self.stage_data = {}
+                return
+            self.stage_definition = definition
+            self.stage_data = definition.data
+
+            self.scale_x = self.stage_data["scale_x"]
+            self.scale_y = self.stage_data["scale_y"]
             self.target_keys = self.stage_data.get("target_keys", 0)
             self.global_change_time = self.stage_data.get("change_time", 2.0)
-            self.world_bottom = int(self.stage_data.get("world_bottom", SCREEN_HEIGHT) * self.scale_y)
-            self.world_left = int(self.stage_data.get("world_left", 0) * self.scale_x)
-            self.world_right = int(self.stage_data.get("world_right", SCREEN_WIDTH) * self.scale_x)
+            self.world_bottom = self.stage_data["world_bottom"]
+            self.world_left = self.stage_data["world_left"]
+            self.world_right = self.stage_data["world_right"]
 
             # 最終ステージ用情報
             self.final_stage = self.stage_data.get("final_stage", False)
             if self.final_stage:
-                self.digit_activation_threshold = float(self.stage_data.get("digit_activation_threshold")) * self.scale_y
-                self.digit_removal_threshold = float(self.stage_data.get("digit_removal_threshold")) * self.scale_y
-
-            digits_data = self.stage_data.get("digits", [])
-            for d_info in digits_data:
-                controller = DigitController(
-                    sequence=d_info.get("sequence", []),
-                    initial_time=d_info.get("initial_time", 2.0)
-                )
-                self.digit_controllers.append(controller)
+                self.digit_activation_threshold = self.stage_data["digit_activation_threshold"]
+                self.digit_removal_threshold = self.stage_data["digit_removal_threshold"]
+
+            # 同じ sequence・切り替え間隔の Digit は 1 つの DigitController を共有する
+            for shared in definition.sequences:
+                self.digit_controllers.append(DigitController(
+                    sequence=shared.sequence,
+                    initial_time=shared.initial_time,
+                    start_time=self.current_time
+                ))
+            for d_info, sequence_id in zip(definition.digits, definition.digit_sequence_ids):
                 digit = Digit(
-                x=d_info["x"],
-                y=d_info["y"],
-                width=d_info["width"],
-                height=d_info["height"],
-                number=d_info["sequence"][0],
-                properties_override=self.stage_data.get("segment_properties_override")
+                x=d_info.x,
+                y=d_info.y,
+                width=d_info.width,
+                height=d_info.height,
+                number=d_info.sequence[0],
+                properties_override=self.stage_data.get("segment_properties_override"),
+                bank=self.digit_bank
                 )
                 # グループ情報を digit に保持させる
-                digit.group = d_info.get("group", "B")
+                digit.group = d_info.group
                 # 初期状態：Group A の digit は非表示、Group B は表示
                 digit.active = (digit.group == "B")
                 self.add_digit(digit)
-
-            self.original_digits = copy.deepcopy(self.digits)
-            self.load_item_spawns(self.stage_data.get("item_spawns", []))
-            self.load_enemy_spawns(self.stage_data.get("enemy_spawns", []))
-
-            if digits_data and "sequence" in digits_data[0]:
-                self.total_sequences = len(digits_data[0]["sequence"])
+                self.digit_controllers[sequence_id].subscribe(digit)
+
+            self.pinned_digit_count = len(self.digits)
+            self.chunks = definition.chunks
+            self.digit_index.rebuild(self.digits)
+            self.initial_digit_states = tuple(
+                DigitInitialState(
+                    x=digit.x,
+                    y=digit.y,
+                    width=digit.width,
+                    height=digit.height,
+                    group=digit.group,
+                    number=digit.current_number,
+                    active=digit.active,
+                )
+                for digit in self.digits
+            )
+            self.item_spawns = self.stage_data.get("item_spawns", ())
+            self.load_item_spawns(definition.key_spawns)
+            self.load_enemy_spawns(self.stage_data.get("enemy_spawns", ()))
+
+            if definition.digits:
+                self.total_sequences = len(definition.digits[0].sequence)
+            self.timeline = definition.timeline
         except Exception as e:
             print(f"Error loading stage {stage_path}: {e}")
 
     # その他のメソッドは同様に時間関連の部分を修正
     
-    def load_item_spawns(self, item_spawns):
-        self.item_spawns = item_spawns
-        sorted_spawns = sorted(self.item_spawns, key=lambda x: x["index"])
+    def load_item_spawns(self, key_spawns):
+        """
+        key_spawns: index 順に並べた鍵の出現定義 (StageDefinition.key_spawns)
+        定義は共有なので、出現状態を持つ key_info をステージごとに作る
+        """
         self.keys_to_spawn = []
-        for spawn in sorted_spawns:
-            self.keys_to_spawn.append({
-                "x": spawn["x"],
-                "y": spawn["y"],
-                "index": spawn["index"],
-                "number": spawn.get("number", 1),
-                "delay": spawn.get("delay", 0.0),
-                "spawned": False,
-                "spawn_time": None,
-                "lifespan": spawn.get("lifespan", None)
-            })
+        self.spawns_by_step = {}
+        for spawn in key_spawns:
+            key_info = dict(spawn, spawned=False, spawn_time=None)
+            self.keys_to_spawn.append(key_info)
+            # JSON の digit_index はこれまで読み込んでおらず、鍵はすべて
+            # Digit 0 の切り替えで出現していた (3-1 には存在しない digit_index 2 がある)
+            # その挙動を保つため digit_index は 0 として登録する
+            step = (key_info.get("digit_index", 0), key_info["index"])
+            self.spawns_by_step.setdefault(step, []).append(key_info)
 
     def load_enemy_spawns(self, enemy_spawns):
-        self.enemy_spawns = enemy_spawns
+        # 共有の定義は書き換えないよう、出現状態を持たせるものはコピーする
+        self.enemy_spawns = [dict(spawn) for spawn in enemy_spawns]
         self.active_enemies = []
         for spawn in self.enemy_spawns:
             spawn["spawned"] = False
             trigger = spawn.get("trigger", {})
             if trigger.get("type") == "random":
                 delay_min, delay_max = trigger.get("delay_range", [5, 15])
-                spawn["next_spawn_time"] = self.last_change_time + random.uniform(delay_min, delay_max)
+                spawn["next_spawn_time"] = self.last_change_time + self.rng.uniform(delay_min, delay_max)
             else:
                 spawn["next_spawn_time"] = None
 
@@ -197,104 +249,169 @@ class StageManager:
         self.sequence_index = 0
         self.current_sequence_index = 1
         self.time_per_number = self.initial_time_per_number
-        self.last_change_time = pygame.time.get_ticks() / 1000.0
-        self.global_last_change_time = pygame.time.get_ticks() / 1000.0
-        self.pi_sound_flags = {"1.1": False, "0.6": False, "0.1": False}
+        self.last_change_time = self.current_time
+        self.global_last_change_time = self.current_time
         self.is_stage_clear = False
         self.current_loop = 1
         self.consecutive_keys = 0
         
         self.groupB_activated = False
         self.groupA_removed = False
-        self.digits = copy.deepcopy(self.original_digits)
-
-        for controller, digit in zip(self.digit_controllers, self.digits):
-            controller.reset()
-            if controller.sequence:
-                digit.set_number(controller.sequence[0])
-        for spawn in self.enemy_spawns:
-            spawn["spawned"] = False
+        # チャンクは次の update でプレイヤーの周りから読み込み直す
+        if self.resident_chunks:
+            self._release_chunks(list(self.resident_chunks))
+            self._rebuild_resident_digits()
+        self.stage_start_time = self.current_time
+        self._restore_digits()
+
+        self.scheduler.clear()
+        self.spawn_generation += 1
+        self.last_loop_time = None
+        # 先に発行済みで、まだ聞こえていない効果音も取り消す
+        if self.sound_manager:
+            self.sound_manager.cancel_delayed()
+        # 出現状態は予定を入れ直す前に消す (前のプレイで出現済みの鍵が、リスタート後に出なくならないように)
         for key_info in self.keys_to_spawn:
             key_info["spawned"] = False
             key_info["spawn_time"] = None
+        for i, controller in enumerate(self.digit_controllers):
+            controller.reset(self.current_time)
+            if controller.sequence:
+                controller.set_digits_number(controller.sequence[0])
+                self.scheduler.schedule(controller.next_change_time, EVENT_BEAT, i)
+                self._schedule_next_step_spawns(i)
+        for spawn in self.enemy_spawns:
+            spawn["spawned"] = False
         self.active_keys.clear()
 
+        if not self.final_stage:
+            self._schedule_countdown(self.current_time)
+        self._schedule_loop_start_spawns(self.current_time)
+
+    def _restore_digits(self):
+        """Digit を作り直さずに初期状態を書き戻す"""
+        for digit, state in zip(self.digits, self.initial_digit_states):
+            # 位置・サイズは変わっていなければ代入しない (矩形キャッシュを保つ)
+            if digit.x != state.x:
+                digit.x = state.x
+            if digit.y != state.y:
+                digit.y = state.y
+            if digit.width != state.width:
+                digit.width = state.width
+            if digit.height != state.height:
+                digit.height = state.height
+            digit.group = state.group
+            digit.active = state.active
+            digit.set_number(state.number)
+
+    def visible_digits(self, top, bottom):
+        """縦方向に [top, bottom) と重なる Digit (描画順)"""
+        return self.digit_index.in_range(top, bottom)
+
     def new_game_reset(self):
         self.reset()
 
+    def seek(self, stage_time, items):
+        """
+        リスタートしてから stage_time 秒進めた状態にする (途中の切り替えは再生しない)
+        タイムラインから Digit の数字・ループ回数・出ている鍵を直接求めて反映する
+        items: シーンのアイテム一覧 (出ている鍵を追加する)
+        """
+        self.reset()
+        if stage_time <= 0 or self.timeline is None:
+            return
+        timeline = self.timeline
+        # stage_time 秒前にステージが始まったことにする
+        start_time = self.current_time - stage_time
+        self.stage_start_time = start_time
+
+        # reset() が登録した予定は作り直す
+        self.scheduler.clear()
+        self.spawn_generation += 1
+        for key_info in self.keys_to_spawn:
+            key_info["spawned"] = False
+            key_info["spawn_time"] = None
+        for i, controller in enumerate(self.digit_controllers):
+            if not controller.sequence:
+                continue
+            # タイムラインも共有の sequence ごとなので番号はそのまま使える
+            step = timeline.digit_step(i, stage_time)
+            controller.sequence_index = step.sequence_index
+            controller.last_change_time = start_time + step.last_change_time
+            controller.set_digits_number(controller.sequence[step.sequence_index])
+            self.scheduler.schedule(controller.next_change_time, EVENT_BEAT, i)
+            if i == 0:
+                self.current_sequence_index = step.sequence_index + 1
+
+        self.current_loop = timeline.loop_at(stage_time)
+        loop_start = timeline.loop_start_time(stage_time)
+        if self.current_loop > 1:
+            self.last_loop_time = start_time + loop_start
+
+        if not self.final_stage:
+            period = self.global_change_time
+            tempo_start = start_time + (stage_time // period) * period
+            self._schedule_countdown(tempo_start, self.current_time)
+
+        alive, pending = timeline.keys_at(stage_time)
+        for spawn_time, _, key_index in alive:
+            key_info = self.keys_to_spawn[key_index]
+            key = self._create_key(key_info, start_time + spawn_time)
+            items.append(key)
+            if spawn_time >= loop_start:
+                # このループで出た鍵は出現済みにする
+                key_info["spawned"] = True
+        for spawn_time, key_index in pending:
+            self._schedule_spawn(self.keys_to_spawn[key_index], start_time + spawn_time)
+        for i in range(len(self.digit_controllers)):
+            self._schedule_next_step_spawns(i)
+
     def update(self, dt, items, player):
         if self.is_stage_clear:
             return
         
-        current_time = pygame.time.get_ticks() / 1000.0
-        loop_completed = []
-
-        self._check_index_zero_spawn(current_time)
+        self.current_time += dt
+        current_time = self.current_time
+
+        if self.chunks is not None:
+            self.stream_chunks(player.x + player.width / 2, player.y + player.height / 2)
+
+        # 期限が来たイベントだけを予定時刻順に処理する
+        for due_time, kind, payload in self.scheduler.pop_due(current_time + TIME_EPSILON):
+            if kind == EVENT_BEAT:
+                self._on_beat(payload, due_time)
+            elif kind == EVENT_CHUNK_BEAT:
+                self._on_chunk_beat(payload)
+            elif kind == EVENT_KEY_SPAWN:
+                self._on_key_spawn(payload, due_time, items)
+            elif kind == EVENT_KEY_EXPIRE:
+                self._on_key_expire(payload, items)
+            elif kind == EVENT_SOUND:
+                self._on_sound(payload, current_time)
+            elif kind == EVENT_TEMPO:
+                self._schedule_countdown(due_time)
 
-        # カウント音処理
-        if not self.final_stage:
-            elapsed = current_time - self.global_last_change_time
-            if elapsed < self.global_change_time:
-                remaining = self.global_change_time - elapsed
-                threshold_1 = self.global_change_time * 0.55
-                threshold_2 = self.global_change_time * 0.30
-                threshold_3 = self.global_change_time * 0.05
-                if remaining <= threshold_1 and not self.pi_sound_flags["1.1"]:
-                    if self.sound_manager:
-                        self.sound_manager.play("pi")
-                    self.pi_sound_flags["1.1"] = True
-                if remaining <= threshold_2 and not self.pi_sound_flags["0.6"]:
-                    if self.sound_manager:
-                        self.sound_manager.play("pi")
-                    self.pi_sound_flags["0.6"] = True
-                if remaining <= threshold_3 and not self.pi_sound_flags["0.1"]:
-                    if self.sound_manager:
-                        self.sound_manager.play("pi")
-                    self.pi_sound_flags["0.1"] = True
-            else:
-                self.global_last_change_time = current_time
-                self.pi_sound_flags = {"1.1": False, "0.6": False, "0.1": False}
-
-        self._update_keys_and_enemies(dt,items,current_time,player)
-
-        # 各 Digit の更新
-        for i, (controller, digit) in enumerate(zip(self.digit_controllers, self.digits)):
-            changed, new_number = controller.update(current_time)
-            if changed:
-                digit.set_number(new_number)
-                if controller.sequence_index == 0:
-                    loop_completed.append(i)
-                self.current_sequence_index = controller.sequence_index + 1
-                for key_info in self.keys_to_spawn:
-                    if (not key_info["spawned"] and key_info.get("digit_index", 0) == i and 
-                        key_info["index"] == controller.sequence_index):
-                        key_info["spawn_time"] = current_time + key_info["delay"]
-                        key_info["spawned"] = True
-
-        if loop_completed:
-            self.current_loop += 1
-            for key_info in self.keys_to_spawn:
-                key_info["spawned"] = False
-                key_info["spawn_time"] = None
+        for item in items:
+            if isinstance(item, Key) and item.collected:
+                self.increment_consecutive_keys()
 
         # 最終ステージ専用の出現管理
         if self.final_stage:
             # Group A をアクティブ化する条件の確認
             if not self.groupB_activated:
                 if player.y < self.digit_activation_threshold:
-                    for digit in self.digits:
-                        if getattr(digit, "group", "B") == "A":
-                            digit.active = True
+                    for digit in self.digit_index.group("A"):
+                        digit.active = True
                     self.groupB_activated = True
-                    self.sound_manager.play("spawn_one")
-                    self.sound_manager.play_music("heart.mp3")
+                    if self.sound_manager:
+                        self.sound_manager.play("spawn_one")
+                        self.sound_manager.play_music("heart.mp3")
             
             # Group B の一部を非表示にする条件の確認
             if self.groupB_activated and not self.groupA_removed:
                 if player.y < self.digit_removal_threshold:
-                    for digit in self.digits:
-                        if getattr(digit, "group", "B") == "B" and digit.y > self.digit_removal_threshold:
-                            digit.active = False
+                    for digit in self.digit_index.group_below("B", self.digit_removal_threshold):
+                        digit.active = False
                     self.groupA_removed = True
 
         # Key取得の管理
@@ -313,78 +430,301 @@ class StageManager:
                 else:
                     self.clear_timer_start = current_time
 
-    # 以下のメソッドも同様に修正
-
-    def _check_index_zero_spawn(self, current_time):
-        if self.sequence_index == 0:
-            for key_info in self.keys_to_spawn:
-                if key_info["index"] == 0 and not key_info["spawned"]:
-                    key_info["spawn_time"] = current_time + key_info["delay"]
-                    key_info["spawned"] = True
-        if self.final_stage:
-            for key_info in self.keys_to_spawn:
-                if not key_info["spawned"]:
-                    key_info["spawn_time"] = current_time
-                    key_info["spawned"] = True
-
-    def _update_keys_and_enemies(self, dt, items, current_time, player):    
+    def _schedule_countdown(self, start_time, skip_before=None):
+        """
+        start_time から 1 周期分のカウント音と次の周期を登録する
+        skip_before: これ以前のカウント音は登録しない (シーク時に鳴らさないため)
+        """
+        self.global_last_change_time = start_time
+        period = self.global_change_time
+        for ratio in COUNTDOWN_RATIOS:
+            due_time = start_time + (period - period * ratio)
+            if skip_before is None or due_time > skip_before:
+                self._schedule_sound("pi", due_time)
+        self.scheduler.schedule(start_time + period, EVENT_TEMPO)
+
+    def _schedule_spawn(self, key_info, spawn_time):
+        key_info["spawn_time"] = spawn_time
+        key_info["spawned"] = True
+        self.scheduler.schedule(spawn_time, EVENT_KEY_SPAWN, (key_info, self.spawn_generation))
+        # **4-3ではキーのスポーン音を鳴らさない**
+        # ループの切り替わりで取り消される出現は音も鳴らさない
+        if not self.final_stage and spawn_time < self._next_loop_time():
+            self._schedule_sound("key_spawn", spawn_time, self.spawn_generation)
+
+    def _next_loop_time(self):
+        """次に Digit 0 が一周する時刻"""
+        if not self.digit_controllers or not self.digit_controllers[0].sequence:
+            return float("inf")
+        controller = self.digit_controllers[0]
+        remaining = len(controller.sequence) - controller.sequence_index
+        return controller.last_change_time + remaining * controller.time_per_number
+
+    def sound_lookahead(self):
+        """
+        効果音を予定時刻よりどれだけ前に発行するか (秒)
+        次の更新まで待つと最大 1 ステップ遅れるうえ、ミキサーの遅れもあるため、その分だけ先に出す
+        """
+        latency = getattr(self.sound_manager, "output_latency", 0.0)
+        return FIXED_DT + latency
+
+    def _schedule_sound(self, name, due_time, generation=None):
+        """due_time に聞こえるよう、先読み分だけ前に発行を登録する"""
+        self.scheduler.schedule(due_time - self.sound_lookahead(), EVENT_SOUND, (name, due_time, generation))
+
+    def _on_sound(self, payload, current_time):
+        name, due_time, generation = payload
+        if generation is not None and generation != self.spawn_generation:
+            return
+        latency = getattr(self.sound_manager, "output_latency", 0.0)
+        # 予定時刻までの残りからミキサーの遅れを引いた分だけ無音を足して鳴らす
+        delay = max(0.0, due_time - current_time - latency)
+        result = None
+        if self.sound_manager:
+            if delay > 0:
+                result = self.sound_manager.play_delayed(name, delay)
+            else:
+                result = self.sound_manager.play(name)
+        if self.sound_timing_log is not None:
+            # 頼んだ遅延ではなく、SoundManager が実際に足した無音で記録する
+            padded = bool(result and result.padded)
+            padding = result.delay_ms / 1000 if padded else 0.0
+            channel = bool(result and result.channel)
+            offset = current_time + padding + latency - due_time if channel else None
+            self.sound_timing_log.append(
+                SoundTiming(name, due_time, current_time, delay, padded, padding, channel, latency, offset)
+            )
+
+    def _schedule_loop_start_spawns(self, loop_time):
+        """ループの先頭 (index 0) で出現する鍵を登録する。最終ステージは全ての鍵を即出現"""
         for key_info in self.keys_to_spawn:
-            if (key_info["spawned"] and key_info["spawn_time"] is not None and current_time >= key_info["spawn_time"]):
-                if self.final_stage:  
-                    key = FinalKey(key_info["x"], key_info["y"], duration=key_info["lifespan"], number=key_info["number"])
-                else:
-                    key = Key(key_info["x"], key_info["y"], duration=key_info["lifespan"], number=key_info["number"])
-                
-                key.spawn_time = current_time
-                items.append(key)
-                self.active_keys.append(key)
-                key_info["spawn_time"] = None
-                
-                # **4-3ではキーのスポーン音を鳴らさない**
-                if not self.final_stage and self.sound_manager:
-                    self.sound_manager.play("key_spawn")
-
-        # **キーが時間切れで消滅する処理**
-        for key in self.active_keys[:]:
-            if not key.collected:
-                elapsed = current_time - key.spawn_time
-                if elapsed >= key.duration:
-                    self.active_keys.remove(key)
-                    if key in items:
-                        items.remove(key)
-                    self.consecutive_keys = 0
+            if key_info["spawned"]:
+                continue
+            if key_info["index"] == 0:
+                self._schedule_spawn(key_info, loop_time + key_info["delay"])
+            elif self.final_stage:
+                self._schedule_spawn(key_info, loop_time)
+
+    def _on_beat(self, digit_index, beat_time):
+        """
+        共有の DigitController の数字切り替え。購読している Digit だけに反映する
+        次の切り替えは予定時刻から数えて登録する
+        """
+        controller = self.digit_controllers[digit_index]
+        controller.set_digits_number(controller.advance())
+        self.scheduler.schedule(controller.next_change_time, EVENT_BEAT, digit_index)
+        self.current_sequence_index = controller.sequence_index + 1
+
+        if controller.sequence_index == 0:
+            # 同時刻に複数の Digit が一周しても 1 回として数える
+            if self.last_loop_time != beat_time:
+                self.last_loop_time = beat_time
+                self.current_loop += 1
+                # 出現待ちの鍵は取り消してループ先頭から出し直す
+                self.spawn_generation += 1
+                for key_info in self.keys_to_spawn:
+                    key_info["spawned"] = False
+                    key_info["spawn_time"] = None
+                self._schedule_loop_start_spawns(beat_time)
+
+        self._schedule_next_step_spawns(digit_index)
+
+    def stream_chunks(self, center_x, center_y):
+        """
+        (center_x, center_y) の周りのチャンクを読み込み、離れたチャンクを解放する
+        読み込み・解放の対象は周りの一定数のチャンクだけなので、ステージの大きさによらない
+        """
+        chunk_w, chunk_h = self.chunks.chunk_size
+        max_w, max_h = self.chunks.max_digit_size
+        half_w = SCREEN_WIDTH * (0.5 + STREAM_MARGIN)
+        half_h = SCREEN_HEIGHT * (0.5 + STREAM_MARGIN)
+        # チャンクは Digit の左上で決まるので、左上の余白に Digit の大きさを足す
+        cx0, cy0 = chunk_key(int(center_x - half_w - max_w), int(center_y - half_h - max_h), self.chunks.chunk_size)
+        cx1, cy1 = chunk_key(int(center_x + half_w), int(center_y + half_h), self.chunks.chunk_size)
+
+        # 境界を行き来するたびに読み直さないよう、解放は 1 チャンク分離れてから
+        released = [
+            key for key in self.resident_chunks
+            if not (cx0 - 1 <= key[0] <= cx1 + 1 and cy0 - 1 <= key[1] <= cy1 + 1)
+        ]
+        loaded = [
+            (cx, cy)
+            for cy in range(cy0, cy1 + 1)
+            for cx in range(cx0, cx1 + 1)
+            if (cx, cy) in self.chunks and (cx, cy) not in self.resident_chunks
+        ]
+        if not released and not loaded:
+            return
+        self._release_chunks(released)
+        for key in loaded:
+            self._load_chunk(key)
+        self._rebuild_resident_digits()
+
+    def _load_chunk(self, key):
+        """
+        チャンクの Digit を作り、同じ sequence の DigitController を購読させる
+        読み込み済みの DigitController が無ければ、今の時刻の状態で作って切り替えを登録する
+        """
+        chunk = ResidentChunk(key)
+        for d_info in load_chunk_digits(self.stage_definition, key):
+            controller = self._chunk_controller(d_info.sequence, d_info.initial_time)
+            digit = Digit(
+                x=d_info.x,
+                y=d_info.y,
+                width=d_info.width,
+                height=d_info.height,
+                number=d_info.sequence[controller.sequence_index],
+                properties_override=self.stage_data.get("segment_properties_override"),
+                bank=self.digit_bank
+            )
+            digit.group = d_info.group
+            digit.active = self._chunk_digit_active(digit)
+            controller.subscribe(digit)
+            chunk.digits.append(digit)
+            chunk.controllers.append(controller)
+        self.resident_chunks[key] = chunk
+
+    def _chunk_controller(self, sequence, initial_time):
+        """チャンクの Digit が購読する DigitController (常に読み込む Digit と同じならそれを共有する)"""
+        shared = (sequence, initial_time)
+        for controller in self.digit_controllers:
+            if (controller.sequence, controller.initial_time) == shared:
+                return controller
+        controller = self.chunk_controllers.get(shared)
+        if controller is None:
+            controller = DigitController(sequence, initial_time, start_time=self.stage_start_time)
+            if sequence:
+                elapsed = self.current_time - self.stage_start_time + TIME_EPSILON
+                step = sequence_step(len(sequence), initial_time, elapsed)
+                controller.sequence_index = step.sequence_index
+                controller.last_change_time = self.stage_start_time + step.last_change_time
+                self.scheduler.schedule(controller.next_change_time, EVENT_CHUNK_BEAT, controller)
+            self.chunk_controllers[shared] = controller
+        return controller
+
+    def _chunk_digit_active(self, digit):
+        """途中から読み込んだ Digit の表示状態 (最終ステージのグループ切り替えを反映する)"""
+        if not self.final_stage:
+            return True
+        if digit.group == "A":
+            return self.groupB_activated
+        return not (self.groupA_removed and digit.y > self.digit_removal_threshold)
+
+    def _release_chunks(self, keys):
+        """
+        チャンクの Digit を捨てる (self.digits は呼び出し側で作り直す)
+        購読する Digit がいなくなったチャンク用の DigitController も捨てる
+        """
+        for key in keys:
+            chunk = self.resident_chunks.pop(key)
+            for digit, controller in zip(chunk.digits, chunk.controllers):
+                controller.unsubscribe(digit)
+                self.digit_bank.release(digit.slot)
+                if not controller.digits and controller not in self.digit_controllers:
+                    self.chunk_controllers.pop((controller.sequence, controller.initial_time), None)
+
+    def _rebuild_resident_digits(self):
+        """常に読み込む Digit + 読み込み中のチャンクの Digit で self.digits を作り直す"""
+        # CollisionWorld が同じ list を参照しているので中身を入れ替える
+        del self.digits[self.pinned_digit_count:]
+        for chunk in self.resident_chunks.values():
+            self.digits.extend(chunk.digits)
+        self.collision_world.set_digits(self.digits)
+        self.digit_index.rebuild(self.digits)
+
+    def _on_chunk_beat(self, controller):
+        # 捨てた DigitController の予定は何もしない
+        if self.chunk_controllers.get((controller.sequence, controller.initial_time)) is not controller:
+            return
+        controller.set_digits_number(controller.advance())
+        self.scheduler.schedule(controller.next_change_time, EVENT_CHUNK_BEAT, controller)
+
+    def _schedule_next_step_spawns(self, digit_index):
+        """
+        次の切り替えで出る鍵を、切り替えを待たずに今登録する
+        出現音を先読みで鳴らせるように、1 つ前の切り替えの時点で予定を入れておく
+        (ループ先頭 index 0 の鍵は一周したときに _schedule_loop_start_spawns で登録する)
+        """
+        controller = self.digit_controllers[digit_index]
+        next_index = (controller.sequence_index + 1) % len(controller.sequence)
+        if next_index == 0:
+            return
+        change_time = controller.next_change_time
+        for key_info in self.spawns_by_step.get((digit_index, next_index), ()):
+            if not key_info["spawned"]:
+                self._schedule_spawn(key_info, change_time + key_info["delay"])
+
+    def _on_key_spawn(self, payload, spawn_time, items):
+        key_info, generation = payload
+        if generation != self.spawn_generation:
+            return
+        items.append(self._create_key(key_info, spawn_time))
+        key_info["spawn_time"] = None
 
-        for item in items:
-            if isinstance(item, Key) and item.collected:
-                self.increment_consecutive_keys()
+    def _create_key(self, key_info, spawn_time):
+        """鍵を作り、消滅を登録する"""
+        if self.final_stage:
+            key = FinalKey(key_info["x"], key_info["y"], duration=key_info["lifespan"], number=key_info["number"])
+        else:
+            key = Key(key_info["x"], key_info["y"], duration=key_info["lifespan"], number=key_info["number"])
+        key.spawn_time = spawn_time
+        self.active_keys.append(key)
+        self.scheduler.schedule(spawn_time + key.duration, EVENT_KEY_EXPIRE, key)
+        return key
+
+    def _on_key_expire(self, key, items):
+        """**キーが時間切れで消滅する処理**"""
+        self.active_keys.remove(key)
+        if not key.collected:
+            if key in items:
+                items.remove(key)
+            self.consecutive_keys = 0
 
     def increment_consecutive_keys(self):
         self.consecutive_keys += 1
 
 
 class DigitController:
-    def __init__(self, sequence, initial_time):
+    """
+    sequence を initial_time 秒ごとに進める。同じ sequence・切り替え間隔の Digit で共有し、
+    数字が変わったときは購読している Digit だけに反映する
+    """
+    def __init__(self, sequence, initial_time, start_time=0.0):
         self.sequence = sequence
         self.sequence_index = 0
         self.initial_time = initial_time
         self.time_per_number = initial_time
-        self.last_change_time = pygame.time.get_ticks() / 1000.0
-
-    def update(self, current_time):
-        if not self.sequence:
-            return False, 0
-        time_since_change = current_time - self.last_change_time
-        changed = False
-        if time_since_change >= self.time_per_number:
-            self.sequence_index = (self.sequence_index + 1) % len(self.sequence)
-            self.last_change_time = current_time
-            changed = True
-        return changed, self.sequence[self.sequence_index]
+        self.last_change_time = start_time
+        # この DigitController に従う Digit
+        self.digits = []
+
+    def subscribe(self, digit):
+        self.digits.append(digit)
+
+    def unsubscribe(self, digit):
+        self.digits.remove(digit)
+
+    def set_digits_number(self, number):
+        for digit in self.digits:
+            digit.set_number(number)
+
+    @property
+    def next_change_time(self):
+        return self.last_change_time + self.time_per_number
+
+    def advance(self):
+        """
+        次の数字に進めて返す
+        切り替え時刻は前回の予定時刻から数えるので、フレームの遅れが積み重ならない
+        """
+        self.last_change_time = self.next_change_time
+        self.sequence_index = (self.sequence_index + 1) % len(self.sequence)
+        return self.sequence[self.sequence_index]
 
     def speed_up(self):
         pass
 
-    def reset(self):
+    def reset(self, current_time):
         self.sequence_index = 0
         self.time_per_number = self.initial_time
-        self.last_change_time = pygame.time.get_ticks() / 1000.0
\ No newline at end of file
+        self.last_change_time = current_time
\ No newline at end of file
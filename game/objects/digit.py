@@ -1,6 +1,7 @@
 import pygame
-import time
 import math
+import numpy as np
+from collections import OrderedDict
 
 SEGMENT_MAP = {
     "0": {"A":1,"B":1,"C":1,"D":1,"E":1,"F":1,"G":0},
@@ -41,141 +42,513 @@ SEGMENT_MAP = {
     "R": {"A":0,"B":0,"C":0,"D":0,"E":1,"F":0,"G":1},
     "O": {"A":0,"B":0,"C":1,"D":1,"E":1,"F":0,"G":1},
     }
+
+# セグメント A～G をビット 0～6 に割り当てる
+SEGMENTS = ("A", "B", "C", "D", "E", "F", "G")
+SEGMENT_BITS = {seg: 1 << i for i, seg in enumerate(SEGMENTS)}
+
+
+def _compile_glyph(mapping):
+    mask = 0
+    for seg, on in mapping.items():
+        if on:
+            mask |= SEGMENT_BITS[seg]
+    return mask
+
+
+# 起動時に SEGMENT_MAP を 7bit マスクへ変換しておく
+GLYPH_MASKS = {char: _compile_glyph(mapping) for char, mapping in SEGMENT_MAP.items()}
+
+# ステージデータに現れる数値・小文字も事前登録 (str().upper() を毎回しないため)
+_GLYPH_LOOKUP = dict(GLYPH_MASKS)
+for _n in range(10):
+    _GLYPH_LOOKUP[_n] = GLYPH_MASKS[str(_n)]
+for _char, _mask in GLYPH_MASKS.items():
+    _GLYPH_LOOKUP.setdefault(_char.lower(), _mask)
+
+
+def glyph_mask(char):
+    """文字に対応するセグメントのビットマスクを返す (未定義の文字は 0)"""
+    if char is None:
+        return 0
+    mask = _GLYPH_LOOKUP.get(char)
+    if mask is None:
+        mask = GLYPH_MASKS.get(str(char).upper(), 0)
+    return mask
+
+
+# 消灯時の点滅 abs(sin(t*10)) を半周期分だけ表にしておく
+BLINK_TABLE_SIZE = 256
+_BLINK_STEPS_PER_SECOND = BLINK_TABLE_SIZE * 10 / math.pi
+BLINK_ALPHA_TABLE = tuple(
+    int(255 * abs(math.sin(i * math.pi / BLINK_TABLE_SIZE)))
+    for i in range(BLINK_TABLE_SIZE)
+)
+
+
+_BLINK_ALPHA_ARRAY = np.array(BLINK_ALPHA_TABLE, dtype=np.int16)
+
+
+def blink_alpha(timers):
+    """消灯中セグメントのアルファ値 (timers: 経過秒の配列。表引きでまとめて求める)"""
+    steps = (timers * _BLINK_STEPS_PER_SECOND).astype(np.int64)
+    return _BLINK_ALPHA_ARRAY[steps % BLINK_TABLE_SIZE]
+
+
+class SegmentSurfaceAtlas:
+    """
+    全 Digit で共有するセグメント描画用 Surface。
+    (segment, width, height, color) ごとに 1 枚だけ作り、上限を超えたら古いものから破棄する。
+    アルファは blit 直前に set_alpha で設定する。
+    """
+    def __init__(self, max_surfaces=256):
+        self.max_surfaces = max_surfaces
+        self._surfaces = OrderedDict()
+
+    def get(self, seg, width, height, color):
+        key = (seg, width, height, color)
+        surf = self._surfaces.get(key)
+        if surf is None:
+            surf = pygame.Surface((width, height))
+            surf.fill(color)
+            self._surfaces[key] = surf
+            if len(self._surfaces) > self.max_surfaces:
+                self._surfaces.popitem(last=False)
+        else:
+            self._surfaces.move_to_end(key)
+        return surf
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+
+SEGMENT_ATLAS = SegmentSurfaceAtlas()
+
+
+# セグメントの状態 (DigitBank の phase 配列の値)
+PHASE_OFF = 0
+PHASE_REMAIN = 1
+PHASE_TURNING_OFF = 2
+PHASE_TURNING_ON = 3
+PHASE_NAMES = ("off", "remain", "turning_off", "turning_on")
+PHASE_IDS = {name: i for i, name in enumerate(PHASE_NAMES)}
+
+DEFAULT_TRANSITION_DURATION = 0.8
+
+# ビットマスク <-> セグメント配列の変換表
+_BIT_WEIGHTS = np.array([SEGMENT_BITS[seg] for seg in SEGMENTS], dtype=np.int64)
+MASK_SEGMENTS = np.array(
+    [[bool(mask & bit) for bit in _BIT_WEIGHTS] for mask in range(1 << len(SEGMENTS))],
+    dtype=bool
+)
+
+
+class DigitBank:
+    """
+    ステージ内の全 Digit のセグメント状態をまとめて持つ (Struct of Arrays)。
+    タイマー・状態・アルファは (digit, segment) の NumPy 配列で、
+    トランジション中の Digit をまとめて 1 回の配列演算で進める。
+    Digit はこの配列の 1 行を参照するだけの薄いビューになる。
+    """
+    def __init__(self, capacity=8):
+        self.size = 0
+        # release() で空いた行 (add() で再利用する)
+        self._free = []
+        self._allocate(max(1, capacity))
+
+    def _allocate(self, capacity):
+        segs = len(SEGMENTS)
+        old_size = self.size
+        arrays = {
+            "timer": np.zeros((capacity, segs), dtype=np.float64),
+            "duration": np.full((capacity, segs), DEFAULT_TRANSITION_DURATION, dtype=np.float64),
+            "phase": np.zeros((capacity, segs), dtype=np.int8),
+            "alpha": np.zeros((capacity, segs), dtype=np.int16),
+            "active": np.zeros((capacity, segs), dtype=bool),
+            "current_mask": np.zeros(capacity, dtype=np.int64),
+            "active_mask": np.zeros(capacity, dtype=np.int64),
+            "platform_version": np.zeros(capacity, dtype=np.int64),
+            "transitioning": np.zeros(capacity, dtype=bool),
+        }
+        for name, array in arrays.items():
+            if old_size:
+                array[:old_size] = getattr(self, name)[:old_size]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self):
+        """新しい Digit 用の行を確保して番号を返す"""
+        if self._free:
+            return self._free.pop()
+        if self.size >= self.capacity:
+            self._allocate(self.capacity * 2)
+        slot = self.size
+        self.size += 1
+        return slot
+
+    def release(self, slot):
+        """使わなくなった Digit の行を消灯して空ける (読み込み範囲から外れたチャンク用)"""
+        self.set_mask(slot, 0)
+        self._free.append(slot)
+
+    def set_mask(self, slot, mask):
+        """トランジションなしで表示を切り替える"""
+        on = MASK_SEGMENTS[mask]
+        self.timer[slot] = 0.0
+        self.phase[slot] = np.where(on, PHASE_REMAIN, PHASE_OFF)
+        self.active[slot] = on
+        self.alpha[slot] = np.where(on, 255, 0)
+        self.current_mask[slot] = mask
+        self.transitioning[slot] = False
+        self._set_active_mask(slot, mask)
+
+    def start_transition(self, slot, new_mask):
+        old_mask = int(self.current_mask[slot])
+        remain = MASK_SEGMENTS[old_mask & new_mask]
+        turning_off = MASK_SEGMENTS[old_mask & ~new_mask]
+        turning_on = MASK_SEGMENTS[new_mask & ~old_mask]
+
+        phase = np.full(len(SEGMENTS), PHASE_OFF, dtype=np.int8)
+        phase[remain] = PHASE_REMAIN
+        phase[turning_off] = PHASE_TURNING_OFF
+        phase[turning_on] = PHASE_TURNING_ON
+        self.phase[slot] = phase
+        self.timer[slot] = 0.0
+        # 消えていくセグメントは消えきるまで足場として残る
+        self.active[slot] = remain | turning_off
+        self.alpha[slot] = np.where(remain | turning_off, 255, 0)
+        self.current_mask[slot] = new_mask
+        self.transitioning[slot] = bool(turning_off.any() or turning_on.any())
+        self._set_active_mask(slot, old_mask)
+
+    def _set_active_mask(self, slot, mask):
+        if self.active_mask[slot] != mask:
+            self.active_mask[slot] = mask
+            self.platform_version[slot] += 1
+
+    def update(self, dt, slot=None):
+        """
+        トランジション中のセグメントを dt 秒進める
+        slot を指定した場合はその Digit だけを進める
+        """
+        if slot is None:
+            rows = np.flatnonzero(self.transitioning[:self.size])
+        elif self.transitioning[slot]:
+            rows = np.array([slot])
+        else:
+            return
+        if rows.size == 0:
+            return
+
+        phase = self.phase[rows]
+        turning_off = phase == PHASE_TURNING_OFF
+        turning_on = phase == PHASE_TURNING_ON
+
+        timer = self.timer[rows]
+        timer[turning_off | turning_on] += dt
+        running = timer < self.duration[rows]
+        alpha = self.alpha[rows]
+        active = self.active[rows]
+
+        # 消灯: 点滅しながら消え、時間切れで off
+        blinking = turning_off & running
+        alpha[blinking] = blink_alpha(timer[blinking])
+        finished_off = turning_off & ~running
+        alpha[finished_off] = 0
+        active[finished_off] = False
+        phase[finished_off] = PHASE_OFF
+
+        # 点灯: 徐々に明るくなり、半分を過ぎたら足場になる
+        fading = turning_on & running
+        ratio = timer / self.duration[rows]
+        alpha[fading] = (255 * ratio[fading]).astype(np.int16)
+        active[fading & (ratio > 0.5)] = True
+        finished_on = turning_on & ~running
+        alpha[finished_on] = 255
+        active[finished_on] = True
+        phase[finished_on] = PHASE_REMAIN
+
+        self.timer[rows] = timer
+        self.alpha[rows] = alpha
+        self.active[rows] = active
+        self.phase[rows] = phase
+
+        active_masks = active @ _BIT_WEIGHTS
+        changed = active_masks != self.active_mask[rows]
+        self.active_mask[rows] = active_masks
+        self.platform_version[rows[changed]] += 1
+        self.transitioning[rows] = ((phase == PHASE_TURNING_OFF) | (phase == PHASE_TURNING_ON)).any(axis=1)
+
+    def phase_mask(self, slot, phase_id):
+        return int(((self.phase[slot] == phase_id) @ _BIT_WEIGHTS))
+
+
+# セグメントごとの基本プロパティ
+DEFAULT_SEGMENT_PROPERTIES = {
+    "A": {"one_way": True},
+    "B": {"one_way": False},
+    "C": {"one_way": False},
+    "D": {"one_way": True},
+    "E": {"one_way": False},
+    "F": {"one_way": False},
+    "G": {"one_way": True},
+}
+
+
+class SegmentProperties(dict):
+    """
+    上書き設定ごとに 1 つだけ作られ、全 Digit で共有されるセグメントプロパティ。
+    共有物なので変更しないこと (deepcopy しても同じオブジェクトを返す)。
+    """
+    __slots__ = ()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+_SEGMENT_PROPERTIES_CACHE = {}
+
+
+def get_segment_properties(properties_override=None):
+    """segment_properties_override に対応する共有 SegmentProperties を返す"""
+    override_key = ()
+    if properties_override:
+        override_key = tuple(sorted(
+            (seg, tuple(sorted(override.items())))
+            for seg, override in properties_override.items()
+            if seg in DEFAULT_SEGMENT_PROPERTIES
+        ))
+    properties = _SEGMENT_PROPERTIES_CACHE.get(override_key)
+    if properties is None:
+        properties = SegmentProperties(
+            (seg, dict(props)) for seg, props in DEFAULT_SEGMENT_PROPERTIES.items()
+        )
+        for seg, override in override_key:
+            properties[seg].update(override)
+        _SEGMENT_PROPERTIES_CACHE[override_key] = properties
+    return properties
+
+
 class DigitSegmentState:
-    def __init__(self, transition_duration=0.8):
-        self.phase = "off"
-        self.active = False
-        self.timer = 0.0
-        self.alpha = 255
-        self.transition_duration = transition_duration
+    """DigitBank の 1 セグメント分を属性として見せるビュー"""
+    __slots__ = ("bank", "slot", "index")
+
+    def __init__(self, bank, slot, index):
+        self.bank = bank
+        self.slot = slot
+        self.index = index
+
+    @property
+    def phase(self):
+        return PHASE_NAMES[self.bank.phase[self.slot, self.index]]
+
+    @phase.setter
+    def phase(self, value):
+        self.bank.phase[self.slot, self.index] = PHASE_IDS[value]
+
+    @property
+    def active(self):
+        return bool(self.bank.active[self.slot, self.index])
+
+    @active.setter
+    def active(self, value):
+        self.bank.active[self.slot, self.index] = value
+
+    @property
+    def timer(self):
+        return float(self.bank.timer[self.slot, self.index])
+
+    @timer.setter
+    def timer(self, value):
+        self.bank.timer[self.slot, self.index] = value
+
+    @property
+    def alpha(self):
+        return int(self.bank.alpha[self.slot, self.index])
+
+    @alpha.setter
+    def alpha(self, value):
+        self.bank.alpha[self.slot, self.index] = value
+
+    @property
+    def transition_duration(self):
+        return float(self.bank.duration[self.slot, self.index])
+
+    @transition_duration.setter
+    def transition_duration(self, value):
+        self.bank.duration[self.slot, self.index] = value
+
 
 class Digit:
-    def __init__(self, x, y, width, height, number=None, properties_override=None):
+    __slots__ = (
+        "bank", "slot", "_active",
+        "_x", "_y", "_width", "_height", "color",
+        "_segment_rects", "_merged_rects", "_platform_cache",
+        "segment_properties", "_segments_state",
+        "current_number", "next_number",
+        "group",
+    )
+
+    def __init__(self, x, y, width, height, number=None, properties_override=None, bank=None):
+        # セグメント状態は DigitBank の 1 行 (指定がなければ専用の Bank を持つ)
+        self.bank = bank if bank is not None else DigitBank(capacity=1)
+        self.slot = self.bank.add()
+        self._active = True
+
+        # 足場矩形のキャッシュ (位置・サイズが変わったら破棄)
+        self._segment_rects = None
+        self._merged_rects = None
+        self._platform_cache = {}
+
         self.x = x
         self.y = y
         self.width = width
         self.height = height
         self.color = (255, 255, 255)
+        # 最終ステージのグループ (StageManager が設定する)
+        self.group = "B"
 
-        self.segment_properties = {
-            "A": {"one_way": True},
-            "B": {"one_way": False},
-            "C": {"one_way": False},
-            "D": {"one_way": True},
-            "E": {"one_way": False},
-            "F": {"one_way": False},
-            "G": {"one_way": True},
-        }
-        if properties_override:
-            for key, override in properties_override.items():
-                if key in self.segment_properties:
-                    self.segment_properties[key].update(override)
+        # 上書き設定が同じ Digit 同士で共有する
+        self.segment_properties = get_segment_properties(properties_override)
 
-        self.segments_state = {}
-        for seg in self.segment_properties.keys():
-            self.segments_state[seg] = DigitSegmentState()
+        # DigitSegmentState のビューは参照されたときに作る
+        self._segments_state = None
 
         self.current_number = None
         self.next_number = number
-        self.is_transitioning = False
-        self.transition_start_time = time.time()
 
         self.active = True
 
         self.set_number(number)
-        
+
+
+    # 位置・サイズの変更で矩形キャッシュを無効化する
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+        self._invalidate_geometry()
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+        self._invalidate_geometry()
+
+    @property
+    def width(self):
+        return self._width
+
+    @width.setter
+    def width(self, value):
+        self._width = value
+        self._invalidate_geometry()
+
+    @property
+    def height(self):
+        return self._height
+
+    @height.setter
+    def height(self, value):
+        self._height = value
+        self._invalidate_geometry()
+
+    # 表示/非表示・点灯セグメントの変更で足場のバージョンを進める
+    @property
+    def active(self):
+        return self._active
+
+    @active.setter
+    def active(self, value):
+        if value != self._active:
+            self._active = value
+            self.bank.platform_version[self.slot] += 1
+
+    @property
+    def segments_state(self):
+        if self._segments_state is None:
+            self._segments_state = {
+                seg: DigitSegmentState(self.bank, self.slot, i)
+                for i, seg in enumerate(SEGMENTS)
+            }
+        return self._segments_state
+
+    # セグメント状態は DigitBank から読み出す
+    @property
+    def platform_version(self):
+        return int(self.bank.platform_version[self.slot])
+
+    @property
+    def active_mask(self):
+        return int(self.bank.active_mask[self.slot])
+
+    @property
+    def current_mask(self):
+        return int(self.bank.current_mask[self.slot])
+
+    @property
+    def remain_mask(self):
+        return self.bank.phase_mask(self.slot, PHASE_REMAIN)
+
+    @property
+    def turning_on_mask(self):
+        return self.bank.phase_mask(self.slot, PHASE_TURNING_ON)
+
+    @property
+    def turning_off_mask(self):
+        return self.bank.phase_mask(self.slot, PHASE_TURNING_OFF)
+
+    @property
+    def is_transitioning(self):
+        return bool(self.bank.transitioning[self.slot])
+
+    def _invalidate_geometry(self):
+        self._segment_rects = None
+        self._merged_rects = None
+        self._platform_cache = {}
+        self.bank.platform_version[self.slot] += 1
 
     def get_segments_for_character(self, char):
-        if char is None:
-            return { seg:0 for seg in self.segment_properties.keys() }
-        # SEGMENT_MAP から取得
-        return SEGMENT_MAP.get(str(char).upper(),
-                               { seg:0 for seg in self.segment_properties.keys() })
+        mask = glyph_mask(char)
+        return {seg: (1 if mask & SEGMENT_BITS[seg] else 0) for seg in SEGMENTS}
 
     def set_number(self, number):
-        mapping = self.get_segments_for_character(number)
-        for seg, st in self.segments_state.items():
-            if mapping.get(seg,0) == 1:
-                st.phase = "remain"
-                st.active = True
-                st.timer = 0.0
-                st.alpha = 255
-            else:
-                st.phase = "off"
-                st.active = False
-                st.timer = 0.0
-                st.alpha = 0
+        self.bank.set_mask(self.slot, glyph_mask(number))
         self.current_number = number
         self.next_number = number
 
     def start_transition(self, new_number):
-        old_map = self.get_segments_for_character(self.current_number)
-        new_map = self.get_segments_for_character(new_number)
-        for seg, st in self.segments_state.items():
-            st.timer = 0.0
-            old_on = old_map.get(seg,0)
-            new_on = new_map.get(seg,0)
-            if old_on==1 and new_on==1:
-                st.phase = "remain"
-                st.active = True
-                st.alpha = 255
-            elif old_on==1 and new_on==0:
-                st.phase = "turning_off"
-                st.active = True
-                st.alpha = 255
-            elif old_on==0 and new_on==1:
-                st.phase = "turning_on"
-                st.active = False
-                st.alpha = 0
-            else:
-                st.phase = "off"
-                st.active = False
-                st.alpha = 0
-        self.is_transitioning = True
+        # 点灯し続ける / 消えていく / 点いていく セグメントをマスク演算で決める
+        self.bank.start_transition(self.slot, glyph_mask(new_number))
         self.current_number = new_number
-        self.transition_start_time = pygame.time.get_ticks() / 1000.0
 
     def update(self, dt):
-        if not self.is_transitioning:
-            return
-        all_done = True
-        for seg, st in self.segments_state.items():
-            st.timer += dt
-        for seg, st in self.segments_state.items():
-            if st.phase=="remain":
-                st.alpha=255
-                st.active=True
-            elif st.phase=="turning_off":
-                if st.timer<st.transition_duration:
-                    val=abs(math.sin(st.timer*10))
-                    st.alpha=int(255*val)
-                    st.active=True
-                    all_done=False
-                else:
-                    st.phase="off"
-                    st.alpha=0
-                    st.active=False
-            elif st.phase=="turning_on":
-                if st.timer<st.transition_duration:
-                    ratio=st.timer/st.transition_duration
-                    st.alpha=int(255*ratio)
-                    if ratio>0.5:
-                        st.active=True
-                    all_done=False
-                else:
-                    st.phase="remain"
-                    st.alpha=255
-                    st.active=True
-            elif st.phase=="off":
-                st.alpha=0
-                st.active=False
-        if all_done:
-            self.is_transitioning=False
-            #print("Digit transition completed")
-
+        """この Digit だけを進める (ステージでは DigitBank.update でまとめて進める)"""
+        self.bank.update(dt, self.slot)
 
     # A～G の矩形生成 (足場)
     def _get_segment_rects_AtoG(self):
+        """
+        A～G の矩形を返す。
+        位置・サイズが同じ間は同じ Rect を使い回すので、呼び出し側で変更しないこと。
+        """
+        if self._segment_rects is None:
+            self._segment_rects = self._build_segment_rects_AtoG()
+        return self._segment_rects
+
+    def _build_segment_rects_AtoG(self):
         rects = {}
         thick_vert = int(self.width / 3.4)
         thick_horz = int(self.height / 10.3)
@@ -242,68 +615,60 @@ class Digit:
 
         return rects
 
+    def _get_merged_rects(self):
+        """B+C, E+F を一体化した矩形 (キャッシュ)"""
+        if self._merged_rects is None:
+            base_rects = self._get_segment_rects_AtoG()
+            merged = {}
+            for name, upper, lower in (("B+C", "B", "C"), ("E+F", "E", "F")):
+                # 幅は上側の矩形に合わせる (同じ幅のはず)
+                upper_rect = base_rects[upper][0]
+                lower_rect = base_rects[lower][0]
+                new_top = min(upper_rect.top, lower_rect.top)
+                new_bottom = max(upper_rect.bottom, lower_rect.bottom)
+                merged[name] = pygame.Rect(upper_rect.x, new_top, upper_rect.width, new_bottom - new_top)
+            self._merged_rects = merged
+        return self._merged_rects
 
     def get_platform_rects(self):
         """
         接触の隙間を埋めるためのオブジェクト一体化処理
+        足場の組み合わせは active_mask ごとにキャッシュする
         """
 
         if not self.active:
             return []
 
-        result={}
-        base_rects=self._get_segment_rects_AtoG()
-        for seg,(rect,_) in base_rects.items():
-            st=self.segments_state[seg]
-            active = (st.active if st else False)
-            result[seg] = (rect, active)
-
-        groups=[]
-
-        # ===== B,C 統合 =====
-        b_rect, b_active = result.get("B",(None,False))
-        c_rect, c_active = result.get("C",(None,False))
-        if b_rect and c_rect and b_active and c_active:
-            new_top = min(b_rect.top, c_rect.top)
-            new_bottom = max(b_rect.bottom, c_rect.bottom)
-            new_rect = pygame.Rect(b_rect.x, new_top, b_rect.width, new_bottom - new_top)
-            one_way = self.segment_properties["B"]["one_way"]
-            groups.append(("B+C", new_rect, one_way))
-        else:
-            if b_rect and b_active:
-                one_way = self.segment_properties["B"]["one_way"]
-                groups.append(("B", b_rect, one_way))
-            if c_rect and c_active:
-                one_way = self.segment_properties["C"]["one_way"]
-                groups.append(("C", c_rect, one_way))
-
-        # ===== E,F 統合 =====
-        e_rect, e_active = result.get("E",(None,False))
-        f_rect, f_active = result.get("F",(None,False))
-        if e_rect and f_rect and e_active and f_active:
-            new_top = min(e_rect.top, f_rect.top)
-            new_bottom = max(e_rect.bottom, f_rect.bottom)
-            # 幅は e_rect.width を用いるか f_rect.width を用いるか -> 同じ幅のはず
-            new_rect = pygame.Rect(e_rect.x, new_top, e_rect.width, new_bottom - new_top)
-            one_way = self.segment_properties["E"]["one_way"]
-            groups.append(("E+F", new_rect, one_way))
-        else:
-            if e_rect and e_active:
-                one_way = self.segment_properties["E"]["one_way"]
-                groups.append(("E", e_rect, one_way))
-            if f_rect and f_active:
-                one_way = self.segment_properties["F"]["one_way"]
-                groups.append(("F", f_rect, one_way))
+        groups = self._platform_cache.get(self.active_mask)
+        if groups is None:
+            groups = self._build_platform_rects(self.active_mask)
+            self._platform_cache[self.active_mask] = groups
+        return groups
+
+    def _build_platform_rects(self, active_mask):
+        base_rects = self._get_segment_rects_AtoG()
+        merged_rects = self._get_merged_rects()
+        groups = []
+
+        # ===== B,C 統合 / E,F 統合 =====
+        for name, upper, lower in (("B+C", "B", "C"), ("E+F", "E", "F")):
+            pair_mask = SEGMENT_BITS[upper] | SEGMENT_BITS[lower]
+            if active_mask & pair_mask == pair_mask:
+                one_way = self.segment_properties[upper]["one_way"]
+                groups.append((name, merged_rects[name], one_way))
+            else:
+                for seg in (upper, lower):
+                    if active_mask & SEGMENT_BITS[seg]:
+                        one_way = self.segment_properties[seg]["one_way"]
+                        groups.append((seg, base_rects[seg][0], one_way))
 
         # ===== A,D,G =====
-        for seg in ["A","D","G"]:
-            if seg in result:
-                rect, active = result[seg]
-                if active and rect:
-                    one_way=self.segment_properties[seg]["one_way"]
-                    groups.append((seg, rect, one_way))
+        for seg in ("A", "D", "G"):
+            if active_mask & SEGMENT_BITS[seg]:
+                one_way = self.segment_properties[seg]["one_way"]
+                groups.append((seg, base_rects[seg][0], one_way))
 
-        return groups       
+        return groups
 
     def draw(self, screen, cam_x=0, cam_y=0):
         if not self.active:
@@ -314,34 +679,27 @@ class Digit:
         cam_y = int(cam_y)
 
         base_rects = self._get_segment_rects_AtoG()
+        active_mask = self.active_mask
+        alphas = self.bank.alpha[self.slot].tolist()
 
-        if not hasattr(self, "segment_surfaces"):
-            self.segment_surfaces = {}
+        for i, seg in enumerate(SEGMENTS):
+            if not active_mask & SEGMENT_BITS[seg]:
+                continue
+            seg_alpha = alphas[i]
+            if seg_alpha <= 0:
+                continue
 
-        for seg in ["A", "B", "C", "D", "E", "F", "G"]:
             rect, _ = base_rects[seg]
-            shifted_rect = pygame.Rect(
-                int(rect.x - cam_x),
-                int(rect.y - cam_y),
-                int(rect.width),
-                int(rect.height)
-            )
+            draw_x = rect.x - cam_x
+            draw_y = rect.y - cam_y
 
             if seg == "D":
-                shifted_rect.y -= 2
-
-            st = self.segments_state[seg]
-            if st.active and st.alpha > 0:
-                # 状態が固定しているならキャッシュを利用
-                if not self.is_transitioning:
-                    if seg not in self.segment_surfaces:
-                        surf = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-                        pygame.draw.rect(surf, (*self.color, st.alpha), (0, 0, rect.width, rect.height))
-                        self.segment_surfaces[seg] = surf
-                    else:
-                        surf = self.segment_surfaces[seg]
-                else:
-                    # トランジション中は毎フレーム新規生成
-                    surf = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-                    pygame.draw.rect(surf, (*self.color, st.alpha), (0, 0, rect.width, rect.height))
-                screen.blit(surf, shifted_rect)
+                draw_y -= 2
+
+            # トランジション中も同じ Surface を使い回し、アルファだけ変える
+            # (255 は set_alpha(None) の不透明 blit の方が速い)
+            alpha = seg_alpha if seg_alpha < 255 else None
+            surf = SEGMENT_ATLAS.get(seg, rect.width, rect.height, self.color)
+            if surf.get_alpha() != alpha:
+                surf.set_alpha(alpha)
+            screen.blit(surf, (draw_x, draw_y))
@@ -3,6 +3,8 @@ import time
 from ..game_utils import KEY_SIZE, resource_path
 
 class BaseItem:
+    __slots__ = ("x", "y", "collected", "spawn_time", "duration")
+
     def __init__(self, x, y, duration=None):
         self.x = x
         self.y = y
@@ -23,26 +25,34 @@ class BaseItem:
         self.collected = True
 
 class Key(BaseItem):
-    # 静的画像の読み込みをクラス変数として一度だけ行う
-    KEY_IMAGE = None
-    
+    __slots__ = ("number", "rect")
+
+    IMAGE_PATH = "assets/pics/key.png"
+    # 画像が読み込めない場合の色 (黄色の四角形)
+    FALLBACK_COLOR = (255, 255, 0)
+    # 拡大縮小済みの画像を全インスタンスで共有する
+    # 最初の描画で読み込むので、鍵を作るだけなら画面は要らない
+    SCALED_IMAGE = None
+
     def __init__(self, x, y, duration=None, number=1):
         super().__init__(x, y, duration)
         self.number = number
-        
+        self.rect = pygame.Rect(x, y, KEY_SIZE, KEY_SIZE)
+
+    @classmethod
+    def get_image(cls):
         # 画像の遅延読み込み（クラス変数として一度だけ読み込む）
-        if Key.KEY_IMAGE is None:
+        if cls.SCALED_IMAGE is None:
             try:
-                Key.KEY_IMAGE = pygame.image.load(resource_path("assets/pics/key.png"))
+                image = pygame.image.load(resource_path(cls.IMAGE_PATH))
             except Exception as e:
                 print(f"Failed to load key image: {e}")
                 # 画像が読み込めない場合に備えたフォールバック
-                Key.KEY_IMAGE = pygame.Surface((KEY_SIZE, KEY_SIZE))
-                Key.KEY_IMAGE.fill((255, 255, 0))  # 黄色の四角形
-        
-        self.image = pygame.transform.scale(Key.KEY_IMAGE, (KEY_SIZE, KEY_SIZE))
-        self.rect = self.image.get_rect(topleft=(x, y))
-    
+                image = pygame.Surface((KEY_SIZE, KEY_SIZE))
+                image.fill(cls.FALLBACK_COLOR)
+            cls.SCALED_IMAGE = pygame.transform.scale(image, (KEY_SIZE, KEY_SIZE))
+        return cls.SCALED_IMAGE
+
     def get_rect(self):
         # この rect はワールド座標のまま返す
         return self.rect
@@ -50,7 +60,7 @@ class Key(BaseItem):
     def draw(self, screen, cam_x=0, cam_y=0):
         if not self.collected:
             # オブジェクトの位置からカメラオフセットを引いた位置に描画
-            screen.blit(self.image, (self.x - cam_x, self.y - cam_y))
+            screen.blit(self.get_image(), (self.x - cam_x, self.y - cam_y))
 
     def update(self, dt):
         # アニメーション等があればここで実装
@@ -66,23 +76,12 @@ class Key(BaseItem):
 
 class FinalKey(Key):
     """最終ステージ専用キー"""
-    FIN_IMAGE = None
+    __slots__ = ()
 
-    def __init__(self, x, y, duration=None, number=1):
-        super().__init__(x, y, duration, number)
-        
-        # 画像の遅延読み込み
-        if FinalKey.FIN_IMAGE is None:
-            try:
-                FinalKey.FIN_IMAGE = pygame.image.load(resource_path("assets/pics/fin.png"))
-            except Exception as e:
-                print(f"Failed to load fin image: {e}")
-                # 画像が読み込めない場合のフォールバック
-                FinalKey.FIN_IMAGE = pygame.Surface((KEY_SIZE, KEY_SIZE))
-                FinalKey.FIN_IMAGE.fill((0, 255, 255))  # シアン色の四角形
-                
-        self.image = pygame.transform.scale(FinalKey.FIN_IMAGE, (KEY_SIZE, KEY_SIZE))
-        self.rect = self.image.get_rect(topleft=(x, y))
+    IMAGE_PATH = "assets/pics/fin.png"
+    # 画像が読み込めない場合の色 (シアン色の四角形)
+    FALLBACK_COLOR = (0, 255, 255)
+    SCALED_IMAGE = None
 
     def on_collect(self, player, stage_manager=None):
         super().on_collect(player, stage_manager)
\ No newline at end of file
@@ -1,14 +1,49 @@
 import pygame
 import os
 from game.game_utils import SCREEN_WIDTH, SCREEN_HEIGHT, resource_path
-from config.keys import MOVE_LEFT_KEYS, MOVE_RIGHT_KEYS, JUMP_KEYS
 
 BASE_DIR = resource_path("assets/pics")
 
+# 向きごとの描画用画像 ((width, height, facing_left) -> Surface)
+# 最初の描画で読み込むので、シミュレーションだけなら画面は要らない
+_IMAGES = {}
+
+
+def _player_image(width, height, display_size, facing_left):
+    key = (width, height, facing_left)
+    image = _IMAGES.get(key)
+    if image is None:
+        name = "num_left.png" if facing_left else "num_right.png"
+        # 画像の読み込み - ブラウザ環境に合わせて修正
+        try:
+            image = pygame.image.load(resource_path(f"assets/pics/{name}")).convert_alpha()
+        except Exception as e:
+            print(f"Failed to load player images: {e}")
+            # 画像が読み込めない場合のフォールバック
+            image = pygame.Surface((width, height))
+            image.fill((255, 0, 0))  # 赤い四角形
+        image = pygame.transform.scale(image, (width, height))
+        image = pygame.transform.scale(image, display_size)
+        _IMAGES[key] = image
+    return image
+
+
 class Player:
+    __slots__ = (
+        "x", "y", "prev_x", "prev_y", "width", "height",
+        "speed", "jump_power", "gravity",
+        "velocity_x", "velocity_y", "on_ground", "is_game_over",
+        "coyote_time", "coyote_timer",
+        "key_count", "sound_manager", "max_fall_speed",
+        "facing_left", "debug_mode",
+    )
+
     def __init__(self, x, y, sound_manager):
         self.x = float(x)
         self.y = float(y)
+        # 前ステップの位置 (描画の補間用)
+        self.prev_x = self.x
+        self.prev_y = self.y
 
         self.width = int(SCREEN_WIDTH * 0.0225)
         self.height = int(SCREEN_HEIGHT * 0.03)
@@ -30,21 +65,6 @@ class Player:
         self.sound_manager = sound_manager
         self.max_fall_speed = SCREEN_HEIGHT * 0.026
 
-        # 画像の読み込み - ブラウザ環境に合わせて修正
-        try:
-            self.image_right = pygame.image.load(resource_path("assets/pics/num_right.png")).convert_alpha()
-            self.image_left = pygame.image.load(resource_path("assets/pics/num_left.png")).convert_alpha()
-        except Exception as e:
-            print(f"Failed to load player images: {e}")
-            # 画像が読み込めない場合のフォールバック
-            self.image_right = pygame.Surface((self.width, self.height))
-            self.image_right.fill((255, 0, 0))  # 赤い四角形
-            self.image_left = pygame.Surface((self.width, self.height))
-            self.image_left.fill((255, 0, 0))  # 赤い四角形
-            
-        self.image_right = pygame.transform.scale(self.image_right, (self.width, self.height))
-        self.image_left = pygame.transform.scale(self.image_left, (self.width, self.height))
-
         self.facing_left = False
         self.debug_mode = False
 
@@ -54,14 +74,23 @@ class Player:
     def get_rect(self):
         return pygame.Rect(self.x, self.y, self.width, self.height)
 
+    def snap_interpolation(self):
+        """ワープ直後など、前ステップ位置から補間しないようにする"""
+        self.prev_x = self.x
+        self.prev_y = self.y
+
     def collect_key(self):
         self.key_count += 1
         if self.sound_manager:
             self.sound_manager.play("pickup")
 
 
-    def update(self, dt, keys, digits, space_pressed_this_frame, items=None, stage_manager=None):
+    def update(self, dt, inputs, collision_world, jump_pressed, items=None, stage_manager=None):
         """
+        inputs: 今のステップの入力 (InputState。left / right / down を見る)
+        collision_world: 足場のスナップショット (CollisionWorld)
+        jump_pressed: このステップでジャンプを押したか
+
         1) 入力による横方向速度の設定
         2) X軸移動 & 衝突解決
         3) コヨーテタイムとジャンプの処理
@@ -69,9 +98,16 @@ class Player:
         5) その他判定
         """
 
+        # 描画補間用に前ステップの位置を残す
+        self.prev_x = self.x
+        self.prev_y = self.y
+
+        # 足場スナップショットを最新にする (変化した Digit のみ再構築)
+        collision_world.refresh()
+
         # ----- 1) 入力による速度の設定 -----
-        moving_left = any(keys[k] for k in MOVE_LEFT_KEYS)
-        moving_right = any(keys[k] for k in MOVE_RIGHT_KEYS)
+        moving_left = inputs.left
+        moving_right = inputs.right
 
         # 左右速度は毎フレーム更新 (定数速度モデル)
         if moving_left and not moving_right:
@@ -84,10 +120,11 @@ class Player:
             self.velocity_x = 0.0
 
         # ----- 2) X軸移動 & 衝突解決 -----
+        prev_rect = self.get_rect()
         self.x += self.velocity_x
 
         # X軸方向の衝突解決
-        self.handle_collision_x(digits, keys)
+        self.handle_collision_x(collision_world, inputs, prev_rect)
 
         # 画面 or ワールド左右端の処理
         if stage_manager is not None and hasattr(stage_manager, "world_left") and hasattr(stage_manager, "world_right"):
@@ -109,7 +146,7 @@ class Player:
             if self.coyote_timer < 0:
                 self.coyote_timer = 0
 
-        if self.coyote_timer > 0 and space_pressed_this_frame:
+        if self.coyote_timer > 0 and jump_pressed:
             self.velocity_y = self.jump_power
             self.on_ground = False
             self.coyote_timer = 0
@@ -123,10 +160,11 @@ class Player:
             self.velocity_y = self.max_fall_speed
 
         # 実際に Y を動かす
+        prev_rect = self.get_rect()
         self.y += self.velocity_y
 
         # Y軸の衝突解決
-        self.handle_collision_y(digits, keys)
+        self.handle_collision_y(collision_world, inputs, prev_rect)
 
         # ----- 5) その他判定 (画面外, アイテム, etc) -----
 
@@ -164,90 +202,115 @@ class Player:
         #                 self.sound_manager.play("hit")
         #             break
 
-    def handle_collision_x(self, digits, keys):
+    def handle_collision_x(self, collision_world, inputs, prev_rect=None):
         """
         X方向の衝突解決
+        prev_rect: 移動前の矩形。移動量が足場の厚みを超えてもすり抜けないよう、
+                   移動前→移動後の掃引で最初に当たる足場に止める
         """
         player_rect = self.get_rect()
-        is_down_pressed = (keys[pygame.K_DOWN] or keys[pygame.K_s])
-
-        for digit in digits:
-            for group_name, plat_rect, one_way in digit.get_platform_rects():
-                # 下キーの足場透過
-                if one_way and is_down_pressed:
-                    continue
-
-                if player_rect.colliderect(plat_rect):
-                    # 一方通行(one_way)の足場は基本的に「上から乗る」処理のみ。
-                    # 横の衝突はスルーする(飛び越え用/階段的なものを想定)
-                    if one_way:
-                        continue  # X軸方向では無視
-                    # 通常床の場合は X 軸方向の押し戻し処理
-                    if self.velocity_x > 0:  # 右に動いて衝突
-                        self.x = plat_rect.left - self.width
-                    elif self.velocity_x < 0:
-                        self.x = plat_rect.right
-                    player_rect = self.get_rect()
-
-    def handle_collision_y(self, digits, keys):
+
+        # 一方通行(one_way)の足場は基本的に「上から乗る」処理のみ。
+        # 横の衝突はスルーする(飛び越え用/階段的なものを想定)
+        if prev_rect is not None:
+            index, _ = collision_world.sweep(prev_rect, dx=player_rect.x - prev_rect.x, skip_one_way=True)
+            if index >= 0:
+                plat_rect = collision_world.rects[index]
+                if self.velocity_x > 0:
+                    self.x = plat_rect.left - self.width
+                elif self.velocity_x < 0:
+                    self.x = plat_rect.right
+                player_rect = self.get_rect()
+
+        # 移動前から重なっている足場 (Digit の変化で現れたもの等) の押し戻し
+        index = collision_world.next_overlap(player_rect, 0, skip_one_way=True)
+        while index >= 0:
+            plat_rect = collision_world.rects[index]
+            # 通常床の場合は X 軸方向の押し戻し処理
+            if self.velocity_x > 0:  # 右に動いて衝突
+                self.x = plat_rect.left - self.width
+            elif self.velocity_x < 0:
+                self.x = plat_rect.right
+            player_rect = self.get_rect()
+            index = collision_world.next_overlap(player_rect, index + 1, skip_one_way=True)
+
+    def handle_collision_y(self, collision_world, inputs, prev_rect=None):
         """
         Y方向の衝突解決
+        prev_rect: 移動前の矩形。落下速度が薄い足場の厚みを超えてもすり抜けないよう、
+                   移動前→移動後の掃引で最初に当たる足場に止める
         """
         self.on_ground = False
         player_rect = self.get_rect()
-        is_down_pressed = (keys[pygame.K_DOWN] or keys[pygame.K_s])
-
-        for digit in digits:
-            for group_name, plat_rect, one_way in digit.get_platform_rects():
-                if one_way and is_down_pressed:
-                    # 下キー押下中は一方向足場をすり抜ける
-                    continue
-
-                if player_rect.colliderect(plat_rect):
-                    overlap_x = min(player_rect.right, plat_rect.right) - max(player_rect.left, plat_rect.left)
-                    overlap_y = min(player_rect.bottom, plat_rect.bottom) - max(player_rect.top, plat_rect.top)
-
-                    if one_way:
-                        #下向きに落下中で、上から降りてきたと判断できれば着地させる
-                        player_above = (player_rect.bottom - overlap_y <= plat_rect.top)
-                        if self.velocity_y > 0 and player_above:
-                            self.y = plat_rect.top - self.height
-                            self.velocity_y = 0
-                            self.on_ground = True
-                            self.coyote_timer = self.coyote_time
+        # 下キー押下中は一方向足場をすり抜ける
+        is_down_pressed = inputs.down
+
+        if prev_rect is not None:
+            index, _ = collision_world.sweep(prev_rect, dy=player_rect.y - prev_rect.y, skip_one_way=is_down_pressed)
+            if index >= 0:
+                plat_rect = collision_world.rects[index]
+                if self.velocity_y > 0:
+                    # 上から当たった → 着地
+                    self.y = plat_rect.top - self.height
+                    self.on_ground = True
+                    self.coyote_timer = self.coyote_time
+                else:
+                    # 下から当たった → 頭を打つ
+                    self.y = plat_rect.bottom
+                self.velocity_y = 0
+                player_rect = self.get_rect()
+
+        # 移動前から重なっている足場 (Digit の変化で現れたもの等) の押し戻し
+        index = collision_world.next_overlap(player_rect, 0, skip_one_way=is_down_pressed)
+        while index >= 0:
+            plat_rect = collision_world.rects[index]
+            one_way = collision_world.one_way[index]
+
+            overlap_x = min(player_rect.right, plat_rect.right) - max(player_rect.left, plat_rect.left)
+            overlap_y = min(player_rect.bottom, plat_rect.bottom) - max(player_rect.top, plat_rect.top)
+
+            if one_way:
+                #下向きに落下中で、上から降りてきたと判断できれば着地させる
+                player_above = (player_rect.bottom - overlap_y <= plat_rect.top)
+                if self.velocity_y > 0 and player_above:
+                    self.y = plat_rect.top - self.height
+                    self.velocity_y = 0
+                    self.on_ground = True
+                    self.coyote_timer = self.coyote_time
+            else:
+                # 通常床の場合の処理
+                if self.velocity_y > 0:
+                    if player_rect.top >= plat_rect.top and player_rect.bottom <= plat_rect.bottom:
+                        # 完全に内部にいる → 下方向へ押し出す
+                        self.y = plat_rect.bottom
+                        self.velocity_y = 0
                     else:
-                        # 通常床の場合の処理
-                        if self.velocity_y > 0:
-                            if player_rect.top >= plat_rect.top and player_rect.bottom <= plat_rect.bottom:
-                                # 完全に内部にいる → 下方向へ押し出す
-                                self.y = plat_rect.bottom
-                                self.velocity_y = 0
-                            else:
-                                #　上に補正して足場に乗せる
-                                self.y = plat_rect.top - self.height
-                                self.velocity_y = 0
-                                self.on_ground = True
-                                self.coyote_timer = self.coyote_time
-                        else:
-                            self.y = plat_rect.bottom
-                            self.velocity_y = 0
-
-                    # 再計算
-                    player_rect = self.get_rect()
-
-
-    def draw(self, screen, cam_x=0, cam_y=0):
+                        #　上に補正して足場に乗せる
+                        self.y = plat_rect.top - self.height
+                        self.velocity_y = 0
+                        self.on_ground = True
+                        self.coyote_timer = self.coyote_time
+                else:
+                    self.y = plat_rect.bottom
+                    self.velocity_y = 0
+
+            # 再計算
+            player_rect = self.get_rect()
+            index = collision_world.next_overlap(player_rect, index + 1, skip_one_way=is_down_pressed)
+
+
+    def draw(self, screen, cam_x=0, cam_y=0, alpha=1.0):
+        """alpha: 前ステップ位置から現在位置への補間割合"""
         display_scale = 1.25
         display_width = int(self.width * display_scale)
         display_height = int(self.height * display_scale)
 
-        draw_x = int(self.x - cam_x - (display_width - self.width) / 2)
-        draw_y = int(self.y - cam_y - (display_height - self.height) / 2)
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        draw_x = int(x - cam_x - (display_width - self.width) / 2)
+        draw_y = int(y - cam_y - (display_height - self.height) / 2)
 
         #　キャラクターの向き
-        if self.facing_left:
-            image_to_draw = pygame.transform.scale(self.image_left, (display_width, display_height))
-        else:
-            image_to_draw = pygame.transform.scale(self.image_right, (display_width, display_height))
+        image_to_draw = _player_image(self.width, self.height, (display_width, display_height), self.facing_left)
 
         screen.blit(image_to_draw, (draw_x, draw_y))
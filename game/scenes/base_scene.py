@@ -2,6 +2,22 @@
 
 import pygame
 from ..game_utils import SCREEN_WIDTH, SCREEN_HEIGHT
+from ..core import InputState
+from config.keys import MOVE_LEFT_KEYS, MOVE_RIGHT_KEYS, MOVE_UP_KEYS, MOVE_DOWN_KEYS, JUMP_KEYS
+
+
+def read_input(keys):
+    """
+    pygame.key.get_pressed() の結果を InputState にする
+    (ジャンプは Space と ↑ / W のどれでも)
+    """
+    return InputState(
+        left=any(keys[k] for k in MOVE_LEFT_KEYS),
+        right=any(keys[k] for k in MOVE_RIGHT_KEYS),
+        down=any(keys[k] for k in MOVE_DOWN_KEYS),
+        jump=any(keys[k] for k in JUMP_KEYS) or any(keys[k] for k in MOVE_UP_KEYS),
+    )
+
 
 class BaseScene:
     def __init__(self, screen, sound_manager):
@@ -15,12 +31,14 @@ class BaseScene:
         self.sound_manager = sound_manager
         self.next_scene = None
         self.is_running = True
+        # 前回と今回のシミュレーション状態の間の描画位置 (0.0〜1.0)
+        self.render_alpha = 1.0
 
     def update(self, dt):
         """
         シーンの状態を更新
         Args:
-            dt: 前フレームからの経過時間
+            dt: 固定ステップの経過時間 (FIXED_DT)
         """
         pass
 
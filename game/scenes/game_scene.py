@@ -3,10 +3,12 @@ import pygame
 import os
 import re
 import math
-from game.game_utils import SCREEN_WIDTH, SCREEN_HEIGHT, FPS,FONT_PATH, STAGE_CLEAR_DISPLAY_TIME,resource_path
-from .base_scene import BaseScene
-from game.objects.player import Player
-from game.managers.stagemanager import StageManager
+import time
+from game.game_utils import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, FIXED_DT, FONT_PATH, STAGE_CLEAR_DISPLAY_TIME,resource_path
+from .base_scene import BaseScene, read_input
+from game.core import Simulation
+from game.core.replay import ReplayRecorder, ReplayPlayer, KEYFRAME_INTERVAL
+from game.core.rewind import RewindBuffer
 from game.managers.progress_manager import ProgressManager
 
 class KeyStreak:
@@ -46,7 +48,11 @@ class SequenceProgress:
                             self.radius)
 
 class GameScene(BaseScene):
-    def __init__(self, screen, sound_manager, stage_file):
+    def __init__(self, screen, sound_manager, stage_file, practice_index=None, replay=None):
+        """
+        practice_index: 練習モードで開始する sequence の位置 (None なら通常プレイ)
+        replay: 再生する Replay (None なら通常プレイ。プレイは常に記録し、F2 で replays/ に保存する)
+        """
         super().__init__(screen, sound_manager)
         self.stage_file = stage_file
         self.game_state = "playing"
@@ -73,14 +79,22 @@ class GameScene(BaseScene):
             self.show_tutorial = True
             self._prepare_tutorial()
         
-        # ステージマネージャーの初期化
-        self.stage_manager = StageManager(self.sound_manager)
-        self.stage_manager.load_stage(self.stage_file)
-        
-        # プレイヤーと項目の初期化
-        self.player = None
-        self.items = []
-        self.prev_space = False
+        # シミュレーション (ステージ・Digit・プレイヤー・鍵) の初期化
+        # 練習モードではリスタートのたびに指定の sequence 位置から始める
+        if replay is None:
+            self.sim = Simulation(self.stage_file, self.sound_manager, practice_index=practice_index)
+            self.recorder = ReplayRecorder(self.sim)
+            self.playback = None
+        else:
+            self.playback = ReplayPlayer(replay, self.sound_manager,
+                                         on_restart=self._on_restart, on_rewind=self._on_rewind)
+            self.sim = self.playback.sim
+            self.recorder = None
+        self.stage_manager = self.sim.stage_manager
+        # 直近数秒の状態 (Backspace で巻き戻す。ゲームオーバー直後でも死ぬ前に戻れる)
+        self.rewind_buffer = RewindBuffer()
+        self.practice_text = None
+        self._render_practice_text()
 
         # UI要素の初期化
         self.key_streak = KeyStreak(
@@ -97,15 +111,23 @@ class GameScene(BaseScene):
         self.use_scroll = False
         self.camera_offset_x = 0
         self.camera_offset_y = 0
+        # 前ステップのカメラ位置 (描画の補間用)
+        self.prev_camera_offset_x = 0
+        self.prev_camera_offset_y = 0
         self.initial_camera_set = False
         self.camera_accumulator = 0.0
         
         # 最終ステージの特別設定
         if self.world == 4 and self.stage == 3:
             self._setup_final_stage()
-        
-        # ゲームの初期化
-        self._initialize_game()
+
+    @property
+    def player(self):
+        return self.sim.player
+
+    @property
+    def items(self):
+        return self.sim.items
 
     def _load_fonts(self):
         """すべてのフォントを初期化時にロード"""
@@ -159,27 +181,13 @@ class GameScene(BaseScene):
 
                 
 
-    def _initialize_game(self):
-        """ゲーム要素の初期化"""
-        # プレイヤーの初期化
-        player_start = self.stage_manager.stage_data.get("player_start", {"x": 400, "y": 50})
-        self.player = Player(x=player_start["x"], y=player_start["y"], sound_manager=self.sound_manager)
-        
-        self.items = []
-        
-        # 初期ループのリセットとキーの出現
-        self.stage_manager.reset()
-        self.stage_manager.update(0, items=self.items, player=self.player)
-
     def _reset_game(self):
         """ゲームのリセット処理"""
-        player_start = self.stage_manager.stage_data.get("player_start", {"x": 400, "y": 50})
-        self.player.x = player_start["x"]
-        self.player.y = player_start["y"]
-        self.player.velocity_y = 0
-        self.player.on_ground = False
-        self.player.is_game_over = False
-        self.player.coyote_timer = 0.0
+        self.recorder.restart()
+        self._on_restart()
+
+    def _on_restart(self):
+        """リスタート時の音楽とカメラ"""
         self.sound_manager.stop_music()
 
         if self.world == 4 and self.stage == 3:
@@ -187,15 +195,47 @@ class GameScene(BaseScene):
             #self.show_peak_message = True
             self.sound_manager.play_music("stage_4-3.ogg") 
             #self.peak_message_start_time = pygame.time.get_ticks()
-            target_cam_x = self.player.x + self.player.width / 2 - SCREEN_WIDTH / 2
-            target_cam_y = self.player.y + self.player.height / 2 - SCREEN_HEIGHT / 2
-            self.camera_offset_x = target_cam_x
-            self.camera_offset_y = target_cam_y
-            self.initial_camera_set = True
-        
-        self.stage_manager.new_game_reset()
-        self.items.clear()            
-        self.stage_manager.update(0, self.items, self.player)
+            self._snap_camera()
+
+    def _rewind(self):
+        """数秒前の状態に巻き戻す"""
+        if self.stage_manager.is_stage_clear:
+            return
+        snapshot = self.rewind_buffer.rewind()
+        if snapshot is None:
+            return
+        self.recorder.rewind(snapshot)
+        self._on_rewind()
+
+    def _on_rewind(self):
+        """巻き戻し時のカメラと表示"""
+        self._render_practice_text()
+        if self.use_scroll:
+            self._snap_camera()
+
+    def _snap_camera(self):
+        """カメラをプレイヤーの位置に合わせる (補間しない)"""
+        target_cam_x = self.player.x + self.player.width / 2 - SCREEN_WIDTH / 2
+        target_cam_y = self.player.y + self.player.height / 2 - SCREEN_HEIGHT / 2
+        self.camera_offset_x = target_cam_x
+        self.camera_offset_y = target_cam_y
+        self.prev_camera_offset_x = target_cam_x
+        self.prev_camera_offset_y = target_cam_y
+        self.initial_camera_set = True
+
+    def _set_practice_index(self, index):
+        """練習モードの開始位置を設定する (範囲外や最終ステージでは通常プレイ)"""
+        self.sim.set_practice_index(index)
+        self._render_practice_text()
+
+    def _render_practice_text(self):
+        # 表示用テキストは切り替え時に一度だけ描画しておく
+        if self.playback is not None:
+            self.practice_text = self.t_font.render("REPLAY", True, (255, 140, 0))
+        elif self.sim.practice_index is None:
+            self.practice_text = None
+        else:
+            self.practice_text = self.t_font.render(f"PRACTICE {self.sim.practice_index + 1}", True, (255, 140, 0))
 
 
     def update(self, dt):
@@ -216,7 +256,8 @@ class GameScene(BaseScene):
 
                 import re
                 match = re.search(r'stage(\d+)-(\d+)\.json', self.stage_file)
-                if match:
+                # 練習モードのクリアは進行状況に記録しない
+                if match and self.sim.practice_index is None and self.playback is None:
                     world = int(match.group(1))
                     stage = int(match.group(2))
                     progress_manager = ProgressManager()
@@ -231,42 +272,28 @@ class GameScene(BaseScene):
                     self.next_scene = StageSelectScene(self.screen, self.sound_manager, world, stage)
             return
 
-        # --- ゲームオーバーチェック ---
-        if self.player.is_game_over:
-            self._reset_game()
+        # --- 入力を渡して 1 ステップ進める (ゲームオーバー後はリスタートのみ) ---
+        if self.playback is not None:
+            restarted = self.playback.step()
+        else:
+            restarted = self.recorder.step(read_input(pygame.key.get_pressed()), dt)
+            self.rewind_buffer.record(self.sim)
+        if restarted:
+            self._on_restart()
             self.sound_manager.play("hit")
             return
 
-        # --- 入力処理 ---
-        keys = pygame.key.get_pressed()
-        current_space = keys[pygame.K_SPACE] or keys[pygame.K_UP] or keys[pygame.K_w]
-        space_pressed_this_frame = (current_space and not self.prev_space)
-        self.prev_space = current_space
-
-        # ステージ、Digit, プレイヤーの更新
-        self.stage_manager.update(dt, self.items, self.player)
-        for digit in self.stage_manager.digits:
-            digit.update(dt)
-        self.player.update(
-            dt,
-            keys,
-            self.stage_manager.digits,
-            space_pressed_this_frame,
-            items=self.items,
-            stage_manager=self.stage_manager
-        )
-        self.items = [item for item in self.items if not item.collected]
-
         # 最終ステージカメラオフセット更新
         if self.use_scroll:
-            fixed_dt = 1.0 / 60.0  # 固定時間ステップ
+            self.prev_camera_offset_x = self.camera_offset_x
+            self.prev_camera_offset_y = self.camera_offset_y
             self.camera_accumulator += dt
 
             target_cam_x = self.player.x + self.player.width / 2 - SCREEN_WIDTH / 2
             target_cam_y = self.player.y + self.player.height / 2 - SCREEN_HEIGHT / 2
             
             # 初回のカメラセット
-            while self.camera_accumulator >= fixed_dt:
+            while self.camera_accumulator >= FIXED_DT:
                 if not self.initial_camera_set:
                     self.camera_offset_x = target_cam_x
                     self.camera_offset_y = target_cam_y
@@ -276,21 +303,26 @@ class GameScene(BaseScene):
                     self.camera_offset_x = (1 - smoothing) * self.camera_offset_x + smoothing * target_cam_x
                     self.camera_offset_y = (1 - smoothing) * self.camera_offset_y + smoothing * target_cam_y
 
-                self.camera_accumulator -= fixed_dt
+                self.camera_accumulator -= FIXED_DT
 
         
     def draw(self):
         """ゲーム画面の描画"""
         self.screen.fill((0, 0, 0))
 
-        # ゲームオブジェクトの描画
-        for digit in self.stage_manager.digits:
-            digit.draw(self.screen, self.camera_offset_x, self.camera_offset_y)
+        # 固定ステップの間はカメラ位置を補間する
+        alpha = self.render_alpha
+        cam_x = self.prev_camera_offset_x + (self.camera_offset_x - self.prev_camera_offset_x) * alpha
+        cam_y = self.prev_camera_offset_y + (self.camera_offset_y - self.prev_camera_offset_y) * alpha
+
+        # ゲームオブジェクトの描画 (画面に掛かる Digit だけ)
+        for digit in self.stage_manager.visible_digits(int(cam_y), int(cam_y) + SCREEN_HEIGHT):
+            digit.draw(self.screen, cam_x, cam_y)
         for item in self.items:
-            item.draw(self.screen, self.camera_offset_x, self.camera_offset_y)
-        self.player.draw(self.screen, self.camera_offset_x, self.camera_offset_y)
+            item.draw(self.screen, cam_x, cam_y)
+        self.player.draw(self.screen, cam_x, cam_y, alpha)
         for enemy in self.stage_manager.active_enemies:
-            enemy.draw(self.screen, self.camera_offset_x, self.camera_offset_y)
+            enemy.draw(self.screen, cam_x, cam_y)
 
         # 最終ステージのメッセージ表示または通常のUI表示
         if (self.world == 4 and self.stage == 3) and self.show_peak_message:
@@ -303,6 +335,8 @@ class GameScene(BaseScene):
                 self.stage_manager.current_sequence_index,
                 self.stage_manager.total_sequences
             )
+            if self.practice_text:
+                self.screen.blit(self.practice_text, (int(SCREEN_WIDTH * 0.02), int(SCREEN_HEIGHT * 0.05)))
 
         # ステージクリア表示
         if self.game_state == "stage_clear":
@@ -341,24 +375,61 @@ class GameScene(BaseScene):
 
     def process_event(self, event):
         """イベント処理"""
+        if event.type == pygame.KEYDOWN and self.playback is not None:
+            # 再生中: F で 10 秒早送り (入力によるリスタート・練習モードは無効)
+            if event.key == pygame.K_f:
+                self.playback.seek(self.playback.step_index + KEYFRAME_INTERVAL)
+                self.player.snap_interpolation()
+            elif event.key == pygame.K_ESCAPE:
+                self._return_to_stage_select()
+            elif event.key == pygame.K_v:
+                self.sound_manager.toggle_sound()
+            return
+
         if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_r:
+            if event.key == pygame.K_F2:
+                self._save_replay()
+            elif event.key == pygame.K_BACKSPACE:
+                self._rewind()
+            elif event.key == pygame.K_r:
                 self._reset_game()
             elif event.key == pygame.K_ESCAPE:
-                # ステージ選択画面に戻る（現在のワールドとステージ情報を渡す）
-                match = re.search(r'stage(\d+)-(\d+)\.json', self.stage_file)
-                if match:
-                    world = int(match.group(1))
-                    stage = int(match.group(2))
-                    from .stage_select_scene import StageSelectScene
-                    self.next_scene = StageSelectScene(self.screen, self.sound_manager, world, stage)
+                self._return_to_stage_select()
             elif event.key == pygame.K_v:
                 self.sound_manager.toggle_sound()
+            elif pygame.K_1 <= event.key <= pygame.K_9:
+                # 練習モード: 数字キーの sequence 位置から始め直す
+                self._set_practice_index(event.key - pygame.K_1)
+                self._reset_game()
+            elif event.key == pygame.K_0:
+                # 練習モードをやめて最初から
+                self._set_practice_index(None)
+                self._reset_game()
 
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_q:
                 self.player.set_debug_mode(not self.player.debug_mode)
 
+    def _return_to_stage_select(self):
+        # ステージ選択画面に戻る（現在のワールドとステージ情報を渡す）
+        match = re.search(r'stage(\d+)-(\d+)\.json', self.stage_file)
+        if match:
+            world = int(match.group(1))
+            stage = int(match.group(2))
+            from .stage_select_scene import StageSelectScene
+            self.next_scene = StageSelectScene(self.screen, self.sound_manager, world, stage)
+
+    def _save_replay(self):
+        """ここまでのプレイを replays/<ステージ名>-<日時>.json に保存する"""
+        name = os.path.splitext(os.path.basename(self.stage_file))[0]
+        path = os.path.join("replays", f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        try:
+            os.makedirs("replays", exist_ok=True)
+            self.recorder.replay.save(path)
+            print(f"Saved replay: {path}")
+        except Exception as e:
+            print(f"Failed to save replay: {e}")
+
     def cleanup(self):
         """シーン終了時の処理"""
         if self.stage_manager.final_stage:
@@ -6,14 +6,17 @@ import math
 import random
 from datetime import datetime
 from game.game_utils import SCREEN_WIDTH, SCREEN_HEIGHT, FONT_PATH,resource_path
-from .base_scene import BaseScene
+from .base_scene import BaseScene, read_input
 from game.objects.digit import Digit
 from game.objects.player import Player
 from game.objects.item import Key
+from game.managers.collision_world import CollisionWorld
 
 class TitleScene(BaseScene):
-    def __init__(self, screen, sound_manager):
+    def __init__(self, screen, sound_manager, seed=None):
+        """seed: キーの配置パターンを選ぶ乱数のシード (None なら毎回変わる)"""
         super().__init__(screen, sound_manager)
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
         
         # 1078x768 を基準としたスケーリング
         base_w = 1078.0
@@ -74,6 +77,12 @@ class TitleScene(BaseScene):
                 'y_offset': w_y_offset
             }
         }
+
+        # 調整用Digit (毎フレーム作り直さないよう一度だけ生成)
+        self.title1_overlays = self._create_overlay_digits(
+            self.title1_digits, self.title_line1, self.overlay_config_top)
+        self.title2_overlays = self._create_overlay_digits(
+            self.title2_digits, self.title_line2, self.overlay_config_bottom)
         
         # 時計表示用 (右上): HH:MM
         clock_digit_width  = int( 90 * scale_w)
@@ -97,6 +106,12 @@ class TitleScene(BaseScene):
         colon_x = clock_start_x + 2 * (clock_digit_width + clock_spacing) + clock_time_gap // 2
         self.colon_center = (colon_x, clock_y + clock_digit_height // 2)
         
+        # 足場 (調整用Digitを含む)
+        platforms = self.title1_digits + self.title2_digits + self.clock_digits
+        platforms.extend(self.title1_overlays.values())
+        platforms.extend(self.title2_overlays.values())
+        self.collision_world = CollisionWorld(platforms)
+
         # Player配置
         player_start_x = SCREEN_WIDTH // 2 - int(20 * scale_w)
         player_start_y = int(SCREEN_HEIGHT * 0.2)
@@ -126,7 +141,7 @@ class TitleScene(BaseScene):
         pattern2 = [(0.33, 0.82), (0.77, 0.17), (0.58, 0.57)]
         pattern3 = [(0.18, 0.45), (0.48, 0.4), (0.65, 0.8)]
         patterns = [pattern1, pattern2, pattern3]
-        chosen_pattern = random.choice(patterns)
+        chosen_pattern = random.Random(self.seed).choice(patterns)
 
         self.title_keys = []
         for (rx, ry) in chosen_pattern:
@@ -135,6 +150,22 @@ class TitleScene(BaseScene):
             key_item = Key(x, y, duration=None)
             self.title_keys.append(key_item)
 
+    def _create_overlay_digits(self, digits, line, overlay_config):
+        """T,W 用の重ね合わせ Digit を {文字位置: Digit} で返す"""
+        overlays = {}
+        for i, d in enumerate(digits):
+            ch = line[i].upper()
+            if ch in overlay_config:
+                conf = overlay_config[ch]
+                overlays[i] = Digit(
+                    x = d.x + conf.get('x_offset', 0),
+                    y = d.y + conf.get('y_offset', 0),
+                    width = d.width,
+                    height = d.height,
+                    number = conf.get('overlay_char')
+                )
+        return overlays
+
     def _reset_player(self):
         """プレイヤーが落下した場合に初期位置に戻す"""
         player_start_x = SCREEN_WIDTH // 2 - 20
@@ -143,6 +174,7 @@ class TitleScene(BaseScene):
         self.player.y = player_start_y
         self.player.velocity_y = 0
         self.player.on_ground = False
+        self.player.snap_interpolation()
 
     def update(self, dt):
         for d in self.title1_digits:
@@ -173,41 +205,11 @@ class TitleScene(BaseScene):
         if self.enter_blink_timer > 1.0:
             self.enter_blink_timer = 0.0
         
-        # 足場
-        platforms = self.title1_digits + self.title2_digits + self.clock_digits
-
-        # 調整用Digit
-        for i, d in enumerate(self.title1_digits):
-            ch = self.title_line1[i].upper()
-            if ch in self.overlay_config_top:
-                conf = self.overlay_config_top[ch]
-                overlay = Digit(
-                    x = d.x + conf.get('x_offset', 0),
-                    y = d.y + conf.get('y_offset', 0),
-                    width = d.width,
-                    height = d.height,
-                    number = conf.get('overlay_char')
-                )
-                platforms.append(overlay)
-        for i, d in enumerate(self.title2_digits):
-            ch = self.title_line2[i].upper()
-            if ch in self.overlay_config_bottom:
-                conf = self.overlay_config_bottom[ch]
-                overlay = Digit(
-                    x = d.x + conf.get('x_offset', 0),
-                    y = d.y + conf.get('y_offset', 0),
-                    width = d.width,
-                    height = d.height,
-                    number = conf.get('overlay_char')
-                )
-                platforms.append(overlay)
-        
         # プレイヤー更新
-        keys = pygame.key.get_pressed()
-        current_space = keys[pygame.K_SPACE] or keys[pygame.K_UP] or keys[pygame.K_w]
+        inputs = read_input(pygame.key.get_pressed())
 
         # title_keys
-        self.player.update(dt, keys, platforms, current_space, items=self.title_keys, stage_manager=None)
+        self.player.update(dt, inputs, self.collision_world, inputs.jump, items=self.title_keys, stage_manager=None)
         
         for key_item in self.title_keys:
             key_item.update(dt)
@@ -237,31 +239,13 @@ class TitleScene(BaseScene):
         #digit描画
         for i, d in enumerate(self.title1_digits):
             d.draw(self.screen)
-            ch = self.title_line1[i].upper()
-            if ch in self.overlay_config_top:
-                conf = self.overlay_config_top[ch]
-                overlay = Digit(
-                    x = d.x + conf.get('x_offset', 0),
-                    y = d.y + conf.get('y_offset', 0),
-                    width = d.width,
-                    height = d.height,
-                    number = conf.get('overlay_char')
-                )
-                overlay.draw(self.screen)
+            if i in self.title1_overlays:
+                self.title1_overlays[i].draw(self.screen)
 
         for i, d in enumerate(self.title2_digits):
             d.draw(self.screen)
-            ch = self.title_line2[i].upper()
-            if ch in self.overlay_config_bottom:
-                conf = self.overlay_config_bottom[ch]
-                overlay = Digit(
-                    x = d.x + conf.get('x_offset', 0),
-                    y = d.y + conf.get('y_offset', 0),
-                    width = d.width,
-                    height = d.height,
-                    number = conf.get('overlay_char')
-                )
-                overlay.draw(self.screen)
+            if i in self.title2_overlays:
+                self.title2_overlays[i].draw(self.screen)
 
         # 時計の描画
         for d in self.clock_digits:
@@ -273,7 +257,7 @@ class TitleScene(BaseScene):
                         (self.colon_center[0], self.colon_center[1] + 15), colon_radius)
         
         # プレイヤーの描画
-        self.player.draw(self.screen)
+        self.player.draw(self.screen, alpha=self.render_alpha)
         # if self.player.debug_mode:
         #     self.player._draw_trail(self.screen)
         
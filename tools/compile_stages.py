@@ -0,0 +1,36 @@
+# tools/compile_stages.py
+"""
+stage/*.json を対象の解像度ごとにコンパイルし、stage/compiled/ に書き出す
+(ゲームは読み込み時にも自動でコンパイルするので、配布前に済ませておく用)
+
+使い方: python -m tools.compile_stages
+"""
+import os
+import sys
+import glob
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from game.managers.stage_compiler import (
+    TARGET_RESOLUTIONS, build_compiled, compiled_path, load_compiled_stage)
+
+
+def main():
+    print(f"{'stage':<16}{'json':>8}{'resolution':>12}{'compiled':>10}{'json load':>11}{'load':>9}")
+    for stage_path in sorted(glob.glob("stage/*.json")):
+        json_size = os.path.getsize(stage_path)
+        for width, height in TARGET_RESOLUTIONS:
+            start = time.perf_counter()
+            build_compiled(stage_path, width, height)
+            build_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            load_compiled_stage(stage_path, width, height)
+            load_ms = (time.perf_counter() - start) * 1000
+            size = os.path.getsize(compiled_path(stage_path, width, height))
+            print(f"{os.path.basename(stage_path):<16}{json_size:>8}{f'{width}x{height}':>12}"
+                  f"{size:>10}{build_ms:>9.2f}ms{load_ms:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# tools/memory_report.py
+"""
+ステージごとのオブジェクトのメモリ使用量を表示する
+
+使い方: python -m tools.memory_report
+"""
+import os
+import sys
+import glob
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pygame
+from game.managers.stagemanager import StageManager
+
+
+def measure_stage(stage_path):
+    """ステージ読み込み + リセット後に確保されているバイト数を返す"""
+    tracemalloc.start()
+    stage_manager = StageManager()
+    stage_manager.load_stage(stage_path)
+    stage_manager.reset()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, len(stage_manager.digits)
+
+
+def main():
+    pygame.init()
+    print(f"{'stage':<16}{'digits':>8}{'total KiB':>12}{'B/digit':>10}")
+    for stage_path in sorted(glob.glob("stage/*.json")):
+        total, digit_count = measure_stage(stage_path)
+        per_digit = total // max(1, digit_count)
+        print(f"{os.path.basename(stage_path):<16}{digit_count:>8}{total / 1024:>12.1f}{per_digit:>10}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
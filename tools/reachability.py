@@ -0,0 +1,76 @@
+# tools/reachability.py
+"""
+ステージの拍ごとのジャンプ到達グラフ (game.core.reachability) を作り、要約を表示する
+グラフは stage/compiled/ にキャッシュされ、ゲームからは load_reachability で引ける
+
+使い方: python -m tools.reachability [ステージ.json ...] [--rebuild] [--edges]
+  ステージを省略すると stage/*.json をすべて調べる
+  --rebuild: キャッシュを使わずに作り直す
+  --edges: 拍ごとに各足場から着地できる足場を表示する
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from game.game_utils import FIXED_DT
+from game.core.reachability import load_reachability, reachability_path
+
+
+def _platform_name(platform):
+    return f"d{platform.digit}.{platform.segment}@({platform.x},{platform.y})"
+
+
+def show(stage_path, rebuild=False, edges=False):
+    if rebuild:
+        try:
+            os.remove(reachability_path(stage_path))
+        except OSError:
+            pass
+    start = time.perf_counter()
+    graph = load_reachability(stage_path)
+    elapsed = (time.perf_counter() - start) * 1000
+    platform_count = sum(len(platforms) for platforms in graph.platforms)
+    edge_count = sum(len(targets) for beat_edges in graph.edges for targets in beat_edges)
+    print(f"{os.path.basename(stage_path)}: {len(graph.beats)} beats, {platform_count} platforms, "
+          f"{edge_count} edges ({elapsed:.1f}ms)")
+
+    if edges:
+        for beat, (t, platforms) in enumerate(zip(graph.beats, graph.platforms)):
+            print(f"  beat {beat} ({t:.2f}s)")
+            for platform, targets in zip(platforms, graph.edges[beat]):
+                names = ", ".join(f"{_platform_name(platforms[j])}:{steps}" for j, steps in targets)
+                print(f"    {_platform_name(platform)} -> {names or '-'}")
+
+    unreachable = 0
+    for key in graph.keys:
+        platforms = graph.platforms[key.beat]
+        if key.platforms:
+            fastest = min(steps for _, steps in key.platforms)
+            result = f"from {len(key.platforms)}/{len(platforms)} platforms, fastest {fastest * FIXED_DT:.2f}s"
+        else:
+            result = "UNREACHABLE"
+            unreachable += 1
+        print(f"  key {key.key_index} at ({key.x},{key.y}) {key.spawn_time:.2f}-{key.expire_time:.2f}s "
+              f"beat {key.beat}: {result}")
+    return unreachable
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and summarize per-beat jump reachability graphs.")
+    parser.add_argument("stages", nargs="*", help="stage JSON files (default: stage/*.json)")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the cached graph")
+    parser.add_argument("--edges", action="store_true", help="list the edges of every beat")
+    args = parser.parse_args(argv)
+
+    unreachable = 0
+    for stage_path in args.stages or sorted(glob.glob("stage/*.json")):
+        unreachable += show(stage_path, args.rebuild, args.edges)
+    sys.exit(1 if unreachable else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# tools/replay.py
+"""
+リプレイの記録・検証・シークを画面なしで行う
+
+使い方:
+  python -m tools.replay record ステージ.json 出力.json [--steps N] [--seed N]
+      ランダム入力 (run_stages と同じ) で回して記録する (性能比較用の決まった負荷になる)
+  python -m tools.replay verify リプレイ.json ...
+      最初から再生し、記録した状態ハッシュと食い違うステップがないか確かめる
+  python -m tools.replay seek リプレイ.json ステップ
+      キーフレームからのシークと、最初からの再生で同じ状態になるか・かかった時間を比べる
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from game.game_utils import FIXED_DT
+from game.core import Simulation
+from game.core.replay import Replay, ReplayRecorder, ReplayPlayer
+from tools.run_stages import DEFAULT_STEPS, random_inputs
+
+
+def record(args):
+    sim = Simulation(args.stage, seed=args.seed)
+    recorder = ReplayRecorder(sim)
+    for inputs, _ in zip(random_inputs(args.seed), range(args.steps)):
+        recorder.step(inputs, FIXED_DT)
+        if sim.is_stage_clear:
+            break
+    recorder.replay.save(args.output)
+    print(f"{args.output}: {len(recorder.replay)} steps, {len(recorder.replay.keyframes)} keyframes, "
+          f"{os.path.getsize(args.output)} bytes")
+
+
+def verify(args):
+    failed = False
+    for path in args.replays:
+        replay = Replay.load(path)
+        player = ReplayPlayer(replay)
+        start = time.perf_counter()
+        mismatch = player.verify()
+        elapsed = time.perf_counter() - start
+        result = "ok" if mismatch is None else f"MISMATCH at step {mismatch}"
+        print(f"{path}: {len(replay)} steps in {elapsed:.2f}s, {result}")
+        failed = failed or mismatch is not None
+    return 1 if failed else 0
+
+
+def seek(args):
+    replay = Replay.load(args.replay)
+    target = min(args.step, len(replay))
+
+    start = time.perf_counter()
+    from_start = ReplayPlayer(replay)
+    while from_start.step_index < target:
+        from_start.step()
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    seeking = ReplayPlayer(replay)
+    seeking.seek(target)
+    seek_time = time.perf_counter() - start
+
+    same = from_start.sim.state_hash() == seeking.sim.state_hash()
+    print(f"step {target}: replay from start {full_time * 1000:.1f}ms, "
+          f"seek {seek_time * 1000:.1f}ms, {'same state' if same else 'DIFFERENT STATE'}")
+    return 0 if same else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record, verify and seek replays headless.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_record = commands.add_parser("record", help="record a replay from random input")
+    parser_record.add_argument("stage")
+    parser_record.add_argument("output")
+    parser_record.add_argument("--steps", type=int, default=DEFAULT_STEPS)
+    parser_record.add_argument("--seed", type=int, default=0)
+    parser_record.set_defaults(func=record)
+
+    parser_verify = commands.add_parser("verify", help="replay and compare state hashes")
+    parser_verify.add_argument("replays", nargs="+")
+    parser_verify.set_defaults(func=verify)
+
+    parser_seek = commands.add_parser("seek", help="seek via keyframes and compare with a full replay")
+    parser_seek.add_argument("replay")
+    parser_seek.add_argument("step", type=int)
+    parser_seek.set_defaults(func=seek)
+
+    args = parser.parse_args(argv)
+    sys.exit(args.func(args) or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# tools/restart_latency.py
+"""
+各ステージのリスタート (GameScene._reset_game) にかかる時間を計測する
+1 フレーム (1/FPS 秒) を超えたステージがあれば終了コード 1 を返す
+
+使い方: python -m tools.restart_latency [回数]
+"""
+import os
+import sys
+import glob
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pygame
+from game.game_utils import SCREEN_WIDTH, SCREEN_HEIGHT, FPS
+from game.managers.soundmanager import SoundManager
+from game.scenes.game_scene import GameScene
+
+
+def measure_restart(screen, sound_manager, stage_path, repeat):
+    scene = GameScene(screen, sound_manager, stage_path)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scene._reset_game()
+        samples.append(time.perf_counter() - start)
+    return sum(samples) / len(samples), max(samples)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    sound_manager = SoundManager("assets/sound")
+    budget_ms = 1000.0 / FPS
+
+    over_budget = False
+    print(f"{'stage':<16}{'mean ms':>10}{'max ms':>10}")
+    for stage_path in sorted(glob.glob("stage/*.json")):
+        mean, worst = measure_restart(screen, sound_manager, stage_path, repeat)
+        mark = ""
+        if worst * 1000 > budget_ms:
+            over_budget = True
+            mark = "  over 1 frame"
+        print(f"{os.path.basename(stage_path):<16}{mean * 1000:>10.3f}{worst * 1000:>10.3f}{mark}")
+    pygame.quit()
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
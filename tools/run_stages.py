@@ -0,0 +1,132 @@
+# tools/run_stages.py
+"""
+画面・音なしでステージを実時間より速く回し、結果を表にする (回帰チェック用)
+入力はランダム (シード固定) か、スクリプトファイルで与える
+
+使い方: python -m tools.run_stages [ステージ.json ...] [--steps N] [--seed N] [--hold N] [--script FILE]
+  ステージを省略すると stage/*.json をすべて回す
+
+スクリプトは 1 行に「ステップ数 押すキー」を書く (L: 左, R: 右, D: 下, J: ジャンプ, -: なし)
+  例: 30 R
+      1 RJ
+      # から後はコメント
+  スクリプトが終わった後は何も押さない
+"""
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from game.game_utils import FIXED_DT
+from game.core import Simulation, InputState, NO_INPUT
+
+# 既定で回すステップ数 (60 秒分)
+DEFAULT_STEPS = 3600
+# ランダム入力で同じキーを押し続けるステップ数
+DEFAULT_HOLD = 12
+
+
+def random_inputs(seed, hold=DEFAULT_HOLD):
+    """hold ステップごとに押すキーを選び直すランダム入力"""
+    rng = random.Random(seed)
+    while True:
+        r = rng.random()
+        inputs = InputState(
+            left=r < 0.35,
+            right=0.35 <= r < 0.7,
+            down=rng.random() < 0.1,
+            jump=rng.random() < 0.3,
+        )
+        for _ in range(hold):
+            yield inputs
+
+
+def parse_script(lines):
+    """スクリプトの行を (ステップ数, InputState) のリストにする"""
+    script = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0].split()
+        if not line:
+            continue
+        try:
+            steps = int(line[0])
+        except ValueError:
+            raise ValueError(f"line {line_number}: step count expected, got {line[0]!r}")
+        keys = line[1].upper() if len(line) > 1 else "-"
+        unknown = set(keys) - set("LRDJ-")
+        if unknown:
+            raise ValueError(f"line {line_number}: unknown keys {''.join(sorted(unknown))!r}")
+        script.append((steps, InputState("L" in keys, "R" in keys, "D" in keys, "J" in keys)))
+    return script
+
+
+def script_inputs(script):
+    for steps, inputs in script:
+        for _ in range(steps):
+            yield inputs
+    while True:
+        yield NO_INPUT
+
+
+def run_stage(stage_path, inputs, max_steps=DEFAULT_STEPS, seed=0):
+    """
+    ステージを最大 max_steps ステップ回し、
+    (ステップ数, 秒, ゲームオーバー回数, 取った鍵の数, クリア時刻 or None) を返す
+    """
+    # 敵の出現間隔など StageManager が使う乱数もシードで固定する
+    random.seed(seed)
+    sim = Simulation(stage_path)
+    steps = 0
+    start = time.perf_counter()
+    for step_inputs, _ in zip(inputs, range(max_steps)):
+        sim.step(step_inputs, FIXED_DT)
+        steps += 1
+        if sim.is_stage_clear:
+            break
+    elapsed = time.perf_counter() - start
+    clear_time = sim.time if sim.is_stage_clear else None
+    return steps, elapsed, sim.deaths, sim.player.key_count, clear_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run stages headless and report the results.")
+    parser.add_argument("stages", nargs="*", help="stage JSON files (default: stage/*.json)")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="max steps per stage")
+    parser.add_argument("--seed", type=int, default=0, help="seed for random input and the stage")
+    parser.add_argument("--hold", type=int, default=DEFAULT_HOLD, help="steps to hold each random input")
+    parser.add_argument("--script", help="input script file (instead of random input)")
+    args = parser.parse_args(argv)
+
+    stages = args.stages or sorted(glob.glob("stage/*.json"))
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = parse_script(f)
+
+    print(f"{'stage':<16}{'steps':>8}{'steps/s':>10}{'deaths':>8}{'keys':>6}{'clear':>9}")
+    total_steps = 0
+    total_elapsed = 0.0
+    for stage_path in stages:
+        if script is not None:
+            inputs = script_inputs(script)
+        else:
+            inputs = random_inputs(args.seed, args.hold)
+        steps, elapsed, deaths, keys, clear_time = run_stage(stage_path, inputs, args.steps, args.seed)
+        total_steps += steps
+        total_elapsed += elapsed
+        clear = f"{clear_time:.2f}s" if clear_time is not None else "-"
+        rate = steps / elapsed if elapsed > 0 else 0.0
+        print(f"{os.path.basename(stage_path):<16}{steps:>8}{rate:>10.0f}{deaths:>8}{keys:>6}{clear:>9}")
+    if total_elapsed > 0:
+        print(f"{'total':<16}{total_steps:>8}{total_steps / total_elapsed:>10.0f}"
+              f"  ({total_elapsed:.2f}s, {total_steps * FIXED_DT / total_elapsed:.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# tools/solve_stages.py
+"""
+ステージがクリアできるか (target_keys 個の鍵を続けて取れるか) を探索で確かめる
+
+プレイヤーの操作を MACRO_STEPS ステップ単位の行動 (左右・ジャンプ・下の組み合わせ) に区切り、
+タイムラインの時刻ごとに幅優先で広げる。状態はプレイヤーの位置・速度をマス目に丸めたものと
+取った鍵で同一視し、BEAM_WIDTH 個だけ残す (枝刈りした幅優先 / ビームサーチ)。
+残すのは、まだ来たことのない区画・区画ごとに一番鍵に近いもの・残りを鍵に近い順、の順。
+状態の展開は Simulation.snapshot / restore で行い、ワーカープロセスに分けて並列に進める
+(複数ステージも同じプロセスプールで同時に探す)。
+見つかった手順はリプレイとして保存し、最初から再生してクリアになることを確かめる。
+
+使い方: python -m tools.solve_stages [ステージ.json ...] [--workers N] [--beam N] [--time 秒] [--out DIR]
+  ステージを省略すると stage/*.json をすべて調べる。クリアできないステージがあれば終了コード 1
+  リプレイは python -m game.main --replay DIR/xxx.json で見られる
+"""
+import os
+import sys
+import glob
+import math
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from game.game_utils import FIXED_DT, KEY_SIZE
+from game.core import Simulation, InputState, NO_INPUT
+from game.core.replay import ReplayRecorder
+
+# 1 つの行動で入力を続けるステップ数
+MACRO_STEPS = 8
+# 1 時刻あたりに残す状態の数
+BEAM_WIDTH = 160
+# 探索を打ち切るシミュレーション時間 (秒)
+DEFAULT_TIME_LIMIT = 90.0
+# 新しい区画に行けず、鍵も増えないままこの秒数が過ぎたら打ち切る
+STALL_TIME = 20.0
+# 状態を同一視するマス目の大きさ (px, px / ステップ)
+POSITION_CELL = 12
+VELOCITY_CELL = 4
+# 残す状態が 1 か所に固まらないよう、この大きさ (POSITION_CELL 単位) の区画ごとに選ぶ
+DIVERSITY_CELL = 8
+# 取った鍵 1 個分のスコア (鍵までの距離より必ず大きくする)
+KEY_SCORE = 100000
+
+# 行動: (左, 右, 下, ジャンプ)。ジャンプは押した瞬間だけ効くので、行動の最初のステップだけ押す
+ACTIONS = (
+    (False, False, False, False),
+    (True, False, False, False),
+    (False, True, False, False),
+    (False, False, False, True),
+    (True, False, False, True),
+    (False, True, False, True),
+    (False, False, True, False),
+)
+
+
+def action_inputs(action):
+    """行動を MACRO_STEPS ステップ分の InputState にする"""
+    left, right, down, jump = action
+    first = InputState(left, right, down, jump)
+    rest = InputState(left, right, down, False)
+    return [first] + [rest] * (MACRO_STEPS - 1)
+
+
+# ワーカープロセスごとに、ステージの Simulation を使い回す
+_SIMULATIONS = {}
+
+
+def _simulation(stage_path, seed):
+    sim = _SIMULATIONS.get((stage_path, seed))
+    if sim is None:
+        sim = Simulation(stage_path, seed=seed)
+        _SIMULATIONS[(stage_path, seed)] = sim
+    return sim
+
+
+def _targets(sim):
+    """次に取りに行く鍵の位置: 出ている鍵、無ければ次に出る鍵 (このループに残っていなければ次のループの最初の鍵)"""
+    if sim.items:
+        return [(item.x, item.y) for item in sim.items]
+    stage_manager = sim.stage_manager
+    timeline = stage_manager.timeline
+    if timeline is None or not timeline.key_windows:
+        return []
+    _, pending = timeline.keys_at(stage_manager.current_time - stage_manager.stage_start_time)
+    key_index = pending[0][1] if pending else timeline.key_windows[0].key_index
+    key_info = stage_manager.keys_to_spawn[key_index]
+    return [(key_info["x"], key_info["y"])]
+
+
+def _score(sim):
+    """鍵を続けて取った数が多く、次の鍵に近いほど大きい"""
+    player = sim.player
+    x = player.x + (player.width - KEY_SIZE) / 2
+    y = player.y + (player.height - KEY_SIZE) / 2
+    distance = min((math.hypot(px - x, py - y) for px, py in _targets(sim)), default=0.0)
+    return sim.stage_manager.consecutive_keys * KEY_SCORE - distance
+
+
+def _state_key(sim):
+    """同一視に使う状態 (マス目に丸めた位置・速度・接地・取った鍵)"""
+    player = sim.player
+    stage_manager = sim.stage_manager
+    return (
+        int(player.x // POSITION_CELL), int(player.y // POSITION_CELL),
+        int(player.velocity_y // VELOCITY_CELL), player.on_ground,
+        stage_manager.consecutive_keys,
+        tuple(key.collected for key in stage_manager.active_keys),
+    )
+
+
+def _region(state_key):
+    """状態の区画 (DIVERSITY_CELL 単位の位置と、続けて取った鍵の数)"""
+    return state_key[0] // DIVERSITY_CELL, state_key[1] // DIVERSITY_CELL, state_key[4]
+
+
+def expand(stage_path, seed, nodes, actions):
+    """
+    ワーカーで実行する。nodes: (番号, SimSnapshot) のリスト
+    各状態から各行動を試し、ゲームオーバーにならなかったものを
+    (親の番号, 行動の番号, SimSnapshot, 同一視の状態, スコア, クリアしたか) で返す
+    """
+    sim = _simulation(stage_path, seed)
+    action_steps = [action_inputs(action) for action in actions]
+    children = []
+    for index, snapshot in nodes:
+        for action_index, inputs in enumerate(action_steps):
+            sim.restore(snapshot)
+            for step_inputs in inputs:
+                sim.step(step_inputs, FIXED_DT)
+                if sim.player.is_game_over or sim.is_stage_clear:
+                    break
+            if sim.player.is_game_over:
+                continue
+            children.append((index, action_index, sim.snapshot(), _state_key(sim),
+                             _score(sim), sim.is_stage_clear))
+    return children
+
+
+class _InlineExecutor:
+    """--workers 1 のときはプロセスを作らずに同じプロセスで展開する"""
+    class _Done:
+        def __init__(self, value):
+            self._value = value
+
+        def result(self):
+            return self._value
+
+    def submit(self, fn, *args):
+        return self._Done(fn(*args))
+
+    def shutdown(self):
+        pass
+
+
+class StageSearch:
+    """1 ステージ分の探索の状態"""
+    def __init__(self, stage_path, seed, beam_width, time_limit):
+        self.stage_path = stage_path
+        self.seed = seed
+        self.beam_width = beam_width
+        sim = Simulation(stage_path, seed=seed)
+        self.target_keys = sim.stage_manager.target_keys
+        self.actions = ACTIONS
+        self.max_layers = int(time_limit / (MACRO_STEPS * FIXED_DT))
+        self.stall_layers = int(STALL_TIME / (MACRO_STEPS * FIXED_DT))
+        self.progress_layer = 0
+        # layers[d]: d 回目の行動の後に残した状態の (親の番号, 行動の番号)
+        self.layers = []
+        self.frontier = [sim.snapshot()]
+        self.expansions = 0
+        self.best_keys = 0
+        # これまでに残した状態の区画
+        self.visited = set()
+        self.solution = None
+        self.done = False
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def chunks(self, count):
+        """今の frontier を count 個に分ける"""
+        nodes = list(enumerate(self.frontier))
+        size = max(1, math.ceil(len(nodes) / count))
+        return [nodes[i:i + size] for i in range(0, len(nodes), size)]
+
+    def advance(self, children):
+        """展開した子から次の frontier を選ぶ"""
+        self.expansions += len(self.frontier) * len(self.actions)
+        best = {}
+        for child in children:
+            parent, action_index, snapshot, state_key, score, cleared = child
+            if cleared:
+                self.layers.append([(parent, action_index)])
+                self.solution = self._path(0)
+                self._finish()
+                return
+            if state_key not in best or score > best[state_key][4]:
+                best[state_key] = child
+        ranked = sorted(best.values(), key=lambda child: -child[4])
+        # まだ来たことのない区画、区画ごとに一番よいもの、残りをスコア順、の順で選ぶ
+        # (鍵に近いものだけを残すと、足場が消えたときにまとめて落ちたり、
+        #  遠回りしないと登れない所で同じ場所に留まったりする)
+        kept = []
+        picked = set()
+        regions = set()
+        for novel_only in (True, False):
+            for i, child in enumerate(ranked):
+                if len(kept) >= self.beam_width:
+                    break
+                region = _region(child[3])
+                if i in picked or region in regions or (novel_only and region in self.visited):
+                    continue
+                regions.add(region)
+                picked.add(i)
+                kept.append(child)
+        kept.extend([child for i, child in enumerate(ranked) if i not in picked][:self.beam_width - len(kept)])
+        if not regions <= self.visited:
+            self.visited.update(regions)
+            self.progress_layer = len(self.layers)
+        kept.sort(key=lambda child: -child[4])
+        self.layers.append([(child[0], child[1]) for child in kept])
+        self.frontier = [child[2] for child in kept]
+        if kept and kept[0][2].consecutive_keys > self.best_keys:
+            self.best_keys = kept[0][2].consecutive_keys
+            self.progress_layer = len(self.layers)
+        if (not kept or len(self.layers) >= self.max_layers
+                or len(self.layers) - self.progress_layer >= self.stall_layers):
+            self._finish()
+
+    def _path(self, index):
+        """最後の層の index 番目に至る行動の列"""
+        path = []
+        for layer in reversed(self.layers):
+            parent, action_index = layer[index]
+            path.append(action_index)
+            index = parent
+        path.reverse()
+        return path
+
+    def _finish(self):
+        self.done = True
+        self.elapsed = time.perf_counter() - self.start
+
+    def witness(self):
+        """見つけた手順を最初から再生して記録し、(Replay, クリアしたか) を返す"""
+        sim = Simulation(self.stage_path, seed=self.seed)
+        recorder = ReplayRecorder(sim)
+        for action_index in self.solution:
+            for step_inputs in action_inputs(self.actions[action_index]):
+                recorder.step(step_inputs, FIXED_DT)
+                if sim.is_stage_clear:
+                    return recorder.replay, True
+        # 着地待ちでクリアが少し遅れることがある
+        for _ in range(MACRO_STEPS * 4):
+            recorder.step(NO_INPUT, FIXED_DT)
+            if sim.is_stage_clear:
+                return recorder.replay, True
+        return recorder.replay, False
+
+
+def solve(stage_paths, workers=1, seed=0, beam_width=BEAM_WIDTH, time_limit=DEFAULT_TIME_LIMIT):
+    """
+    全ステージを同時に探索する。1 時刻ずつ、全ステージの frontier を分けてワーカーで展開する
+    StageSearch のリストを返す
+    """
+    searches = [StageSearch(path, seed, beam_width, time_limit) for path in stage_paths]
+    executor = ProcessPoolExecutor(workers) if workers > 1 else _InlineExecutor()
+    try:
+        while True:
+            active = [search for search in searches if not search.done]
+            if not active:
+                break
+            # ワーカーの数より少し多めに分けて、ステージ間の偏りをならす
+            parts = max(1, math.ceil(workers * 2 / len(active)))
+            futures = [
+                (search, executor.submit(expand, search.stage_path, seed, chunk, search.actions))
+                for search in active
+                for chunk in search.chunks(parts)
+            ]
+            children = {id(search): [] for search in active}
+            for search, future in futures:
+                children[id(search)].extend(future.result())
+            for search in active:
+                search.advance(children[id(search)])
+    finally:
+        executor.shutdown()
+    return searches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search each stage for a clearing input sequence.")
+    parser.add_argument("stages", nargs="*", help="stage JSON files (default: stage/*.json)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--beam", type=int, default=BEAM_WIDTH, help="states kept per time step")
+    parser.add_argument("--time", type=float, default=DEFAULT_TIME_LIMIT, help="max simulated seconds per stage")
+    parser.add_argument("--seed", type=int, default=0, help="stage seed")
+    parser.add_argument("--out", default=os.path.join("replays", "solver"), help="directory for witness replays")
+    args = parser.parse_args(argv)
+
+    stages = args.stages or sorted(glob.glob("stage/*.json"))
+    start = time.perf_counter()
+    searches = solve(stages, args.workers, args.seed, args.beam, args.time)
+
+    os.makedirs(args.out, exist_ok=True)
+    print(f"{'stage':<16}{'result':>8}{'keys':>7}{'clear':>9}{'expanded':>10}{'wall':>8}  witness")
+    unsolved = 0
+    for search in searches:
+        name = os.path.basename(search.stage_path)
+        keys = f"{search.best_keys}/{search.target_keys}"
+        if search.solution is None:
+            unsolved += 1
+            print(f"{name:<16}{'NO':>8}{keys:>7}{'-':>9}{search.expansions:>10}{search.elapsed:>7.1f}s")
+            continue
+        replay, cleared = search.witness()
+        path = os.path.join(args.out, os.path.splitext(name)[0] + ".json")
+        replay.save(path)
+        result = "clear" if cleared else "REPLAY?"
+        clear = f"{len(replay) * FIXED_DT:.1f}s"
+        print(f"{name:<16}{result:>8}{search.target_keys:>5}/{search.target_keys}{clear:>9}"
+              f"{search.expansions:>10}{search.elapsed:>7.1f}s  {path}")
+        unsolved += 0 if cleared else 1
+    print(f"{len(searches) - unsolved}/{len(searches)} stages cleared in {time.perf_counter() - start:.1f}s")
+    sys.exit(1 if unsolved else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# tools/sound_timing.py
+"""
+効果音 (カウント音・鍵の出現音) の予定時刻と、実際の鳴らし方から出した聞こえる時刻のずれを調べる
+SoundManager が返した結果 (無音を足したか・足した長さ・チャンネルが取れたか) を使うので、
+無音を作れずにすぐ鳴らした音や鳴らなかった音はそのまま数に出る
+ミキサーの遅れはバッファ分 (出力デバイス側の遅れは含まない)
+予定時刻を過ぎた最初の更新で鳴らす方式 (従来) の見込みも並べて表示する
+プレイヤーは動かさず、ステージの進行だけを実時間に合わせて進める
+(速く回すとミキサーのチャンネルが空かず、実際のプレイより鳴らない音が増える)
+
+使い方: python -m tools.sound_timing [秒数] [ステップ秒]
+"""
+import os
+import sys
+import glob
+import math
+import time
+import types
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pygame
+from game.game_utils import FIXED_DT
+from game.managers.soundmanager import SoundManager
+from game.managers.stagemanager import StageManager
+
+# game/main.py のミキサー設定と同じ
+AUDIO_FREQUENCY = 44100
+AUDIO_BUFFER = 256
+OUTPUT_LATENCY = AUDIO_BUFFER / AUDIO_FREQUENCY
+# 予定して鳴らす効果音 (game/main.py と同じ音量)
+SOUNDS = {"pi": ("pi.ogg", 0.1), "key_spawn": ("key_spawn.ogg", 0.05)}
+
+
+def measure(stage_path, seconds, step):
+    sound_manager = SoundManager("assets/sound", output_latency=OUTPUT_LATENCY)
+    for name, (filename, volume) in SOUNDS.items():
+        sound_manager.load_sound(name, filename)
+        sound_manager.set_volume(name, volume)
+    stage_manager = StageManager(sound_manager)
+    stage_manager.load_stage(stage_path)
+    stage_manager.sound_timing_log = []
+    # 動かないプレイヤー (最終ステージの出現条件に掛からない位置)
+    player = types.SimpleNamespace(y=math.inf, on_ground=False, velocity_y=0.0)
+    items = []
+
+    start_time = stage_manager.current_time
+    stage_manager.reset()
+    stage_manager.update(0, items, player)
+    wall_start = time.perf_counter()
+    for tick in range(int(seconds / step)):
+        wait = wall_start + tick * step - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        stage_manager.update(step, items, player)
+
+    log = stage_manager.sound_timing_log
+    sound_manager.cancel_delayed()
+    offsets = [abs(timing.offset) for timing in log if timing.offset is not None]
+    polled = []
+    for timing in log:
+        # 従来方式: 予定時刻以降の最初の更新で鳴らし、ミキサーの遅れはそのまま
+        ticks = math.ceil((timing.due_time - start_time) / step - 1e-9)
+        polled.append(start_time + ticks * step + OUTPUT_LATENCY - timing.due_time)
+    return log, offsets, polled
+
+
+def summary(values):
+    if not values:
+        return 0.0, 0.0
+    return sum(values) / len(values) * 1000, max(values) * 1000
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    step = float(sys.argv[2]) if len(sys.argv) > 2 else FIXED_DT
+    pygame.mixer.pre_init(frequency=AUDIO_FREQUENCY, size=-16, channels=2, buffer=AUDIO_BUFFER)
+    pygame.init()
+    pygame.mixer.init()
+
+    print(f"step {step * 1000:.2f} ms, buffer latency {OUTPUT_LATENCY * 1000:.2f} ms, mixer {pygame.mixer.get_init()}")
+    print(f"{'stage':<16}{'sounds':>8}{'padded':>8}{'immediate':>11}{'silent':>8}"
+          f"{'offset mean':>13}{'offset max':>12}{'poll mean':>11}{'poll max':>10}")
+    for stage_path in sorted(glob.glob("stage/*.json")):
+        log, offsets, polled = measure(stage_path, seconds, step)
+        padded = sum(1 for timing in log if timing.channel and timing.padded)
+        immediate = sum(1 for timing in log if timing.channel and not timing.padded)
+        offset_mean, offset_max = summary(offsets)
+        poll_mean, poll_max = summary(polled)
+        print(f"{os.path.basename(stage_path):<16}{len(log):>8}{padded:>8}{immediate:>11}"
+              f"{len(log) - padded - immediate:>8}"
+              f"{offset_mean:>13.2f}{offset_max:>12.2f}{poll_mean:>11.2f}{poll_max:>10.2f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# tools/streaming_report.py
+"""
+縦に長い合成ステージを作り、チャンク読み込みあり/なしで
+コンパイル時間・読み込み時間・読み込み中の Digit 数・1 ステップの時間・メモリを比べる
+プレイヤーの代わりに、ステージの下から一定速度で登っていく点を使う
+
+使い方: python -m tools.streaming_report [Digit 数 ...]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import tracemalloc
+import types
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pygame
+from game.game_utils import FIXED_DT, SCREEN_WIDTH, SCREEN_HEIGHT
+from game.managers.stage_cache import StageCache
+from game.managers.stagemanager import StageManager
+
+# 合成ステージの Digit の間隔 (screen_reference 800x600 基準)
+DIGIT_SPACING = 150
+STEPS = 1200
+# 登る速さ (px / ステップ)
+CLIMB_SPEED = 6
+
+
+def make_stage(digit_count, chunked, seed=1):
+    rng = random.Random(seed)
+    sequence = [rng.choice("0123456789") for _ in range(8)]
+    digits = [
+        {
+            "x": rng.randint(0, 680),
+            "y": 400 - i * DIGIT_SPACING,
+            "width": 120,
+            "height": 220,
+            "sequence": sequence[i % 3:] + sequence[:i % 3],
+            "initial_time": 1.0,
+        }
+        for i in range(digit_count)
+    ]
+    stage = {
+        "screen_reference": {"width": 800, "height": 600},
+        "player_start": {"x": 400, "y": 300},
+        "target_keys": 3,
+        "change_time": 1.0,
+        "digits": digits,
+        "item_spawns": [],
+    }
+    if chunked:
+        stage["chunk_size"] = {"width": 800, "height": 600}
+    return stage
+
+
+def load(stage_path):
+    """キャッシュを使わずに読み込み、(StageManager, 秒) を返す"""
+    start = time.perf_counter()
+    stage_manager = StageManager(stage_cache=StageCache())
+    stage_manager.load_stage(stage_path)
+    stage_manager.reset()
+    return stage_manager, time.perf_counter() - start
+
+
+def climb(stage_manager):
+    """プレイヤーの代わりの点を STEPS ステップ登らせ、(最大の読み込み中 Digit 数, 1 ステップの秒) を返す"""
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    player = types.SimpleNamespace(x=SCREEN_WIDTH / 2, y=600 * stage_manager.scale_y, width=40, height=60,
+                                   on_ground=True, velocity_y=0.0)
+    items = []
+    resident = 0
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        player.y -= CLIMB_SPEED
+        stage_manager.update(FIXED_DT, items, player)
+        stage_manager.digit_bank.update(FIXED_DT)
+        stage_manager.collision_world.refresh()
+        cam_y = int(player.y - SCREEN_HEIGHT / 2)
+        for digit in stage_manager.visible_digits(cam_y, cam_y + SCREEN_HEIGHT):
+            digit.draw(screen, 0, cam_y)
+        resident = max(resident, len(stage_manager.digits))
+    return resident, (time.perf_counter() - start) / STEPS
+
+
+def measure(stage_path):
+    # 1 回目は JSON からのコンパイル、2 回目以降はコンパイル済みファイルからの読み込み
+    _stage_manager, compile_time = load(stage_path)
+    stage_manager, load_time = load(stage_path)
+    resident, step_time = climb(stage_manager)
+    # メモリは計測のオーバーヘッドが時間に入らないよう別に測る
+    tracemalloc.start()
+    stage_manager, _load_time = load(stage_path)
+    climb(stage_manager)
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return compile_time * 1000, load_time * 1000, resident, step_time * 1e6, current
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [200, 1000, 4000]
+    pygame.init()
+    print(f"{'digits':>8}{'mode':>9}{'compile ms':>12}{'load ms':>10}{'resident':>10}{'step us':>10}{'KiB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for digit_count in counts:
+            for chunked in (False, True):
+                stage_path = os.path.join(directory, f"stage_{digit_count}_{int(chunked)}.json")
+                with open(stage_path, "w") as f:
+                    json.dump(make_stage(digit_count, chunked), f)
+                compile_ms, load_ms, resident, step_us, memory = measure(stage_path)
+                mode = "chunked" if chunked else "whole"
+                print(f"{digit_count:>8}{mode:>9}{compile_ms:>12.1f}{load_ms:>10.1f}"
+                      f"{resident:>10}{step_us:>10.1f}{memory / 1024:>10.1f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()